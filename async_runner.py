@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步调度
+requests / smtplib 都是阻塞调用：在事件循环里统一调度，实际I/O放到一个有界线程池执行。
+同时进行的调用数由信号量限制，排队的调用只是还没开始的协程，取消时不会留下线程池中的积压任务；
+提交到线程池时复制当前上下文，分阶段计时等上下文变量在线程里同样可用
+"""
+
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, Optional
+
+
+# 默认同时进行的阻塞调用数
+DEFAULT_CONCURRENCY = 16
+
+
+class BoundedRunner:
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        Args:
+            concurrency: 同时进行的阻塞调用数（也是线程池的线程数上限）
+
+        同一个BoundedRunner只能在一个事件循环中使用
+        """
+        self.concurrency = max(1, int(concurrency))
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bond-io")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # 在事件循环中创建，Python 3.9的信号量创建时就绑定当前事件循环
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def call(self, func: Callable[..., Any], *args, timeout: float = None) -> Any:
+        """
+        在线程池中执行阻塞函数
+
+        Args:
+            func: 阻塞函数
+            timeout: 开始执行后的超时（秒），排队等待的时间不计入；超时抛出 asyncio.TimeoutError，
+                     已经开始的阻塞调用无法中断，会在后台自行结束
+
+        Returns:
+            func的返回值
+        """
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            future = loop.run_in_executor(self._executor, functools.partial(context.run, func, *args))
+            if timeout is None:
+                return await future
+            return await asyncio.wait_for(future, timeout)
+
+    def close(self):
+        """不等待仍在执行的调用，丢弃还没开始的调用"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class PausableDeadline:
+    def __init__(self, seconds: float):
+        """
+        可以暂停的总超时：参与的调用都在暂停中（如在限流队列里排队、退避）时不计时
+
+        Args:
+            seconds: 计时的总时长（秒）
+
+        用法：每个调用用 track() 登记，排队期间用 paused() 暂停，
+        最外层用 wait() 等待，计时用完时抛出 asyncio.TimeoutError
+        """
+        self.seconds = seconds
+        self.used = 0.0
+        self._running = 0
+        self._paused = 0
+        self._updated = time.monotonic()
+        self._changed: Optional[asyncio.Event] = None
+
+    @property
+    def ticking(self) -> bool:
+        """是否正在计时：有登记的调用没有暂停"""
+        return self._running > self._paused
+
+    def _update(self, running: int = 0, paused: int = 0):
+        now = time.monotonic()
+        if self.ticking:
+            self.used += now - self._updated
+        self._updated = now
+        self._running += running
+        self._paused += paused
+        if self._changed is not None:
+            self._changed.set()
+
+    def remaining(self) -> float:
+        self._update()
+        return self.seconds - self.used
+
+    @asynccontextmanager
+    async def track(self) -> AsyncIterator[None]:
+        """登记一个调用，结束后注销"""
+        self._update(running=1)
+        try:
+            yield
+        finally:
+            self._update(running=-1)
+
+    @asynccontextmanager
+    async def paused(self) -> AsyncIterator[None]:
+        """暂停期间这个调用不计时"""
+        self._update(paused=1)
+        try:
+            yield
+        finally:
+            self._update(paused=-1)
+
+    async def wait(self, awaitable: Awaitable) -> Any:
+        """
+        等待awaitable完成
+
+        Raises:
+            asyncio.TimeoutError: 计时用完，awaitable已被取消并结束
+        """
+        self._changed = asyncio.Event()
+        task = asyncio.ensure_future(awaitable)
+        try:
+            while True:
+                self._changed.clear()
+                remaining = self.remaining()
+                if self.ticking and remaining <= 0:
+                    raise asyncio.TimeoutError()
+                changed = asyncio.ensure_future(self._changed.wait())
+                try:
+                    # 全部暂停时不计时，等到有调用恢复或结束
+                    await asyncio.wait({task, changed}, timeout=remaining if self.ticking else None,
+                                       return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    changed.cancel()
+                if task.done():
+                    return task.result()
+        except BaseException:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            raise
+
+
+async def gather_all(awaitables: Iterable[Awaitable]) -> List[Any]:
+    """
+    并发等待所有任务，按传入顺序返回结果
+
+    任一任务出错或外层被取消时，先取消其余任务并等它们结束，再把异常向上抛出，
+    不会留下无人等待的任务
+    """
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def run_sync(func: Callable[..., Awaitable], *args, **kwargs) -> Any:
+    """
+    同步入口：在新的事件循环中执行异步方法 func(*args, **kwargs)
+
+    asyncio.run 不能在运行中的事件循环里调用（Jupyter、Web服务等），
+    这时直接抛出RuntimeError，提示改为 await 对应的异步方法
+
+    Raises:
+        RuntimeError: 当前线程已经有运行中的事件循环
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(func(*args, **kwargs))
+    raise RuntimeError(f"当前线程已有运行中的事件循环，不能调用同步入口，请改为 await {func.__qualname__}(...)")
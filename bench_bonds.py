@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线基准测试
+启动本地模拟的东方财富接口（fake_eastmoney.py），在500 / 5千 / 5万条数据上测量
+请求、解析、筛选、格式化以及 BondNotifier.run() 端到端的耗时和吞吐量，结果写入JSON便于版本间对比
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Union
+
+# 基准测试不能真的发通知：清掉所有通知渠道的配置
+for _name in ('RECEIVER_EMAIL', 'SENDER_EMAIL', 'SENDER_PASSWORD', 'DINGTALK_WEBHOOK',
+              'WECHAT_WORK_WEBHOOK', 'SERVERCHAN_SENDKEY', 'SUBSCRIBERS_FILE', 'BOND_HEDGE'):
+    os.environ.pop(_name, None)
+
+import eastmoney_api
+from bond_cache import SnapshotCache
+from bond_index import BondDateIndex
+from bond_record import Bond, BondTable
+from check_new_bonds import (QUERY_MODE_FILTER, QUERY_MODE_SCAN, QUERY_MODE_STREAM,
+                             BondNotifier, build_date_filter, filter_bonds_by_date)
+from eastmoney_api import ReportRowStream, bond_list_params, fetch_all_pages, fetch_report, report_rows
+from fake_eastmoney import DEFAULT_ANCHOR_DATE, FakeDatacenter
+from http_session import HttpSessionManager
+
+
+DEFAULT_SIZES = (500, 5000, 50000)
+DEFAULT_REPEAT = 5
+DEFAULT_OUTPUT = 'benchmark_result.json'
+
+# 不缓存：每次都真正请求模拟接口
+NO_CACHE = SnapshotCache(enabled=False)
+
+
+def measure(name: str, size: int, rows: Union[int, Callable[[object], int]], func: Callable[[], object],
+            repeat: int, throughput: bool = True) -> Dict:
+    """
+    运行func repeat次（之前先预热一次），返回耗时统计
+
+    Args:
+        name: 基准名称
+        size: 模拟接口的数据量
+        rows: 实际请求或解析的行数；传入函数时用预热那次的返回值计算
+        func: 被测函数
+        repeat: 重复次数
+        throughput: 是否计算每秒行数，按日期或月份的查找、格式化等耗时与行数无关的项为False
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        warmup = func()
+        if callable(rows):
+            rows = rows(warmup)
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            durations.append((time.perf_counter() - start) * 1000)
+
+    durations.sort()
+    median = statistics.median(durations)
+    result = {
+        "name": name,
+        "size": size,
+        "rows": rows,
+        "repeat": repeat,
+        "min_ms": round(durations[0], 3),
+        "median_ms": round(median, 3),
+        "p95_ms": round(durations[min(len(durations) - 1, int(round(0.95 * (len(durations) - 1))))], 3),
+        "mean_ms": round(statistics.mean(durations), 3),
+        "rows_per_s": round(rows / (median / 1000)) if throughput and median > 0 else None,
+    }
+    rows_per_s = f"{result['rows_per_s']:,}" if result['rows_per_s'] is not None else '-'
+    print(f"{name:<22} {size:>7} / {rows:>7} 行  中位数 {result['median_ms']:>10.2f} ms  "
+          f"p95 {result['p95_ms']:>10.2f} ms  {rows_per_s:>12} 行/秒")
+    return result
+
+
+def run_notifier(url: str, http: HttpSessionManager, query_mode: str, anchor_date: str) -> int:
+    """
+    在临时目录中完整运行一次（bond_result.json写在临时目录里）
+
+    Returns:
+        int: 本次运行实际筛选或流式解析的行数（分阶段计时中 filter / fetch_stream 阶段的rows）
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            notifier = BondNotifier(check_date=anchor_date, query_mode=query_mode, http=http,
+                                    cache=NO_CACHE, use_store=False)
+            with notifier:
+                notifier.run()
+            return sum(span.get('rows', 0) for span in notifier.tracer.spans
+                       if span['name'] in ('filter', 'fetch_stream'))
+        finally:
+            os.chdir(cwd)
+
+
+def bench_size(size: int, repeat: int, latency_ms: float, jitter_ms: float, anchor_date: str) -> List[Dict]:
+    """对一种数据量跑全部基准"""
+    results = []
+    with FakeDatacenter(rows=size, latency_ms=latency_ms, jitter_ms=jitter_ms,
+                        anchor_date=anchor_date) as datacenter:
+        eastmoney_api.EASTMONEY_DATACENTER_URL = datacenter.url
+        http = HttpSessionManager()
+        try:
+            full_params = bond_list_params(size)
+            raw_rows = report_rows(fetch_report(full_params, http=http, cache=NO_CACHE))
+            body = json.dumps({"result": {"data": raw_rows}}, ensure_ascii=False).encode('utf-8')
+            bonds = [Bond.from_dict(row) for row in raw_rows]
+            month = anchor_date[:7]
+
+            def stream_filtered() -> ReportRowStream:
+                stream = ReportRowStream(full_params, start_date=anchor_date, end_date=anchor_date,
+                                         http=http, cache=NO_CACHE)
+                list(stream)
+                return stream
+
+            # 请求：行数为响应中实际返回的行数
+            results.append(measure("fetch_report", size, lambda data: len(report_rows(data)),
+                                   lambda: fetch_report(full_params, http=http, cache=NO_CACHE), repeat))
+            results.append(measure("fetch_all_pages", size, len, lambda: fetch_all_pages(
+                bond_list_params(500), http=http, cache=NO_CACHE), repeat))
+            results.append(measure("fetch_filtered", size, lambda data: len(report_rows(data)), lambda: fetch_report(
+                bond_list_params(500, filter=build_date_filter(anchor_date, anchor_date)), http=http, cache=NO_CACHE),
+                repeat))
+            results.append(measure("stream_filtered", size, lambda stream: stream.rows_scanned,
+                                   stream_filtered, repeat))
+
+            # 解析
+            results.append(measure("parse_json", size, len(raw_rows), lambda: json.loads(body), repeat))
+            results.append(measure("parse_bonds", size, len(raw_rows),
+                                   lambda: [Bond.from_dict(row) for row in raw_rows], repeat))
+            results.append(measure("parse_table", size, len(raw_rows), lambda: BondTable.from_dicts(raw_rows), repeat))
+
+            # 筛选
+            results.append(measure("filter_linear", size, len(raw_rows), lambda: filter_bonds_by_date(
+                raw_rows, anchor_date, anchor_date), repeat))
+            results.append(measure("index_build", size, len(bonds), lambda: BondDateIndex(bonds), repeat))
+            index = BondDateIndex(bonds)
+            # 二分查找，耗时只取决于结果条数，不计算吞吐量
+            results.append(measure("index_month", size, len, lambda: index.in_month(month), repeat,
+                                   throughput=False))
+
+            # 格式化
+            with contextlib.redirect_stdout(io.StringIO()):
+                formatter = BondNotifier(check_date=anchor_date, http=http, cache=NO_CACHE, use_store=False)
+            day_bonds = index.on(anchor_date)
+            results.append(measure("format_message", size, len(day_bonds),
+                                   lambda: formatter.format_bond_message(day_bonds), repeat, throughput=False))
+            by_date = {apply_date: index.on(apply_date) for apply_date in index.dates[-5:]}
+            results.append(measure("format_digest", size, sum(len(v) for v in by_date.values()),
+                                   lambda: formatter.format_digest_message(by_date), repeat, throughput=False))
+
+            # 端到端：行数取自运行的分阶段计时
+            for mode in (QUERY_MODE_FILTER, QUERY_MODE_SCAN, QUERY_MODE_STREAM):
+                results.append(measure(f"run_{mode}", size, lambda rows: rows, lambda mode=mode: run_notifier(
+                    datacenter.url, http, mode, anchor_date), repeat))
+        finally:
+            http.close()
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ''
+
+
+def compare(results: List[Dict], baseline_path: str):
+    """和之前的结果对比中位数耗时"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        # 旧的结果文件没有size，rows就是数据量
+        baseline = {(r['name'], r.get('size', r['rows'])): r for r in json.load(f)['results']}
+
+    print(f"\n与 {baseline_path} 对比（中位数耗时，<1 表示变快）:")
+    print('-' * 70)
+    for result in results:
+        old = baseline.get((result['name'], result['size']))
+        if not old or not old['median_ms']:
+            continue
+        ratio = result['median_ms'] / old['median_ms']
+        print(f"{result['name']:<22} {result['size']:>7} 行  {old['median_ms']:>10.2f} -> "
+              f"{result['median_ms']:>10.2f} ms  x{ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线基准测试（本地模拟接口）")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help="数据量，逗号分隔（默认 500,5000,50000）")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="每项重复次数（默认5）")
+    parser.add_argument('--latency-ms', type=float, default=0, help="模拟接口每个请求的固定延迟（毫秒）")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="模拟接口额外的随机延迟上限（毫秒）")
+    parser.add_argument('--anchor-date', default=DEFAULT_ANCHOR_DATE, help="最新的申购日期（需为交易日）")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help=f"结果文件（默认 {DEFAULT_OUTPUT}）")
+    parser.add_argument('--compare', metavar='FILE', help="与之前的结果文件对比")
+    args = parser.parse_args()
+
+    results = []
+    for size in (int(value) for value in args.sizes.split(',') if value.strip()):
+        print(f"\n{'=' * 70}\n数据量 {size}\n{'=' * 70}")
+        results.extend(bench_size(size, args.repeat, args.latency_ms, args.jitter_ms, args.anchor_date))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
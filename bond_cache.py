@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可转债列表本地快照缓存
+按请求参数（报表名/列/分页/过滤条件等）缓存东方财富接口的响应，
+在有效期内重复查询不再访问网络
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+
+# 默认缓存目录
+DEFAULT_CACHE_DIR = '.bond_cache'
+# 默认有效期（秒）
+DEFAULT_CACHE_TTL = 300
+# 默认缓存目录大小上限（字节）
+DEFAULT_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+
+class CacheUsage:
+    """一段调用期间的缓存命中情况，见 track_cache_usage"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+
+_current_usage: ContextVar[Optional[CacheUsage]] = ContextVar('bond_cache_usage', default=None)
+
+
+@contextmanager
+def track_cache_usage() -> Iterator[CacheUsage]:
+    """
+    统计当前上下文中的缓存命中
+
+    缓存对象上的 hits / misses 是所有查询共用的累计值，并发的查询（如对冲请求的两个线程）
+    会互相影响；这里只统计本上下文（以及从它复制上下文提交的线程）里的读取
+    """
+    usage = CacheUsage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+class SnapshotCache:
+    def __init__(self, cache_dir: str = None, ttl: float = None, max_bytes: int = None,
+                 enabled: bool = True, refresh: bool = False):
+        """
+        初始化快照缓存
+
+        Args:
+            cache_dir: 缓存目录，为None时读取环境变量 BOND_CACHE_DIR
+            ttl: 有效期（秒），为None时读取环境变量 BOND_CACHE_TTL
+            max_bytes: 缓存目录大小上限，超出时按最近最少使用淘汰，为None时读取环境变量 BOND_CACHE_MAX_BYTES
+            enabled: 为False时完全不读不写缓存（--no-cache）
+            refresh: 为True时忽略已有快照，但仍写入新的响应（--refresh）
+        """
+        self.cache_dir = cache_dir or os.getenv('BOND_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.ttl = ttl if ttl is not None else float(os.getenv('BOND_CACHE_TTL', str(DEFAULT_CACHE_TTL)))
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.getenv('BOND_CACHE_MAX_BYTES', str(DEFAULT_CACHE_MAX_BYTES)))
+        self.enabled = enabled
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(params: Dict) -> str:
+        """根据请求参数生成缓存键，参数顺序和数字/字符串写法不影响结果"""
+        normalized = {str(k): str(v) for k, v in params.items()}
+        raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path_for(self, params: Dict) -> str:
+        return os.path.join(self.cache_dir, self.key_for(params) + '.json')
+
+    def _count(self, hit: bool):
+        usage = _current_usage.get()
+        if hit:
+            self.hits += 1
+            if usage is not None:
+                usage.hits += 1
+        else:
+            self.misses += 1
+            if usage is not None:
+                usage.misses += 1
+
+    def get(self, params: Dict) -> Optional[Dict]:
+        """
+        读取快照
+
+        Returns:
+            Optional[Dict]: 有效期内的响应数据，没有或已过期时返回None
+        """
+        if not self.enabled or self.refresh:
+            self._count(hit=False)
+            return None
+
+        path = self._path_for(params)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            self._count(hit=False)
+            return None
+
+        if time.time() - snapshot.get('fetched_at', 0) > self.ttl:
+            self._count(hit=False)
+            return None
+
+        # 更新修改时间，作为LRU淘汰的依据
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        self._count(hit=True)
+        return snapshot.get('payload')
+
+    def put(self, params: Dict, payload: Dict):
+        """写入快照：先写临时文件再原子重命名，避免并发读到半个文件"""
+        if not self.enabled:
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        snapshot = {
+            'fetched_at': time.time(),
+            'params': {str(k): str(v) for k, v in params.items()},
+            'payload': payload
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path_for(params))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.evict()
+
+    def _entries(self) -> List[os.DirEntry]:
+        try:
+            return [entry for entry in os.scandir(self.cache_dir)
+                    if entry.is_file() and entry.name.endswith('.json')]
+        except OSError:
+            return []
+
+    def evict(self):
+        """缓存目录超过大小上限时，从最久未使用的快照开始删除"""
+        entries = []
+        total = 0
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        """删除所有快照"""
+        for entry in self._entries():
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+# 进程内共享的默认缓存
+_default_cache: Optional[SnapshotCache] = None
+
+
+def get_default_cache() -> SnapshotCache:
+    """获取默认缓存，第一次调用时按环境变量创建"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SnapshotCache()
+    return _default_cache
+
+
+def set_default_cache(cache: SnapshotCache):
+    """替换默认缓存，所有未显式传入缓存的查询都会使用它"""
+    global _default_cache
+    _default_cache = cache
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser):
+    """给命令行添加 --no-cache / --refresh 参数"""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--no-cache', action='store_true',
+                       help='不读也不写本地快照缓存，每次都请求接口')
+    group.add_argument('--refresh', action='store_true',
+                       help='忽略已有快照，强制请求接口并刷新缓存')
+
+
+def configure_cache_from_args(args: argparse.Namespace) -> SnapshotCache:
+    """根据命令行参数设置默认缓存"""
+    cache = SnapshotCache(enabled=not args.no_cache, refresh=args.refresh)
+    set_default_cache(cache)
+    return cache
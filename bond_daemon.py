@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻进程模式
+一个进程内按时区定时触发扫描，HTTP连接池、快照缓存、交易日历在多次触发之间保持加载；
+触发前先预热到数据源的连接，收到SIGTERM/SIGINT时等当前扫描结束后退出；
+配置了 METRICS_PORT 时同时提供Prometheus的 /metrics
+"""
+
+import os
+import signal
+import threading
+from datetime import datetime, time as dt_time, timedelta, timezone, tzinfo
+from typing import Callable, List, Optional
+
+from eastmoney_api import EASTMONEY_DATACENTER_URL
+from http_session import HttpSessionManager
+from trading_calendar import get_default_calendar
+
+
+# 默认触发时间（北京时间，可配置多个，逗号分隔）
+DEFAULT_SCHEDULE = '08:00'
+DEFAULT_TIMEZONE = 'Asia/Shanghai'
+# 默认在触发前多少秒预热连接
+DEFAULT_WARMUP_SECONDS = 30
+
+
+def load_timezone(name: str) -> tzinfo:
+    """按名称加载时区，系统没有时区数据时北京时间退回固定的UTC+8"""
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(name)
+    except Exception:
+        if name == DEFAULT_TIMEZONE:
+            return timezone(timedelta(hours=8), name)
+        raise
+
+
+def parse_schedule(value: str) -> List[dt_time]:
+    """解析 "08:00,14:30" 形式的触发时间"""
+    times = []
+    for item in value.split(','):
+        item = item.strip()
+        if item:
+            hour, minute = item.split(':')
+            times.append(dt_time(int(hour), int(minute)))
+    if not times:
+        raise ValueError("没有配置触发时间")
+    return sorted(times)
+
+
+def next_trigger(now: datetime, times: List[dt_time]) -> datetime:
+    """now之后（不含）最近的一个触发时刻，now需带时区"""
+    for days in (0, 1):
+        day = now.date() + timedelta(days=days)
+        for trigger_time in times:
+            candidate = datetime.combine(day, trigger_time, tzinfo=now.tzinfo)
+            if candidate > now:
+                return candidate
+    raise ValueError("无法计算下一次触发时间")
+
+
+class BondDaemon:
+    def __init__(self, run_once: Callable[[str, HttpSessionManager], object],
+                 schedule: str = None, tz: str = None, warmup_seconds: float = None,
+                 metrics_port: int = None):
+        """
+        Args:
+            run_once: 执行一次扫描，参数为检查日期（YYYY-MM-DD）和共享的HTTP会话
+            schedule: 触发时间，为None时读取环境变量 DAEMON_SCHEDULE
+            tz: 时区名称，为None时读取环境变量 DAEMON_TIMEZONE
+            warmup_seconds: 触发前预热连接的提前量，为None时读取环境变量 DAEMON_WARMUP
+            metrics_port: 提供 /metrics 的端口，为None时读取环境变量 METRICS_PORT，都没有时不提供
+        """
+        self.run_once = run_once
+        self.times = parse_schedule(schedule or os.getenv('DAEMON_SCHEDULE', DEFAULT_SCHEDULE))
+        self.tz = load_timezone(tz or os.getenv('DAEMON_TIMEZONE', DEFAULT_TIMEZONE))
+        self.warmup_seconds = warmup_seconds if warmup_seconds is not None else float(
+            os.getenv('DAEMON_WARMUP', str(DEFAULT_WARMUP_SECONDS)))
+        if metrics_port is None and os.getenv('METRICS_PORT'):
+            metrics_port = int(os.getenv('METRICS_PORT'))
+        self.metrics_port = metrics_port
+        self.http = HttpSessionManager()
+        self._stop = threading.Event()
+        self.runs = 0
+
+    def now(self) -> datetime:
+        return datetime.now(self.tz)
+
+    def stop(self, *_):
+        """请求退出；正在进行的扫描会先完成"""
+        if not self._stop.is_set():
+            print("\n收到退出信号，当前扫描结束后退出...")
+        self._stop.set()
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    def warmup(self):
+        """预热：加载交易日历，并提前与数据源建立TCP+TLS连接放入连接池"""
+        get_default_calendar()
+        try:
+            self.http.session.head(EASTMONEY_DATACENTER_URL, timeout=5)
+        except Exception as e:
+            print(f"预热连接失败（不影响扫描）: {e}")
+
+    def _sleep_until(self, moment: datetime) -> bool:
+        """等待到指定时刻，期间收到退出信号时返回False"""
+        while not self._stop.is_set():
+            remaining = (moment - self.now()).total_seconds()
+            if remaining <= 0:
+                return True
+            # 分段等待，系统休眠或调整时钟后能及时重新计算
+            self._stop.wait(min(remaining, 60))
+        return False
+
+    def tick(self, trigger: Optional[datetime] = None):
+        """执行一次扫描，异常只打印，不让常驻进程退出"""
+        trigger = trigger or self.now()
+        try:
+            self.run_once(trigger.strftime('%Y-%m-%d'), self.http)
+        except Exception as e:
+            print(f"扫描出错: {e}")
+        self.runs += 1
+
+    def serve(self, run_now: bool = False):
+        """
+        主循环：按计划触发扫描，直到收到退出信号
+
+        Args:
+            run_now: 启动后立即扫描一次
+        """
+        self.install_signal_handlers()
+        schedule = ', '.join(t.strftime('%H:%M') for t in self.times)
+        print(f"常驻模式启动，触发时间: {schedule}（{self.tz}）")
+
+        metrics_server = None
+        if self.metrics_port is not None:
+            from metrics import MetricsServer
+            metrics_server = MetricsServer(self.metrics_port).start()
+            print(f"指标地址: http://0.0.0.0:{metrics_server.port}/metrics")
+
+        try:
+            if run_now:
+                self.tick()
+            while not self._stop.is_set():
+                trigger = next_trigger(self.now(), self.times)
+                print(f"下一次扫描: {trigger.strftime('%Y-%m-%d %H:%M %Z')}")
+                if not self._sleep_until(trigger - timedelta(seconds=self.warmup_seconds)):
+                    break
+                self.warmup()
+                if not self._sleep_until(trigger):
+                    break
+                self.tick(trigger)
+        finally:
+            if metrics_server is not None:
+                metrics_server.stop()
+            self.http.close()
+            print(f"常驻模式退出，共扫描 {self.runs} 次")
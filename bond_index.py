@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按申购日期建立的可转债索引
+对一批数据只建一次索引，单日查询O(1)，日期范围和整月查询用二分查找，O(log n + k)；
+之后新增或变化的记录用 update() 合并，不重建整个索引
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Union
+
+from bond_record import Bond, as_bond
+
+
+class BondDateIndex:
+    def __init__(self, bonds: Iterable[Union[Bond, Dict]] = ()):
+        """
+        建立索引
+
+        Args:
+            bonds: 债券列表（Bond或东方财富返回的dict，dict会转换为Bond），没有申购日期的记录不进入索引
+        """
+        self._by_date: Dict[str, List[Bond]] = {}
+        # 债券代码 -> 已经进入索引的记录，update() 据此替换变化的记录
+        self._by_code: Dict[str, Bond] = {}
+        for bond in bonds:
+            self._add(as_bond(bond))
+
+        # 升序排列的日期，以及每个日期之前累计的债券数量，用于范围查询
+        self._dates: List[str] = sorted(self._by_date)
+        self._flat: List[Bond] = []
+        self._offsets: List[int] = []
+        self._relayout(0)
+
+    def _add(self, bond: Bond):
+        apply_date = bond.apply_date
+        if apply_date:
+            self._by_date.setdefault(apply_date, []).append(bond)
+            if bond.code:
+                self._by_code[bond.code] = bond
+
+    def _remove(self, bond: Bond):
+        bonds = self._by_date[bond.apply_date]
+        bonds.remove(bond)
+        if not bonds:
+            del self._by_date[bond.apply_date]
+        del self._by_code[bond.code]
+
+    def _relayout(self, position: int):
+        """从第position个日期开始重新拼接范围查询用的列表，之前的部分不变"""
+        del self._flat[self._offsets[position] if position < len(self._offsets) else len(self._flat):]
+        del self._offsets[position:]
+        for apply_date in self._dates[position:]:
+            self._offsets.append(len(self._flat))
+            self._flat.extend(self._by_date[apply_date])
+        self._offsets.append(len(self._flat))
+
+    def update(self, bonds: Iterable[Union[Bond, Dict]]):
+        """
+        合并新增或有变化的记录：同一债券代码的旧记录被替换（申购日期变化时移到新的日期下）
+
+        新债的申购日期通常在最后，范围查询用的列表只从最早受影响的日期开始重新拼接
+
+        Args:
+            bonds: 新增或有变化的债券（Bond或dict）
+        """
+        changed = set()
+        for bond in bonds:
+            bond = as_bond(bond)
+            old = self._by_code.get(bond.code) if bond.code else None
+            if old is not None:
+                changed.add(old.apply_date)
+                self._remove(old)
+            if bond.apply_date:
+                changed.add(bond.apply_date)
+            self._add(bond)
+        if not changed:
+            return
+
+        self._dates = sorted(self._by_date)
+        self._relayout(bisect_left(self._dates, min(changed)))
+
+    def __len__(self) -> int:
+        return len(self._flat)
+
+    @property
+    def dates(self) -> List[str]:
+        """有申购记录的日期（升序）"""
+        return list(self._dates)
+
+    def on(self, apply_date: str) -> List[Bond]:
+        """
+        查询某一天申购的债券
+
+        Args:
+            apply_date: 日期字符串（格式：YYYY-MM-DD）
+        """
+        return list(self._by_date.get(apply_date, ()))
+
+    def between(self, start_date: str, end_date: str) -> List[Bond]:
+        """
+        查询日期范围内申购的债券，按申购日期升序
+
+        Args:
+            start_date: 起始日期（格式：YYYY-MM-DD），包含
+            end_date: 结束日期（格式：YYYY-MM-DD），包含
+        """
+        lo = bisect_left(self._dates, start_date)
+        hi = bisect_right(self._dates, end_date)
+        if lo >= hi:
+            return []
+        return self._flat[self._offsets[lo]:self._offsets[hi]]
+
+    def in_month(self, year_month: str) -> List[Bond]:
+        """
+        查询某个月申购的债券
+
+        Args:
+            year_month: 年月字符串（格式：YYYY-MM）
+        """
+        # 日期是定长字符串，同一个月的所有日期都落在 YYYY-MM-01 到 YYYY-MM-31 之间
+        return self.between(f"{year_month}-01", f"{year_month}-31")
+
+    def count_by_date(self) -> Dict[str, int]:
+        """每个申购日期的债券数量"""
+        return {apply_date: len(self._by_date[apply_date]) for apply_date in self._dates}
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可转债记录
+Bond 是带 __slots__ 的单条记录，申购日期预先解析为序数、代码做了字符串驻留；
+BondTable 按列存储大批量记录（日期序数放在array里），适合 columns=ALL 的全量历史数据
+"""
+
+import sys
+from array import array
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+
+# 东方财富字段名 -> Bond属性名
+FIELD_TO_SLOT = {
+    'SECURITY_CODE': 'code',
+    'SECURITY_NAME_ABBR': 'name',
+    'CORRECODE': 'apply_code',
+}
+DATE_FIELD = 'PUBLIC_START_DATE'
+
+
+def parse_date_ordinal(value: Optional[str]) -> int:
+    """把 "2026-01-16 00:00:00" 这样的日期解析为序数，没有日期时返回0"""
+    if not value:
+        return 0
+    try:
+        return date.fromisoformat(value[:10]).toordinal()
+    except ValueError:
+        return 0
+
+
+def format_date_ordinal(ordinal: int) -> str:
+    """序数转回 YYYY-MM-DD，0表示没有日期"""
+    return date.fromordinal(ordinal).isoformat() if ordinal else ''
+
+
+def _intern(value) -> str:
+    return sys.intern(value) if isinstance(value, str) else ''
+
+
+class Bond:
+    __slots__ = ('code', 'name', 'apply_code', 'apply_ordinal', 'extra')
+
+    def __init__(self, code: str, name: str = '', apply_code: str = '',
+                 apply_ordinal: int = 0, extra: Optional[Dict] = None):
+        self.code = code
+        self.name = name
+        self.apply_code = apply_code
+        self.apply_ordinal = apply_ordinal
+        # columns=ALL 时的其他字段，保持原始字段名
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, raw: Dict) -> 'Bond':
+        """从东方财富返回的一行数据创建记录"""
+        extra = {key: value for key, value in raw.items()
+                 if key not in FIELD_TO_SLOT and key != DATE_FIELD}
+        return cls(
+            code=_intern(raw.get('SECURITY_CODE')),
+            name=raw.get('SECURITY_NAME_ABBR') or '',
+            apply_code=_intern(raw.get('CORRECODE')),
+            apply_ordinal=parse_date_ordinal(raw.get(DATE_FIELD)),
+            extra=extra or None
+        )
+
+    @property
+    def apply_date(self) -> str:
+        """申购日期（YYYY-MM-DD），没有时为空字符串"""
+        return format_date_ordinal(self.apply_ordinal)
+
+    def get(self, key: str, default=None):
+        """按东方财富字段名读取，兼容原来直接操作dict的代码"""
+        if key in FIELD_TO_SLOT:
+            value = getattr(self, FIELD_TO_SLOT[key])
+            return value if value else default
+        if key == DATE_FIELD:
+            return f"{self.apply_date} 00:00:00" if self.apply_ordinal else default
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def to_dict(self) -> Dict:
+        """转回东方财富的字段格式，用于写入JSON"""
+        raw = {
+            'SECURITY_CODE': self.code,
+            'SECURITY_NAME_ABBR': self.name,
+            'PUBLIC_START_DATE': f"{self.apply_date} 00:00:00" if self.apply_ordinal else None,
+            'CORRECODE': self.apply_code,
+        }
+        if self.extra:
+            raw.update(self.extra)
+        return raw
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Bond):
+            return NotImplemented
+        return (self.code, self.name, self.apply_code, self.apply_ordinal, self.extra) == \
+            (other.code, other.name, other.apply_code, other.apply_ordinal, other.extra)
+
+    def __repr__(self) -> str:
+        return f"Bond({self.code!r}, {self.name!r}, apply_date={self.apply_date!r})"
+
+
+def as_bond(bond: Union[Bond, Dict]) -> Bond:
+    """把dict转换为Bond，已经是Bond的原样返回"""
+    return bond if isinstance(bond, Bond) else Bond.from_dict(bond)
+
+
+def bond_to_dict(bond: Union[Bond, Dict]) -> Dict:
+    """把Bond转换为dict，已经是dict的原样返回"""
+    return bond.to_dict() if isinstance(bond, Bond) else bond
+
+
+class BondTable:
+    """按列存储的债券表，日期序数放在 array('l') 中"""
+
+    def __init__(self):
+        self.codes: List[str] = []
+        self.names: List[str] = []
+        self.apply_codes: List[str] = []
+        self.apply_ordinals = array('l')
+        # 其他字段按列存放：字段名 -> 值列表（与行号对齐）
+        self.extra_columns: Dict[str, List] = {}
+
+    @classmethod
+    def from_dicts(cls, rows: Iterable[Dict]) -> 'BondTable':
+        """从东方财富返回的数据行创建表"""
+        table = cls()
+        for raw in rows:
+            table.append(raw)
+        return table
+
+    def append(self, raw: Dict):
+        """追加一行原始数据"""
+        row_number = len(self.codes)
+        self.codes.append(_intern(raw.get('SECURITY_CODE')))
+        self.names.append(raw.get('SECURITY_NAME_ABBR') or '')
+        self.apply_codes.append(_intern(raw.get('CORRECODE')))
+        self.apply_ordinals.append(parse_date_ordinal(raw.get(DATE_FIELD)))
+
+        for key, value in raw.items():
+            if key in FIELD_TO_SLOT or key == DATE_FIELD:
+                continue
+            column = self.extra_columns.get(key)
+            if column is None:
+                # 新出现的字段，之前的行补None
+                column = self.extra_columns[key] = [None] * row_number
+            column.append(value)
+        for column in self.extra_columns.values():
+            if len(column) <= row_number:
+                column.append(None)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, row_number: int) -> Bond:
+        extra = {key: column[row_number] for key, column in self.extra_columns.items()
+                 if column[row_number] is not None}
+        return Bond(self.codes[row_number], self.names[row_number], self.apply_codes[row_number],
+                    self.apply_ordinals[row_number], extra or None)
+
+    def __iter__(self) -> Iterator[Bond]:
+        for row_number in range(len(self.codes)):
+            yield self[row_number]
+
+    def rows_between(self, start_date: str, end_date: str) -> List[int]:
+        """申购日期在范围内（包含两端）的行号，只比较整数序数"""
+        start = parse_date_ordinal(start_date)
+        end = parse_date_ordinal(end_date)
+        return [row_number for row_number, ordinal in enumerate(self.apply_ordinals)
+                if ordinal and start <= ordinal <= end]
+
+    def between(self, start_date: str, end_date: str) -> List[Bond]:
+        """申购日期在范围内（包含两端）的记录"""
+        return [self[row_number] for row_number in self.rows_between(start_date, end_date)]
+
+    def to_dicts(self) -> List[Dict]:
+        """转回东方财富的字段格式"""
+        return [bond.to_dict() for bond in self]
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可转债本地SQLite存储
+数据获取时把债券写入本地库（按债券代码upsert），每次运行的结果也记录下来，
+之后按月查询、按月统计、查看运行历史都直接走带索引的SQL，不用重新请求接口；
+通知的投递记录也保存在这里，同一天重复运行时不会把同一条消息再发一遍
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from bond_record import Bond, as_bond
+
+
+# 默认数据库文件
+DEFAULT_STORE_PATH = 'bond_store.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bonds (
+    security_code TEXT PRIMARY KEY,
+    security_name_abbr TEXT,
+    correcode TEXT,
+    public_start_date TEXT,
+    raw TEXT,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bonds_public_start_date ON bonds(public_start_date);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_date TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    message TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_run_date ON runs(run_date);
+
+CREATE TABLE IF NOT EXISTS fetch_latency (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    latency_ms REAL NOT NULL,
+    recorded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fetch_latency_source ON fetch_latency(source, id);
+
+CREATE TABLE IF NOT EXISTS deliveries (
+    delivery_date TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    message_hash TEXT NOT NULL,
+    delivered_at TEXT NOT NULL,
+    PRIMARY KEY (delivery_date, channel, recipient, message_hash)
+);
+"""
+
+
+def digest(value: str) -> str:
+    """投递记录中的接收方和消息只保存哈希，库文件里不出现Webhook token和消息原文"""
+    return hashlib.sha256((value or '').encode('utf-8')).hexdigest()[:32]
+
+
+class BondStore:
+    def __init__(self, path: str = None):
+        """
+        打开（或创建）本地库
+
+        Args:
+            path: 数据库文件路径，为None时读取环境变量 BOND_STORE_PATH
+        """
+        self.path = path or os.getenv('BOND_STORE_PATH', DEFAULT_STORE_PATH)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """懒加载的连接，第一次使用时建表并开启WAL"""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            # WAL模式下读写互不阻塞，运行中也可以用其他进程查询
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def upsert_bonds(self, bonds: Iterable[Union[Bond, Dict]]) -> int:
+        """
+        写入债券，已存在的债券代码会被更新
+
+        Returns:
+            int: 写入的条数
+        """
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = []
+        for bond in bonds:
+            bond = as_bond(bond)
+            if not bond.code:
+                continue
+            rows.append((bond.code, bond.name, bond.apply_code, bond.apply_date or None,
+                         json.dumps(bond.to_dict(), ensure_ascii=False), now))
+
+        with self._lock, self.conn:
+            self.conn.executemany("""
+                INSERT INTO bonds (security_code, security_name_abbr, correcode,
+                                   public_start_date, raw, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(security_code) DO UPDATE SET
+                    security_name_abbr = excluded.security_name_abbr,
+                    correcode = excluded.correcode,
+                    public_start_date = excluded.public_start_date,
+                    raw = excluded.raw,
+                    updated_at = excluded.updated_at
+            """, rows)
+        return len(rows)
+
+    @staticmethod
+    def _to_bond(row: sqlite3.Row) -> Bond:
+        return Bond.from_dict(json.loads(row['raw']))
+
+    def bonds_between(self, start_date: str, end_date: str) -> List[Bond]:
+        """
+        申购日期在范围内（包含两端）的债券，按申购日期升序
+
+        Args:
+            start_date: 起始日期（格式：YYYY-MM-DD）
+            end_date: 结束日期（格式：YYYY-MM-DD）
+        """
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT raw FROM bonds
+                WHERE public_start_date BETWEEN ? AND ?
+                ORDER BY public_start_date, security_code
+            """, (start_date, end_date)).fetchall()
+        return [self._to_bond(row) for row in rows]
+
+    def bonds_on(self, apply_date: str) -> List[Bond]:
+        """某一天申购的债券"""
+        return self.bonds_between(apply_date, apply_date)
+
+    def bonds_in_month(self, year_month: str) -> List[Bond]:
+        """某个月申购的债券（year_month格式：YYYY-MM）"""
+        return self.bonds_between(f"{year_month}-01", f"{year_month}-31")
+
+    def monthly_counts(self, limit: int = 12) -> List[Tuple[str, int]]:
+        """最近若干个月每月的申购数量，按月份倒序"""
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT substr(public_start_date, 1, 7) AS month, COUNT(*) AS count
+                FROM bonds
+                WHERE public_start_date IS NOT NULL
+                GROUP BY month
+                ORDER BY month DESC
+                LIMIT ?
+            """, (limit,)).fetchall()
+        return [(row['month'], row['count']) for row in rows]
+
+    def record_run(self, result: Dict):
+        """记录一次运行结果（即写入bond_result.json的内容）"""
+        with self._lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO runs (run_date, finished_at, count, message, result)
+                VALUES (?, ?, ?, ?, ?)
+            """, (result.get('date'), datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                  result.get('count', 0), result.get('message'),
+                  json.dumps(result, ensure_ascii=False)))
+
+    def record_latency(self, source: str, latency_ms: float):
+        """记录一次数据源请求耗时"""
+        with self._lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO fetch_latency (source, latency_ms, recorded_at) VALUES (?, ?, ?)
+            """, (source, latency_ms, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+    def latency_percentile(self, source: str, percentile: float, window: int = 50,
+                           min_samples: int = 5) -> Optional[float]:
+        """
+        数据源最近window次请求耗时的百分位数（毫秒）
+
+        Returns:
+            Optional[float]: 样本少于min_samples时返回None
+        """
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT latency_ms FROM fetch_latency WHERE source = ? ORDER BY id DESC LIMIT ?
+            """, (source, window)).fetchall()
+        if len(rows) < min_samples:
+            return None
+        samples = sorted(row['latency_ms'] for row in rows)
+        rank = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[rank]
+
+    def delivered(self, delivery_date: str, message_hash: str) -> Set[Tuple[str, str]]:
+        """
+        某一天某条消息已经投递过的 (渠道, 接收方哈希)
+
+        Args:
+            delivery_date: 运行日期（格式：YYYY-MM-DD）
+            message_hash: digest(消息内容)
+        """
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT channel, recipient FROM deliveries WHERE delivery_date = ? AND message_hash = ?
+            """, (delivery_date, message_hash)).fetchall()
+        return {(row['channel'], row['recipient']) for row in rows}
+
+    def record_delivery(self, delivery_date: str, channel: str, recipient: str, message_hash: str) -> bool:
+        """
+        记录一次成功投递（recipient为接收方的digest）
+
+        Returns:
+            bool: 是否是新记录（False表示之前已经记录过）
+        """
+        with self._lock, self.conn:
+            cursor = self.conn.execute("""
+                INSERT OR IGNORE INTO deliveries (delivery_date, channel, recipient, message_hash, delivered_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (delivery_date, channel, recipient, message_hash,
+                  datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        return cursor.rowcount == 1
+
+    def runs(self, run_date: str = None, limit: int = 20) -> List[Dict]:
+        """运行历史，最近的在前；指定run_date时只返回那一天的运行"""
+        query = "SELECT id, run_date, finished_at, count, message FROM runs"
+        params: list = []
+        if run_date:
+            query += " WHERE run_date = ?"
+            params.append(run_date)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询本地可转债库")
+    parser.add_argument('--db', help=f"数据库文件（默认 {DEFAULT_STORE_PATH}）")
+    parser.add_argument('--date', help="查询某一天申购的债券（YYYY-MM-DD）")
+    parser.add_argument('--month', help="查询某个月申购的债券（YYYY-MM）")
+    parser.add_argument('--monthly-counts', action='store_true', help="各月份申购数量统计")
+    parser.add_argument('--runs', action='store_true', help="查看运行历史")
+    args = parser.parse_args()
+
+    with BondStore(args.db) as store:
+        if args.date or args.month:
+            bonds = store.bonds_on(args.date) if args.date else store.bonds_in_month(args.month)
+            print(f"共 {len(bonds)} 只可转债:\n")
+            for i, bond in enumerate(bonds, 1):
+                print(f"{i}. {bond.apply_date} - {bond.name} ({bond.code}) - 申购代码: {bond.apply_code}")
+
+        if args.monthly_counts:
+            print('\n各月份申购数量统计:')
+            print('-' * 70)
+            for month, count in store.monthly_counts():
+                print(f"{month}: {count} 只")
+
+        if args.runs:
+            print('\n运行历史:')
+            print('-' * 70)
+            for run in store.runs():
+                print(f"{run['finished_at']} - {run['run_date']}: {run['count']} 只")
+
+
+if __name__ == "__main__":
+    main()
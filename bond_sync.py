@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可转债列表增量同步
+接口按 PUBLIC_START_DATE,SECURITY_CODE 倒序返回，记住已见过的最新记录后，
+每次只从头部拉取小分页，遇到已知记录就停止，只把新增部分合并进本地状态；
+本地状态的申购日期索引只在第一次使用时建立，之后只合并每次同步的新增部分
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from bond_index import BondDateIndex
+from eastmoney_api import bond_list_params, fetch_all_pages, fetch_report, report_rows
+
+
+# 默认本地状态文件
+DEFAULT_SYNC_STATE = os.path.join('.bond_sync', 'bond_state.json')
+# 增量同步每页条数
+DEFAULT_SYNC_PAGE_SIZE = 20
+# 首次全量同步每页条数
+INITIAL_PAGE_SIZE = 500
+# 首次全量同步最多拉取的页数
+MAX_INITIAL_PAGES = 20
+# 回看天数：申购日期可能在公告后才排进列表，水位线之前这几天内的记录仍然要核对
+DEFAULT_OVERLAP_DAYS = 7
+
+
+def bond_sort_key(bond: Dict) -> Tuple[str, str]:
+    """与接口排序一致的比较键：(申购日期, 债券代码)"""
+    return (bond.get('PUBLIC_START_DATE') or '', bond.get('SECURITY_CODE') or '')
+
+
+class IncrementalSync:
+    def __init__(self, state_path: str = None, page_size: int = None,
+                 overlap_days: int = DEFAULT_OVERLAP_DAYS, http=None, cache=None):
+        """
+        初始化增量同步
+
+        Args:
+            state_path: 本地状态文件，为None时读取环境变量 BOND_SYNC_STATE
+            page_size: 增量同步每页条数，为None时读取环境变量 BOND_SYNC_PAGE_SIZE
+            overlap_days: 水位线之前需要继续核对的天数
+            http: 共享的HTTP会话管理器
+            cache: 快照缓存，为None时使用默认缓存
+        """
+        self.state_path = state_path or os.getenv('BOND_SYNC_STATE', DEFAULT_SYNC_STATE)
+        self.page_size = page_size or int(os.getenv('BOND_SYNC_PAGE_SIZE', str(DEFAULT_SYNC_PAGE_SIZE)))
+        self.overlap_days = overlap_days
+        self.http = http
+        self.cache = cache
+        self.bonds: Dict[str, Dict] = {}
+        self.watermark: Optional[Dict] = None
+        self.pages_fetched = 0
+        self._loaded = False
+        self._index: Optional[BondDateIndex] = None
+
+    def load(self):
+        """读取本地状态"""
+        self._loaded = True
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        self.watermark = state.get('watermark')
+        self.bonds = {bond['SECURITY_CODE']: bond for bond in state.get('bonds', [])
+                      if bond.get('SECURITY_CODE')}
+
+    def save(self):
+        """写入本地状态：先写临时文件再原子重命名"""
+        directory = os.path.dirname(self.state_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        state = {
+            'watermark': self.watermark,
+            'synced_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'bonds': sorted(self.bonds.values(), key=bond_sort_key, reverse=True)
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _page_params(page_number: int, page_size: int) -> Dict:
+        return bond_list_params(page_size, page_number)
+
+    def _fetch_page(self, page_number: int, page_size: int) -> List[Dict]:
+        self.pages_fetched += 1
+        params = self._page_params(page_number, page_size)
+        return report_rows(fetch_report(params, http=self.http, cache=self.cache))
+
+    def _initial_sync(self, delta: List[Dict]):
+        """首次同步：并发拉取全部分页"""
+        rows = fetch_all_pages(self._page_params(1, INITIAL_PAGE_SIZE), http=self.http,
+                               cache=self.cache, max_pages=MAX_INITIAL_PAGES)
+        self.pages_fetched += max(1, -(-len(rows) // INITIAL_PAGE_SIZE))
+        self._merge(rows, delta)
+
+    def _stop_date(self) -> Optional[str]:
+        """早停日期：申购日期早于它的记录都视为已同步"""
+        if not self.watermark or not self.watermark.get('PUBLIC_START_DATE'):
+            return None
+        watermark_date = datetime.strptime(self.watermark['PUBLIC_START_DATE'][:10], '%Y-%m-%d')
+        return (watermark_date - timedelta(days=self.overlap_days)).strftime('%Y-%m-%d')
+
+    def _merge(self, rows: List[Dict], delta: List[Dict]):
+        """把新增或有变化的记录合并进本地状态"""
+        for bond in rows:
+            code = bond.get('SECURITY_CODE')
+            if not code:
+                continue
+            if self.bonds.get(code) != bond:
+                self.bonds[code] = bond
+                delta.append(bond)
+
+    @property
+    def index(self) -> BondDateIndex:
+        """本地状态的申购日期索引：第一次使用时按全部记录建立，之后每次 sync() 只合并新增或变化的记录"""
+        if self._index is None:
+            if not self._loaded:
+                self.load()
+            self._index = BondDateIndex(self.bonds.values())
+        return self._index
+
+    def sync(self) -> List[Dict]:
+        """
+        执行一次同步
+
+        Returns:
+            List[Dict]: 本次新增或有变化的记录（pages_fetched 为本次请求的页数）
+        """
+        if not self._loaded:
+            self.load()
+        self.pages_fetched = 0
+
+        stop_date = self._stop_date()
+        delta: List[Dict] = []
+
+        if stop_date is None:
+            self._initial_sync(delta)
+
+        page_number = 1
+        while stop_date is not None:
+            rows = self._fetch_page(page_number, self.page_size)
+
+            reached_known = False
+            kept = []
+            for bond in rows:
+                apply_date = (bond.get('PUBLIC_START_DATE') or '')[:10]
+                if apply_date and apply_date < stop_date:
+                    reached_known = True
+                    break
+                kept.append(bond)
+
+            self._merge(kept, delta)
+
+            if reached_known or len(rows) < self.page_size:
+                break
+            page_number += 1
+
+        dated = [bond for bond in self.bonds.values() if bond.get('PUBLIC_START_DATE')]
+        if dated:
+            newest = max(dated, key=bond_sort_key)
+            self.watermark = {
+                'PUBLIC_START_DATE': newest['PUBLIC_START_DATE'],
+                'SECURITY_CODE': newest['SECURITY_CODE']
+            }
+
+        self.save()
+        if self._index is not None:
+            self._index.update(delta)
+        return delta
@@ -4,12 +4,15 @@
 检查所有字段，看看是否有其他日期信息
 """
 
-import requests
+import argparse
 import json
+from itertools import islice
+
+from bond_cache import add_cache_arguments, configure_cache_from_args
+from eastmoney_api import ReportRowStream, fetch_report
 
 def check_all_fields():
     """检查所有字段，看看是否有其他日期信息"""
-    url = "https://datacenter-web.eastmoney.com/api/data/v1/get"
     params = {
         "reportName": "RPT_BOND_CB_LIST",
         "columns": "ALL",
@@ -19,13 +22,8 @@ def check_all_fields():
         "client": "WEB"
     }
     
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-    
-    response = requests.get(url, params=params, headers=headers, timeout=30)
-    response.raise_for_status()
-    
-    data = response.json()
-    bonds = data.get('result', {}).get('data', [])
+    # 只需要前3行就能看清字段，流式解析读到第3行就停止接收
+    bonds = list(islice(ReportRowStream(params), 3))
     
     if bonds:
         print("所有字段列表:")
@@ -49,7 +47,7 @@ def check_all_fields():
         print("\n查看几个债券的所有日期字段:")
         print("=" * 80)
         
-        for i, bond in enumerate(bonds[:3], 1):
+        for i, bond in enumerate(bonds, 1):
             print(f"\n债券 {i}: {bond.get('SECURITY_NAME_ABBR', 'N/A')}")
             for field in sorted(date_fields):
                 value = bond.get(field, '')
@@ -64,7 +62,6 @@ def check_new_bond_api():
     print("尝试新股申购API（可能包含可转债）")
     print("=" * 80)
     
-    url = "https://datacenter-web.eastmoney.com/api/data/v1/get"
     params = {
         "reportName": "RPT_NETHIS_BOND",
         "columns": "ALL",
@@ -74,13 +71,8 @@ def check_new_bond_api():
         "client": "WEB"
     }
     
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-    
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = fetch_report(params)
         print(f"响应状态: {data.get('success', 'N/A')}")
         print(f"消息: {data.get('message', 'N/A')}")
         
@@ -95,6 +87,10 @@ def check_new_bond_api():
         print(f"错误: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="检查所有字段，看看是否有其他日期信息")
+    add_cache_arguments(parser)
+    configure_cache_from_args(parser.parse_args())
+    
     try:
         check_all_fields()
         check_new_bond_api()
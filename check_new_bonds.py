@@ -3,18 +3,109 @@
 """
 可转债申购提醒脚本
 扫描当天是否有可申购的新债，并通过邮件/钉钉/微信等方式通知
+
+大部分日子没有新债、也不发通知，因此requests、smtplib、email、sqlite3、线程池等较重的模块
+都在用到的方法里才导入，休市日的运行只加载必需的模块；交易日需要请求接口，
+会加载requests和asyncio（见 check_startup_time.py --path holiday / trading）
 """
 
+from __future__ import annotations
+
+import argparse
+import contextvars
+import functools
 import json
 import os
 import sys
-from datetime import datetime, date
-from typing import List, Dict, Optional
+import time
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
+from typing import TYPE_CHECKING, Awaitable, Callable, Iterator, List, Dict, Optional, Set, Tuple, Union
+
+from bond_cache import add_cache_arguments, configure_cache_from_args, get_default_cache, track_cache_usage
+from bond_index import BondDateIndex
+from bond_record import Bond, as_bond, bond_to_dict
+from message_render import BondMessage, MessageContent, MessageItem, rich_variant
+from rate_limit import (DINGTALK_THROTTLE_CODES, WECHAT_WORK_THROTTLE_CODES, Throttled,
+                        check_webhook_response, get_default_limiter)
+from tracing import Tracer, bind_tracer, get_tracer, reset_tracer
+from trading_calendar import get_default_calendar
+
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+    from async_runner import BoundedRunner, PausableDeadline
+    from bond_cache import SnapshotCache
+    from bond_store import BondStore
+    from bond_sync import IncrementalSync
+    from http_session import HttpSessionManager
+    from smtp_session import SmtpSessionManager
+    from subscribers import Subscriber
 
-import requests
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import smtplib
+# 查询模式：filter=服务端按日期过滤，scan=拉取500条后本地筛选，
+# sync=增量同步到本地状态后在本地筛选，stream=边接收边解析、只保留匹配的行
+QUERY_MODE_FILTER = 'filter'
+QUERY_MODE_SCAN = 'scan'
+QUERY_MODE_SYNC = 'sync'
+QUERY_MODE_STREAM = 'stream'
+
+# 通知发送模式：concurrent=各渠道并发发送，sequential=逐个发送
+NOTIFY_MODE_CONCURRENT = 'concurrent'
+NOTIFY_MODE_SEQUENTIAL = 'sequential'
+# 单个渠道的超时时间（秒），同时用作HTTP/SMTP的socket超时
+DEFAULT_CHANNEL_TIMEOUT = 10
+# 所有渠道发送的总超时时间（秒）
+DEFAULT_NOTIFY_TIMEOUT = 30
+# 多订阅者分发时的默认并发数
+DEFAULT_SUBSCRIBER_WORKERS = 16
+
+# 对冲请求：主数据源超过其历史耗时的该百分位仍未返回时，同时请求备用数据源
+DEFAULT_HEDGE_PERCENTILE = 95
+# 历史耗时样本不足时使用的对冲等待时间（秒）
+DEFAULT_HEDGE_DELAY = 3
+SOURCE_EASTMONEY = 'eastmoney'
+SOURCE_JISILU = 'jisilu'
+
+
+def build_date_filter(start_date: str, end_date: str) -> str:
+    """
+    构造东方财富数据中心接口的申购日期过滤表达式
+    
+    Args:
+        start_date: 起始日期（格式：YYYY-MM-DD），包含
+        end_date: 结束日期（格式：YYYY-MM-DD），包含
+    
+    Returns:
+        str: 例如 (PUBLIC_START_DATE>='2026-01-16')(PUBLIC_START_DATE<'2026-01-17')
+    """
+    # PUBLIC_START_DATE是带时间的字段，用"小于次日"来覆盖结束日期当天
+    next_day = datetime.strptime(end_date, '%Y-%m-%d').date() + timedelta(days=1)
+    return (f"(PUBLIC_START_DATE>='{start_date}')"
+            f"(PUBLIC_START_DATE<'{next_day.strftime('%Y-%m-%d')}')")
+
+
+def filter_bonds_by_date(bonds: List[Dict], start_date: str, end_date: str) -> List[Dict]:
+    """
+    按申购日期筛选债券
+    
+    Args:
+        bonds: 东方财富返回的债券列表
+        start_date: 起始日期（格式：YYYY-MM-DD），包含
+        end_date: 结束日期（格式：YYYY-MM-DD），包含
+    
+    Returns:
+        List[Dict]: 申购日期落在范围内的债券
+    """
+    matched = []
+    for bond in bonds:
+        # PUBLIC_START_DATE格式: "2026-01-16 00:00:00"
+        public_start_date = bond.get('PUBLIC_START_DATE', '')
+        if public_start_date:
+            # 提取日期部分
+            apply_date = public_start_date.split(' ')[0]
+            if start_date <= apply_date <= end_date:
+                matched.append(bond)
+    return matched
 
 
 def is_weekday(check_date: str = None) -> bool:
@@ -38,13 +129,90 @@ def is_weekday(check_date: str = None) -> bool:
 
 
 class BondNotifier:
-    def __init__(self, check_date: str = None):
+    # 默认使用服务端过滤，被拒绝时自动回退到全量扫描
+    query_mode = QUERY_MODE_FILTER
+    _http: Optional[HttpSessionManager] = None
+    _owns_http = True
+    _cache: Optional[SnapshotCache] = None
+    _sync: Optional[IncrementalSync] = None
+    _bond_index: Optional[BondDateIndex] = None
+    _store: Optional[BondStore] = None
+    _smtp: Optional[SmtpSessionManager] = None
+    _hedges: Optional[List[ThreadPoolExecutor]] = None
+    use_store = True
+    notify_mode = NOTIFY_MODE_CONCURRENT
+    channel_timeout = DEFAULT_CHANNEL_TIMEOUT
+    notify_timeout = DEFAULT_NOTIFY_TIMEOUT
+    last_report: Optional[Dict] = None
+    fetch_error: Optional[str] = None
+    hedge = False
+    hedge_percentile = DEFAULT_HEDGE_PERCENTILE
+    hedge_delay = DEFAULT_HEDGE_DELAY
+    last_source: Optional[str] = None
+    tracer: Tracer = get_tracer()
+    trace_file: Optional[str] = None
+    metrics_file: Optional[str] = None
+    dedup = True
+    subscribers_file: Optional[str] = None
+    subscriber_workers = DEFAULT_SUBSCRIBER_WORKERS
+    _subscribers: Optional[List[Subscriber]] = None
+    
+    def __init__(self, check_date: str = None, query_mode: str = None,
+                 http: HttpSessionManager = None, cache: SnapshotCache = None,
+                 use_store: bool = True, subscribers_file: str = None, hedge: bool = None,
+                 trace_file: str = None, metrics_file: str = None, dedup: bool = None,
+                 syncer: IncrementalSync = None):
         """
         初始化债券通知器
         
         Args:
             check_date: 要检查的日期字符串（格式：YYYY-MM-DD），如果为None则使用今天
+            query_mode: 查询模式，filter（服务端过滤）、scan（全量扫描）、sync（增量同步）
+                        或 stream（流式解析），
+                        为None时读取环境变量 BOND_QUERY_MODE，默认filter
+            http: 共享的HTTP会话管理器，为None时在第一次请求时自行创建；
+                  传入时由调用方负责关闭，便于多个日期复用同一组连接
+            cache: 接口响应的快照缓存，为None时使用默认缓存
+            use_store: 是否把获取到的债券和运行结果写入本地SQLite库
+            subscribers_file: 订阅者配置（JSON或SQLite），为None时读取环境变量 SUBSCRIBERS_FILE；
+                              配置了订阅者时按订阅者分发，否则按环境变量中的单个接收方发送
+            hedge: 是否开启对冲请求（东方财富迟迟不返回时同时请求集思录，取先返回的结果），
+                   为None时读取环境变量 BOND_HEDGE
+            trace_file: 分阶段计时追加写入的JSONL文件，为None时读取环境变量 BOND_TRACE_FILE，
+                        都没有时只写入 bond_result.json 的 timings
+            metrics_file: 运行结束后写入的Prometheus指标文件（node_exporter textfile collector，
+                          以 .prom 结尾），为None时读取环境变量 BOND_METRICS_FILE
+            dedup: 是否按本地库中的投递记录跳过当天已经发送过的同一条消息，
+                   为None时读取环境变量 NOTIFY_DEDUP（默认开启）；use_store为False时不生效
+            syncer: 增量同步模式使用的同步器，为None时第一次同步时自行创建；
+                    常驻模式在多次扫描之间共用，本地状态和日期索引只建立一次
         """
+        self.query_mode = query_mode or os.getenv('BOND_QUERY_MODE', QUERY_MODE_FILTER)
+        self._http = http
+        self._owns_http = http is None
+        self._cache = cache
+        self._sync = syncer
+        self.use_store = use_store
+        
+        # 通知发送配置
+        self.notify_mode = os.getenv('NOTIFY_MODE', NOTIFY_MODE_CONCURRENT)
+        self.channel_timeout = float(os.getenv('NOTIFY_CHANNEL_TIMEOUT', str(DEFAULT_CHANNEL_TIMEOUT)))
+        self.notify_timeout = float(os.getenv('NOTIFY_TOTAL_TIMEOUT', str(DEFAULT_NOTIFY_TIMEOUT)))
+        self.subscribers_file = subscribers_file or os.getenv('SUBSCRIBERS_FILE')
+        self.subscriber_workers = int(os.getenv('SUBSCRIBER_WORKERS', str(DEFAULT_SUBSCRIBER_WORKERS)))
+        if dedup is None:
+            dedup = os.getenv('NOTIFY_DEDUP', 'true').lower() not in ('0', 'false', 'no')
+        self.dedup = dedup
+        
+        # 对冲请求配置
+        if hedge is None:
+            hedge = os.getenv('BOND_HEDGE', '').lower() in ('1', 'true', 'yes')
+        self.hedge = hedge
+        self.hedge_percentile = float(os.getenv('BOND_HEDGE_PERCENTILE', str(DEFAULT_HEDGE_PERCENTILE)))
+        self.hedge_delay = float(os.getenv('BOND_HEDGE_DELAY', str(DEFAULT_HEDGE_DELAY)))
+        self.trace_file = trace_file or os.getenv('BOND_TRACE_FILE')
+        self.metrics_file = metrics_file or os.getenv('BOND_METRICS_FILE')
+        
         if check_date:
             self.today = check_date
         else:
@@ -53,126 +221,497 @@ class BondNotifier:
         # 判断是否是工作日
         self.is_weekday = is_weekday(self.today)
         print(f"开始扫描 {self.today} 的可转债申购信息...")
-        print(f"日期类型: {'工作日' if self.is_weekday else '周末'}")
-        
-    def fetch_bond_data(self) -> List[Dict]:
-        """从东方财富网获取可转债申购数据"""
+        print(f"日期类型: {'交易日' if self.is_trading_day else '休市日'}")
+    
+    @property
+    def is_trading_day(self) -> bool:
+        """检查日期是否沪深交易所交易日（排除周末和节假日）"""
+        return get_default_calendar().is_trading_day(self.today)
+    
+    @property
+    def http(self) -> HttpSessionManager:
+        """数据获取和所有Webhook共用的HTTP会话"""
+        if self._http is None:
+            from http_session import HttpSessionManager
+            self._http = HttpSessionManager()
+            self._owns_http = True
+        return self._http
+    
+    @property
+    def smtp(self) -> SmtpSessionManager:
+        """所有邮件共用的SMTP会话，登录一次后连续发送"""
+        if self._smtp is None:
+            from smtp_session import SmtpSessionManager
+            smtp = SmtpSessionManager()
+            # SMTP_TIMEOUT 不超过单渠道超时，超时的渠道不会一直占着线程
+            smtp.timeout = min(smtp.timeout, self.channel_timeout)
+            self._smtp = smtp
+        return self._smtp
+    
+    @property
+    def cache(self) -> SnapshotCache:
+        """接口响应的快照缓存"""
+        return self._cache if self._cache is not None else get_default_cache()
+    
+    @property
+    def syncer(self) -> IncrementalSync:
+        """增量同步器，本地状态在多次查询之间复用"""
+        if self._sync is None:
+            from bond_sync import IncrementalSync
+            self._sync = IncrementalSync(http=self.http, cache=self.cache)
+        return self._sync
+    
+    @property
+    def store(self) -> BondStore:
+        """本地SQLite库"""
+        if self._store is None:
+            from bond_store import BondStore
+            self._store = BondStore()
+        return self._store
+    
+    def save_to_store(self, bonds: List[Bond]):
+        """把获取到的债券写入本地库，写入失败不影响主流程"""
+        if not self.use_store or not bonds:
+            return
         try:
-            # 东方财富可转债列表API
-            url = "https://datacenter-web.eastmoney.com/api/data/v1/get"
-            params = {
-                "reportName": "RPT_BOND_CB_LIST",
-                "columns": "SECURITY_CODE,SECURITY_NAME_ABBR,PUBLIC_START_DATE,CORRECODE",
-                "pageSize": "500",
-                "pageNumber": "1",
-                "sortColumns": "PUBLIC_START_DATE,SECURITY_CODE",
-                "sortTypes": "-1,-1",
-                "source": "WEB",
-                "client": "WEB"
-            }
-            
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            }
-            
-            response = requests.get(url, params=params, headers=headers, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            if data.get("result") and data["result"].get("data"):
-                all_bonds = data["result"]["data"]
-                
-                # 筛选申购日期为今天的债券
-                today_bonds = []
-                for bond in all_bonds:
-                    # PUBLIC_START_DATE格式: "2026-01-16 00:00:00"
-                    public_start_date = bond.get('PUBLIC_START_DATE', '')
-                    if public_start_date:
-                        # 提取日期部分
-                        apply_date = public_start_date.split(' ')[0]
-                        if apply_date == self.today:
-                            today_bonds.append(bond)
-                
-                return today_bonds
-            
+            self.store.upsert_bonds(bonds)
+        except Exception as e:
+            print(f"写入本地库失败: {e}")
+    
+    def close(self):
+        """
+        关闭自行创建的HTTP会话、SMTP会话和本地库连接
+
+        先等对冲请求中较慢的数据源结束：它还在使用HTTP会话，成功时还会写入本地库
+        """
+        if self._hedges:
+            for executor in self._hedges:
+                executor.shutdown(wait=True)
+            self._hedges = None
+        if self._http is not None and self._owns_http:
+            self._http.close()
+            self._http = None
+        if self._smtp is not None:
+            self._smtp.close()
+            self._smtp = None
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _request_bond_list(self, params: Dict) -> Dict:
+        """请求东方财富可转债列表接口（经过快照缓存），返回解析后的JSON"""
+        from eastmoney_api import fetch_report
+        return fetch_report(params, http=self.http, cache=self.cache)
+    
+    def fetch_bond_data_filtered(self, start_date: str, end_date: str) -> Optional[List[Bond]]:
+        """
+        服务端过滤：把申购日期范围作为filter表达式发给接口，只返回匹配的记录
+        
+        Args:
+            start_date: 起始日期（格式：YYYY-MM-DD）
+            end_date: 结束日期（格式：YYYY-MM-DD）
+        
+        Returns:
+            Optional[List[Bond]]: 匹配的债券列表；如果接口拒绝了过滤条件则返回None
+        """
+        from eastmoney_api import bond_list_params
+        params = bond_list_params(filter=build_date_filter(start_date, end_date))
+        
+        data = self._request_bond_list(params)
+        if data.get("result") and data["result"].get("data"):
+            # 再按日期校验一遍，防止接口忽略了filter而返回全量数据
+            with get_tracer().span('filter', rows=len(data["result"]["data"])) as span:
+                rows = filter_bonds_by_date(data["result"]["data"], start_date, end_date)
+                bonds = [Bond.from_dict(row) for row in rows]
+                span['matched'] = len(bonds)
+            self.save_to_store(bonds)
+            return bonds
+        
+        from eastmoney_api import EASTMONEY_EMPTY_RESULT_CODE
+        if data.get("code") == EASTMONEY_EMPTY_RESULT_CODE:
+            # 过滤条件合法，只是当天没有记录
             return []
+        
+        print(f"服务端过滤被拒绝: code={data.get('code')}, message={data.get('message')}")
+        return None
+    
+    def fetch_bond_data_full_scan(self, start_date: str, end_date: str) -> List[Bond]:
+        """
+        全量扫描：拉取最近500条记录后在本地按申购日期筛选
+        
+        Args:
+            start_date: 起始日期（格式：YYYY-MM-DD）
+            end_date: 结束日期（格式：YYYY-MM-DD）
+        
+        Returns:
+            List[Bond]: 匹配的债券列表
+        """
+        index = self.load_bond_index()
+        with get_tracer().span('filter', rows=len(index)) as span:
+            bonds = index.between(start_date, end_date)
+            span['matched'] = len(bonds)
+        return bonds
+    
+    def fetch_bond_data_streaming(self, start_date: str, end_date: str) -> List[Bond]:
+        """
+        流式扫描：拉取最近500条记录，边接收边解析，只保留申购日期在范围内的行
+        
+        Args:
+            start_date: 起始日期（格式：YYYY-MM-DD）
+            end_date: 结束日期（格式：YYYY-MM-DD）
+        
+        Returns:
+            List[Bond]: 匹配的债券列表
+        """
+        from eastmoney_api import BOND_LIST_COLUMNS, ReportRowStream, bond_list_params
+        stream = ReportRowStream(bond_list_params(), columns=BOND_LIST_COLUMNS.split(','),
+                                 start_date=start_date, end_date=end_date,
+                                 http=self.http, cache=self.cache)
+        bonds = [Bond.from_dict(row) for row in stream]
+        print(f"流式解析: 扫描 {stream.rows_scanned} 行，匹配 {stream.rows_matched} 行，"
+              f"接收 {stream.bytes_read} 字节")
+        self.save_to_store(bonds)
+        return bonds
+    
+    def sync_bonds(self) -> List[Bond]:
+        """
+        增量同步一次，只把新增或有变化的记录写入本地库
+        
+        Returns:
+            List[Bond]: 本次新增或有变化的记录
+        """
+        delta = [as_bond(bond) for bond in self.syncer.sync()]
+        print(f"增量同步完成: 新增/变化 {len(delta)} 条，请求 {self.syncer.pages_fetched} 页")
+        self.save_to_store(delta)
+        return delta
+    
+    def fetch_bond_history(self) -> List[Dict]:
+        """
+        获取用于建立日期索引的债券列表
+        增量同步模式下先同步再取本地状态，其他模式取最近500条记录
+        """
+        if self.query_mode == QUERY_MODE_SYNC:
+            self.sync_bonds()
+            return list(self.syncer.bonds.values())
+        
+        from eastmoney_api import bond_list_params, check_report
+        data = self._request_bond_list(bond_list_params())
+        if data.get("result") and data["result"].get("data"):
+            return data["result"]["data"]
+        
+        # 接口返回错误时不能当作"没有记录"
+        check_report(data)
+        return []
+    
+    def load_bond_index(self, bonds: List[Union[Bond, Dict]] = None) -> BondDateIndex:
+        """
+        建立（或重建）申购日期索引
+        
+        增量同步模式下不重建：同步器维护的索引只合并本次新增或有变化的记录
+        
+        Args:
+            bonds: 要建立索引的债券列表，为None时调用fetch_bond_history获取
+        """
+        if bonds is None and self.query_mode == QUERY_MODE_SYNC:
+            delta = self.sync_bonds()
+            with get_tracer().span('index', delta=len(delta)) as span:
+                self._bond_index = self.syncer.index
+                span['rows'] = len(self._bond_index)
+            return self._bond_index
+        if bonds is None:
+            bonds = [as_bond(bond) for bond in self.fetch_bond_history()]
+            self.save_to_store(bonds)
+        with get_tracer().span('index', rows=len(bonds)):
+            self._bond_index = BondDateIndex(bonds)
+        return self._bond_index
+    
+    @property
+    def bond_index(self) -> BondDateIndex:
+        """申购日期索引，第一次使用时获取数据并建立，之后的查询不再访问网络"""
+        if self._bond_index is None:
+            self.load_bond_index()
+        return self._bond_index
+    
+    def bonds_on(self, apply_date: str) -> List[Bond]:
+        """
+        查询某一天申购的债券
+        
+        Args:
+            apply_date: 日期字符串（格式：YYYY-MM-DD）
+        """
+        return self.bond_index.on(apply_date)
+    
+    def bonds_between(self, start_date: str, end_date: str) -> List[Bond]:
+        """
+        查询日期范围内申购的债券，按申购日期升序
+        
+        Args:
+            start_date: 起始日期（格式：YYYY-MM-DD），包含
+            end_date: 结束日期（格式：YYYY-MM-DD），包含
+        """
+        return self.bond_index.between(start_date, end_date)
+    
+    def bonds_in_month(self, year_month: str) -> List[Bond]:
+        """
+        查询某个月申购的债券
+        
+        Args:
+            year_month: 年月字符串（格式：YYYY-MM）
+        """
+        return self.bond_index.in_month(year_month)
+    
+    def fetch_bonds_between(self, start_date: str, end_date: str) -> List[Bond]:
+        """
+        按当前查询模式获取申购日期在范围内的债券（一次请求覆盖整个范围）
+        
+        Args:
+            start_date: 起始日期（格式：YYYY-MM-DD）
+            end_date: 结束日期（格式：YYYY-MM-DD）
+        """
+        if self.query_mode == QUERY_MODE_SYNC:
+            return self.load_bond_index().between(start_date, end_date)
+        
+        if self.query_mode == QUERY_MODE_STREAM:
+            return self.fetch_bond_data_streaming(start_date, end_date)
+        
+        if self.query_mode == QUERY_MODE_FILTER:
+            bonds = self.fetch_bond_data_filtered(start_date, end_date)
+            if bonds is not None:
+                return bonds
+            print("回退到全量扫描...")
+        
+        return self.fetch_bond_data_full_scan(start_date, end_date)
+    
+    def fetch_bond_data(self) -> List[Bond]:
+        """
+        从东方财富网获取可转债申购数据
+        
+        临时故障已经在请求层重试过；仍然失败时返回空列表并把错误记录在 fetch_error，
+        run() 据此区分"今日无申购"和"数据获取失败"
+        """
+        self.fetch_error = None
+        try:
+            return self.fetch_bonds(self.today, self.today)
             
         except Exception as e:
+            self.fetch_error = f"{type(e).__name__}: {e}"
             print(f"获取数据失败: {e}")
             import traceback
             traceback.print_exc()
             return []
     
-    def fetch_bond_data_alternative(self) -> List[Dict]:
-        """备用数据源：集思录"""
+    def upcoming_dates(self, days: int) -> List[str]:
+        """
+        从今天开始的N个交易日（今天休市时从下一个交易日开始）
+        
+        Args:
+            days: 交易日数量
+        """
+        return get_default_calendar().trading_days(self.today, days)
+    
+    def fetch_bonds_ahead(self, days: int) -> Dict[str, List[Bond]]:
+        """
+        前瞻查询：一次请求取回未来N个交易日的申购，再按日期分组
+        
+        Args:
+            days: 交易日数量
+        
+        Returns:
+            Dict[str, List[Bond]]: 日期 -> 当天申购的债券（每个交易日都有键，没有申购时为空列表）
+        """
+        dates = self.upcoming_dates(days)
+        self.fetch_error = None
         try:
-            url = "https://www.jisilu.cn/data/cbnew/cb_list/"
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                "Referer": "https://www.jisilu.cn/"
-            }
-            
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            
-            # 这里简化处理，实际使用时需要解析HTML或找到API接口
-            # 由于集思录可能有反爬机制，建议使用东方财富为主
-            return []
+            bonds = self.fetch_bonds(dates[0], dates[-1])
+        except Exception as e:
+            self.fetch_error = f"{type(e).__name__}: {e}"
+            print(f"获取数据失败: {e}")
+            import traceback
+            traceback.print_exc()
+            bonds = []
+        
+        index = BondDateIndex(bonds)
+        return {date_str: index.on(date_str) for date_str in dates}
+    
+    def fetch_bond_data_alternative(self, start_date: str = None, end_date: str = None) -> List[Bond]:
+        """
+        备用数据源：集思录待发转债列表，转换为和东方财富相同的字段
+        
+        Args:
+            start_date: 起始日期（格式：YYYY-MM-DD），为None时使用检查日期
+            end_date: 结束日期（格式：YYYY-MM-DD），为None时与起始日期相同
+        """
+        start_date = start_date or self.today
+        end_date = end_date or start_date
+        try:
+            return self.fetch_bonds_from_jisilu(start_date, end_date)
             
         except Exception as e:
             print(f"备用数据源获取失败: {e}")
             return []
     
-    def format_bond_message(self, bonds: List[Dict]) -> str:
-        """格式化债券信息为消息内容"""
-        if not bonds:
-            return f"📊 {self.today} 今日无可转债申购"
+    def fetch_bonds_from_jisilu(self, start_date: str, end_date: str) -> List[Bond]:
+        """从集思录获取申购日期在范围内的债券并写入本地库，失败时抛出异常"""
+        import jisilu_api
+        rows = jisilu_api.fetch_bonds_between(start_date, end_date, http=self.http)
+        bonds = [Bond.from_dict(row) for row in rows]
+        self.save_to_store(bonds)
+        return bonds
+    
+    def _timed_fetch(self, source: str, fetch: Callable[[], List[Bond]]) -> List[Bond]:
+        """调用一个数据源，成功时把耗时写入本地库，作为对冲等待时间的依据"""
+        start = time.perf_counter()
+        with track_cache_usage() as usage:
+            bonds = fetch()
+        # 命中快照缓存的耗时不代表数据源的真实延迟
+        if self.use_store and not usage.hits:
+            try:
+                self.store.record_latency(source, (time.perf_counter() - start) * 1000)
+            except Exception as e:
+                print(f"记录请求耗时失败: {e}")
+        return bonds
+    
+    def hedge_wait(self) -> float:
+        """对冲等待时间（秒）：东方财富历史耗时的百分位数，样本不足时使用 BOND_HEDGE_DELAY"""
+        if self.use_store:
+            try:
+                latency_ms = self.store.latency_percentile(SOURCE_EASTMONEY, self.hedge_percentile)
+                if latency_ms is not None:
+                    return latency_ms / 1000
+            except Exception as e:
+                print(f"读取请求耗时失败: {e}")
+        return self.hedge_delay
+    
+    def fetch_bonds_hedged(self, start_date: str, end_date: str) -> List[Bond]:
+        """
+        对冲请求：先请求东方财富，超过对冲等待时间仍未返回时同时请求集思录，取先成功返回的结果
         
-        message = f"🎉 {self.today} 今日有 {len(bonds)} 只可转债可申购！\n\n"
+        早上运行的尾延迟取决于较快的数据源，而不是30秒超时；两个数据源都失败时抛出东方财富的异常
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
         
-        for i, bond in enumerate(bonds, 1):
-            bond_code = bond.get('SECURITY_CODE', 'N/A')
-            bond_name = bond.get('SECURITY_NAME_ABBR', 'N/A')
-            apply_code = bond.get('CORRECODE', 'N/A')
-            apply_date = bond.get('PUBLIC_START_DATE', 'N/A')
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hedge")
+        # 较慢的数据源在close()时再等待结束，见close()
+        if self._hedges is None:
+            self._hedges = []
+        self._hedges.append(executor)
+        # 每次提交复制一份当前上下文，线程里的请求也记入本次运行的分阶段计时
+        futures = {
+            executor.submit(contextvars.copy_context().run, self._timed_fetch, SOURCE_EASTMONEY,
+                            lambda: self.fetch_bonds_between(start_date, end_date)): SOURCE_EASTMONEY
+        }
+        try:
+            delay = self.hedge_wait()
+            done, _ = wait(futures, timeout=delay)
+            if not done or next(iter(done)).exception() is not None:
+                print(f"东方财富 {delay:.2f} 秒内没有返回，同时请求集思录...")
+                futures[executor.submit(contextvars.copy_context().run, self._timed_fetch, SOURCE_JISILU,
+                                        lambda: self.fetch_bonds_from_jisilu(start_date, end_date))] = SOURCE_JISILU
             
-            message += f"{i}. {bond_name} ({bond_code})\n"
-            if apply_code and apply_code != 'N/A':
-                message += f"   申购代码: {apply_code}\n"
-            if apply_date and apply_date != 'N/A':
-                # 只显示日期部分
-                date_only = apply_date.split(' ')[0] if ' ' in apply_date else apply_date
-                message += f"   申购日期: {date_only}\n"
-        
-        message += "\n记得今日申购哦！💰"
-        return message
-    
-    def send_email(self, message: str) -> bool:
-        """发送邮件通知"""
+            pending = set(futures)
+            errors = {}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source = futures[future]
+                    if future.exception() is None:
+                        self.last_source = source
+                        print(f"使用 {source} 的数据")
+                        return future.result()
+                    errors[source] = future.exception()
+                    print(f"{source} 获取失败: {errors[source]}")
+            raise errors.get(SOURCE_EASTMONEY) or next(iter(errors.values()))
+        finally:
+            # 不等待较慢的数据源，本次查询直接返回；close()时再等它结束
+            executor.shutdown(wait=False)
+    
+    def fetch_bonds(self, start_date: str, end_date: str) -> List[Bond]:
+        """按配置获取申购日期在范围内的债券：开启对冲时走对冲请求，否则只请求东方财富"""
+        if self.hedge:
+            return self.fetch_bonds_hedged(start_date, end_date)
+        self.last_source = SOURCE_EASTMONEY
+        return self._timed_fetch(SOURCE_EASTMONEY, lambda: self.fetch_bonds_between(start_date, end_date))
+    
+    @staticmethod
+    def _message_item(bond: Union[Bond, Dict], with_date: bool = True) -> MessageItem:
+        bond = as_bond(bond)
+        return MessageItem(bond.name or 'N/A', bond.code or 'N/A', bond.apply_code or '',
+                           # 只显示日期部分
+                           bond.apply_date if with_date and bond.apply_ordinal else '')
+    
+    def format_bond_message(self, bonds: List[Union[Bond, Dict]]) -> BondMessage:
+        """
+        格式化债券信息为消息内容
+        
+        Returns:
+            BondMessage: 纯文本消息，发送时各渠道再取各自格式（Markdown / HTML）的渲染结果
+        """
+        if not bonds:
+            return BondMessage(MessageContent(f"📊 {self.today} 今日无可转债申购"))
+        
+        items = tuple(self._message_item(bond) for bond in bonds)
+        return BondMessage(MessageContent(
+            f"🎉 {self.today} 今日有 {len(bonds)} 只可转债可申购！",
+            (('', items),),
+            "记得今日申购哦！💰"
+        ))
+    
+    def format_digest_message(self, bonds_by_date: Dict[str, List[Bond]]) -> BondMessage:
+        """格式化前瞻查询的汇总消息：按日期列出未来几个交易日的申购"""
+        days = len(bonds_by_date)
+        total = sum(len(bonds) for bonds in bonds_by_date.values())
+        if not total:
+            return BondMessage(MessageContent(f"📊 {self.today} 起 {days} 个交易日无可转债申购"))
+        
+        sections = tuple(
+            (f"{date_str}（今日）" if date_str == self.today else date_str,
+             tuple(self._message_item(bond, with_date=False) for bond in bonds))
+            for date_str, bonds in bonds_by_date.items() if bonds
+        )
+        return BondMessage(MessageContent(
+            f"📅 {self.today} 起 {days} 个交易日共有 {total} 只可转债可申购！",
+            sections,
+            "记得按时申购哦！💰"
+        ))
+    
+    def send_email(self, message: str, receiver_email: str = None) -> bool:
+        """
+        发送邮件通知
+        
+        Args:
+            message: 消息内容
+            receiver_email: 收件人，为None时读取环境变量 RECEIVER_EMAIL
+        """
         try:
-            smtp_host = os.getenv('SMTP_HOST', 'smtp.gmail.com')
-            smtp_port = int(os.getenv('SMTP_PORT', '587'))
-            sender_email = os.getenv('SENDER_EMAIL')
-            sender_password = os.getenv('SENDER_PASSWORD')
-            receiver_email = os.getenv('RECEIVER_EMAIL')
+            sender_email = self.smtp.user
+            receiver_email = receiver_email or os.getenv('RECEIVER_EMAIL')
             
-            if not all([sender_email, sender_password, receiver_email]):
+            if not (self.smtp.configured and receiver_email):
                 print("邮件配置不完整，跳过邮件发送")
                 return False
             
-            msg = MIMEMultipart()
+            from email.mime.multipart import MIMEMultipart
+            from email.mime.text import MIMEText
+            
+            # 同时带纯文本和HTML，不显示HTML的客户端退回纯文本
+            html = rich_variant(message, 'email')
+            msg = MIMEMultipart('alternative' if html else 'mixed')
             msg['From'] = sender_email
             msg['To'] = receiver_email
             msg['Subject'] = f"可转债申购提醒 - {self.today}"
             
             msg.attach(MIMEText(message, 'plain', 'utf-8'))
+            if html:
+                msg.attach(MIMEText(html, 'html', 'utf-8'))
             
-            server = smtplib.SMTP(smtp_host, smtp_port)
-            server.starttls()
-            server.login(sender_email, sender_password)
-            text = msg.as_string()
-            server.sendmail(sender_email, receiver_email, text)
-            server.quit()
+            # 复用已登录的会话，多个收件人只握手一次
+            self.smtp.sendmail(sender_email, receiver_email, msg.as_string())
             
             print("邮件发送成功！")
             return True
@@ -181,60 +720,112 @@ class BondNotifier:
             print(f"邮件发送失败: {e}")
             return False
     
-    def send_dingtalk(self, message: str) -> bool:
-        """发送钉钉通知"""
+    def send_dingtalk(self, message: str, webhook_url: str = None) -> bool:
+        """
+        发送钉钉通知
+        
+        Args:
+            message: 消息内容
+            webhook_url: 机器人Webhook，为None时读取环境变量 DINGTALK_WEBHOOK
+        
+        Raises:
+            Throttled: 触发了渠道的频率限制，由调用方退避后重新发送
+        """
         try:
-            webhook_url = os.getenv('DINGTALK_WEBHOOK')
+            webhook_url = webhook_url or os.getenv('DINGTALK_WEBHOOK')
             if not webhook_url:
                 print("钉钉配置不完整，跳过钉钉发送")
                 return False
             
-            data = {
-                "msgtype": "text",
-                "text": {
-                    "content": message
+            markdown = rich_variant(message, 'dingtalk')
+            if markdown:
+                data = {
+                    "msgtype": "markdown",
+                    "markdown": {
+                        "title": message.content.title,
+                        "text": markdown
+                    }
+                }
+            else:
+                data = {
+                    "msgtype": "text",
+                    "text": {
+                        "content": message
+                    }
                 }
-            }
             
-            response = requests.post(webhook_url, json=data, timeout=10)
-            response.raise_for_status()
+            response = self.http.post(webhook_url, json=data, timeout=self.channel_timeout)
+            check_webhook_response(response, 'errcode', DINGTALK_THROTTLE_CODES)
             
             print("钉钉通知发送成功！")
             return True
             
+        except Throttled as e:
+            print(f"钉钉触发限流: {e}")
+            raise
         except Exception as e:
             print(f"钉钉发送失败: {e}")
             return False
     
-    def send_wechat_work(self, message: str) -> bool:
-        """发送企业微信通知"""
+    def send_wechat_work(self, message: str, webhook_url: str = None) -> bool:
+        """
+        发送企业微信通知
+        
+        Args:
+            message: 消息内容
+            webhook_url: 机器人Webhook，为None时读取环境变量 WECHAT_WORK_WEBHOOK
+        
+        Raises:
+            Throttled: 触发了渠道的频率限制，由调用方退避后重新发送
+        """
         try:
-            webhook_url = os.getenv('WECHAT_WORK_WEBHOOK')
+            webhook_url = webhook_url or os.getenv('WECHAT_WORK_WEBHOOK')
             if not webhook_url:
                 print("企业微信配置不完整，跳过企业微信发送")
                 return False
             
-            data = {
-                "msgtype": "text",
-                "text": {
-                    "content": message
+            markdown = rich_variant(message, 'wechat_work')
+            if markdown:
+                data = {
+                    "msgtype": "markdown",
+                    "markdown": {
+                        "content": markdown
+                    }
+                }
+            else:
+                data = {
+                    "msgtype": "text",
+                    "text": {
+                        "content": message
+                    }
                 }
-            }
             
-            response = requests.post(webhook_url, json=data, timeout=10)
-            response.raise_for_status()
+            response = self.http.post(webhook_url, json=data, timeout=self.channel_timeout)
+            check_webhook_response(response, 'errcode', WECHAT_WORK_THROTTLE_CODES)
             
             print("企业微信通知发送成功！")
             return True
             
+        except Throttled as e:
+            print(f"企业微信触发限流: {e}")
+            raise
         except Exception as e:
             print(f"企业微信发送失败: {e}")
             return False
     
-    def send_server_chan(self, message: str) -> bool:
-        """发送Server酱通知"""
+    def send_server_chan(self, message: str, send_key: str = None) -> bool:
+        """
+        发送Server酱通知
+        
+        Args:
+            message: 消息内容
+            send_key: SendKey，为None时读取环境变量 SERVERCHAN_SENDKEY
+        
+        Raises:
+            Throttled: 触发了渠道的频率限制，由调用方退避后重新发送
+        """
         try:
-            send_key = os.getenv('SERVERCHAN_SENDKEY')
+            send_key = send_key or os.getenv('SERVERCHAN_SENDKEY')
             if not send_key:
                 print("Server酱配置不完整，跳过发送")
                 return False
@@ -242,86 +833,643 @@ class BondNotifier:
             url = f"https://sctapi.ftqq.com/{send_key}.send"
             data = {
                 "title": f"可转债申购提醒 - {self.today}",
-                "desp": message
+                "desp": rich_variant(message, 'server_chan') or message
             }
             
-            response = requests.post(url, data=data, timeout=10)
-            response.raise_for_status()
+            response = self.http.post(url, data=data, timeout=self.channel_timeout)
+            check_webhook_response(response, 'code')
             
             print("Server酱通知发送成功！")
             return True
             
+        except Throttled as e:
+            print(f"Server酱触发限流: {e}")
+            raise
         except Exception as e:
             print(f"Server酱发送失败: {e}")
             return False
     
-    def send_notifications(self, message: str):
-        """发送所有配置的通知"""
+    def notification_channels(self) -> Dict[str, Callable[[str], bool]]:
+        """所有通知渠道：渠道名 -> 发送函数"""
+        return {
+            "email": self.send_email,
+            "dingtalk": self.send_dingtalk,
+            "wechat_work": self.send_wechat_work,
+            "server_chan": self.send_server_chan,
+        }
+    
+    def channel_targets(self) -> Dict[str, Optional[str]]:
+        """各通知渠道配置的接收方（用于投递记录）"""
+        return {
+            "email": os.getenv('RECEIVER_EMAIL'),
+            "dingtalk": os.getenv('DINGTALK_WEBHOOK'),
+            "wechat_work": os.getenv('WECHAT_WORK_WEBHOOK'),
+            "server_chan": os.getenv('SERVERCHAN_SENDKEY'),
+        }
+    
+    def delivered_before(self, message: str) -> Tuple[Optional[str], Set[Tuple[str, str]]]:
+        """
+        查询当天这条消息已经投递过的接收方
+        
+        Returns:
+            Tuple: (消息哈希, {(渠道, 接收方哈希)})；不去重时消息哈希为None
+        """
+        if not (self.use_store and self.dedup):
+            return None, set()
+        from bond_store import digest
+        message_hash = digest(message)
+        try:
+            return message_hash, self.store.delivered(self.today, message_hash)
+        except Exception as e:
+            # 读不到投递记录时宁可重复发送，也不能漏发
+            print(f"读取投递记录失败: {e}")
+            return message_hash, set()
+    
+    def _deliver_once(self, send_func: Callable[[str], bool], channel: str, recipient: str,
+                      message_hash: Optional[str]) -> Callable[[str], bool]:
+        """包装发送函数：发送成功后立即写入投递记录，之后的重复运行会跳过这个接收方"""
+        if message_hash is None:
+            return send_func
+        
+        def send(message: str) -> bool:
+            sent = send_func(message)
+            if sent:
+                try:
+                    self.store.record_delivery(self.today, channel, recipient, message_hash)
+                except Exception as e:
+                    print(f"写入投递记录失败（{channel}）: {e}")
+            return sent
+        return send
+    
+    def _send_timed(self, send_func: Callable[[str], bool], message: str, name: str = 'send') -> Dict:
+        """调用一个渠道的发送函数，记录结果和耗时（同时记入当前运行的分阶段计时）"""
+        start = time.perf_counter()
+        retry_after = None
+        try:
+            status = "sent" if send_func(message) else "failed"
+            error = None
+        except Throttled as e:
+            # 渠道返回了限流响应，由调用方退避后重新排队
+            status = "throttled"
+            error = str(e)
+            retry_after = e.retry_after
+        except Exception as e:
+            status = "error"
+            error = str(e)
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        get_tracer().record(name, elapsed_ms, start, status=status)
+        report = {
+            "status": status,
+            "latency_ms": round(elapsed_ms, 1)
+        }
+        if error:
+            report["error"] = error
+        if retry_after is not None:
+            report["retry_after"] = retry_after
+        return report
+    
+    async def _send_async(self, runner: BoundedRunner, send_func: Callable[[str], bool], message: str,
+                          channel: str, timeout: float = None, target: str = None,
+                          deadline: PausableDeadline = None) -> Dict:
+        """
+        在调度器的线程池中发送一次，超时未返回时记为timeout，不再等待
+        
+        发送前按 target（Webhook地址或SendKey）的配额排队，排队在事件循环中等待，不占用线程池；
+        渠道返回限流响应时整个配额退避后重新排队，最多 RATE_LIMIT_RETRIES 次。
+        需要排队超过 RATE_LIMIT_MAX_WAIT 秒时不再发送，记为rate_limited。
+        排队和退避的时间不计入总超时 deadline
+        """
+        import asyncio
+        
+        limiter = get_default_limiter()
+        queued = 0.0
+        for _ in range(limiter.retries + 1):
+            if deadline is not None:
+                async with deadline.paused():
+                    waited = await limiter.wait_turn(channel, target)
+            else:
+                waited = await limiter.wait_turn(channel, target)
+            if waited is None:
+                report = {"status": "rate_limited", "latency_ms": 0.0}
+                break
+            queued += waited
+            
+            start = time.perf_counter()
+            try:
+                report = await runner.call(self._send_timed, send_func, message, f"send:{channel}",
+                                           timeout=timeout)
+            except asyncio.TimeoutError:
+                # 不等待超时的渠道，它们的socket超时到期后线程会自行结束
+                report = {
+                    "status": "timeout",
+                    "latency_ms": round((time.perf_counter() - start) * 1000, 1)
+                }
+            if report["status"] != "throttled":
+                break
+            limiter.backoff(channel, target, report.get("retry_after"))
+        
+        if queued:
+            report["queued_ms"] = round(queued * 1000, 1)
+        return report
+    
+    async def _send_within_deadline(self, sends: Dict[str, Callable[..., Awaitable[Dict]]],
+                                    sequential: bool = False) -> Dict[str, Dict]:
+        """
+        在总超时 notify_timeout 内执行一组发送
+        
+        限流排队和退避的时间不计入总超时：只有所有未完成的发送都在排队时才暂停计时，
+        超出配额的发送按配额速率陆续发出，限流后的重试也不会被总超时截断
+        （排队时长另由 RATE_LIMIT_MAX_WAIT 限制）
+        
+        Args:
+            sends: 标识 -> 发送协程的工厂，以关键字参数 deadline 调用
+                   （逐个发送时还没轮到的发送不会创建协程）
+            sequential: 为True时逐个发送，否则并发发送
+        
+        Returns:
+            Dict[str, Dict]: 标识 -> 发送结果；到期时还没完成的发送记为timeout，
+                             latency_ms 为它已经进行的时间（还没开始的为0）
+        """
+        import asyncio
+        from async_runner import PausableDeadline, gather_all
+        
+        results: Dict[str, Dict] = {}
+        started: Dict[str, float] = {}
+        deadline = PausableDeadline(self.notify_timeout)
+        
+        async def send(key: str, make_send: Callable[..., Awaitable[Dict]]):
+            started[key] = time.perf_counter()
+            async with deadline.track():
+                results[key] = await make_send(deadline=deadline)
+        
+        async def send_all():
+            if sequential:
+                for key, make_send in sends.items():
+                    await send(key, make_send)
+            else:
+                await gather_all(send(key, make_send) for key, make_send in sends.items())
+        
+        try:
+            await deadline.wait(send_all())
+        except asyncio.TimeoutError:
+            # 还在进行的发送已被取消，它们的socket超时到期后线程会自行结束
+            now = time.perf_counter()
+            print(f"通知发送超过总超时 {self.notify_timeout:g} 秒，未完成的发送记为timeout")
+            for key in sends:
+                if key not in results:
+                    results[key] = {
+                        "status": "timeout",
+                        "latency_ms": round((now - started[key]) * 1000, 1) if key in started else 0.0
+                    }
+        return {key: results[key] for key in sends}
+    
+    @contextmanager
+    def _runner(self, runner: BoundedRunner = None, concurrency: int = None) -> Iterator[BoundedRunner]:
+        """使用传入的调度器；没有传入时创建一个，用完关闭"""
+        if runner is not None:
+            yield runner
+            return
+        from async_runner import BoundedRunner
+        with BoundedRunner(concurrency or self.subscriber_workers) as runner:
+            yield runner
+    
+    def _pending_channels(self, message: str) -> Tuple[Dict[str, Dict], Dict[str, Callable[[str], bool]]]:
+        """
+        按投递记录拆分通知渠道
+        
+        Returns:
+            Tuple: (当天已经发送过这条消息的渠道的结果, 需要发送的渠道 -> 发送函数)
+        """
+        from bond_store import digest
+        
+        message_hash, delivered = self.delivered_before(message)
+        targets = self.channel_targets()
+        report = {}
+        channels = {}
+        for name, send_func in self.notification_channels().items():
+            recipient = digest(targets.get(name))
+            if (name, recipient) in delivered:
+                report[name] = {"status": "duplicate", "latency_ms": 0.0}
+            else:
+                channels[name] = self._deliver_once(send_func, name, recipient, message_hash)
+        return report, channels
+    
+    def send_notifications(self, message: str) -> Dict[str, Dict]:
+        """
+        发送所有配置的通知（同步入口，在新的事件循环中执行 send_notifications_async）
+        
+        已经在事件循环中时（Jupyter、Web服务等）请直接 await send_notifications_async
+        
+        Returns:
+            Dict[str, Dict]: 每个渠道的发送结果，例如
+                {"dingtalk": {"status": "sent", "latency_ms": 123.4}, ...}
+                status 取值：sent / failed / error / timeout，
+                重试后仍被渠道限流为 throttled，排队超过 RATE_LIMIT_MAX_WAIT 为 rate_limited，
+                当天已经发送过同一条消息的渠道为 duplicate；排过队的结果带 queued_ms
+        
+        Raises:
+            RuntimeError: 在运行中的事件循环里调用
+        """
+        from async_runner import run_sync
+        return run_sync(self.send_notifications_async, message)
+    
+    async def send_notifications_async(self, message: str, runner: BoundedRunner = None) -> Dict[str, Dict]:
+        """
+        发送所有配置的通知：默认各渠道并发发送，总耗时取决于最慢的渠道，而不是所有渠道之和；
+        NOTIFY_MODE=sequential 时逐个发送。超过单渠道超时 NOTIFY_CHANNEL_TIMEOUT 的渠道记为timeout；
+        整个发送过程（不含限流排队和退避）不超过总超时 NOTIFY_TOTAL_TIMEOUT，
+        到期时还没完成（或还没开始）的渠道也记为timeout
+        
+        Args:
+            message: 消息内容
+            runner: 调度器，为None时创建一个
+        """
         print("\n" + "="*50)
         print("开始发送通知...")
         print("="*50)
         
-        # 发送各种通知
-        self.send_email(message)
-        self.send_dingtalk(message)
-        self.send_wechat_work(message)
-        self.send_server_chan(message)
+        report, channels = self._pending_channels(message)
+        targets = self.channel_targets()
+        with self._runner(runner) as runner:
+            sends = {
+                name: functools.partial(self._send_async, runner, send_func, message, name,
+                                        self.channel_timeout, targets.get(name))
+                for name, send_func in channels.items()
+            }
+            report.update(await self._send_within_deadline(
+                sends, sequential=self.notify_mode == NOTIFY_MODE_SEQUENTIAL))
+        report = {name: report[name] for name in self.notification_channels()}
         
         print("\n所有通知发送完成！")
+        for name, result in report.items():
+            print(f"  {name}: {result['status']} ({result['latency_ms']} ms)")
+        return report
+    
+    @property
+    def subscribers(self) -> List[Subscriber]:
+        """订阅者列表，第一次使用时从配置加载；没有配置时为空列表"""
+        if self._subscribers is None:
+            from subscribers import load_subscribers
+            self._subscribers = load_subscribers(self.subscribers_file) if self.subscribers_file else []
+        return self._subscribers
+    
+    def subscriber_senders(self) -> Dict[str, Callable[[str, str], bool]]:
+        """订阅者渠道 -> 发送函数（message, target）"""
+        return {
+            "email": self.send_email,
+            "dingtalk": self.send_dingtalk,
+            "wechat_work": self.send_wechat_work,
+            "server_chan": self.send_server_chan,
+        }
     
-    def run(self, skip_weekend_notification: bool = True):
+    def _pending_subscribers(self, message: str, subscribers: List[Subscriber]
+                             ) -> Tuple[Dict[str, Dict], List[Tuple[str, str, str, Callable[[str], bool]]]]:
         """
-        主运行函数
+        按投递记录拆分订阅者
+        
+        Returns:
+            Tuple: (当天已经收到过这条消息的订阅者的结果, [(标识, 渠道, 接收方, 发送函数)])
+        """
+        from bond_store import digest
+        
+        senders = self.subscriber_senders()
+        # 同一天重复运行时，已经收到过这条消息的订阅者不再发送
+        message_hash, delivered = self.delivered_before(message)
+        report = {}
+        pending = []
+        labels = {}
+        for subscriber in subscribers:
+            label = subscriber.label
+            # 同名订阅者加序号，避免结果互相覆盖
+            labels[label] = labels.get(label, 0) + 1
+            if labels[label] > 1:
+                label = f"{label}#{labels[label]}"
+            recipient = digest(subscriber.target)
+            if (subscriber.channel, recipient) in delivered:
+                report[label] = {"status": "duplicate", "latency_ms": 0.0}
+                continue
+            send_func = self._deliver_once(
+                lambda msg, f=senders[subscriber.channel], t=subscriber.target: f(msg, t),
+                subscriber.channel, recipient, message_hash
+            )
+            pending.append((label, subscriber.channel, subscriber.target, send_func))
+        return report, pending
+    
+    def notify_subscribers(self, message: str, subscribers: List[Subscriber] = None) -> Dict[str, Dict]:
+        """
+        把同一条消息分发给所有订阅者（同步入口，在新的事件循环中执行 notify_subscribers_async）
+        
+        已经在事件循环中时请直接 await notify_subscribers_async
         
         Args:
-            skip_weekend_notification: 如果是周末且没有数据，是否跳过通知
+            message: 消息内容
+            subscribers: 订阅者列表，为None时使用配置的订阅者
+        
+        Returns:
+            Dict[str, Dict]: 每个订阅者的发送结果，键为不含完整token的标识，例如
+                {"dingtalk:研究组": {"status": "sent", "latency_ms": 123.4}, ...}
+        
+        Raises:
+            RuntimeError: 在运行中的事件循环里调用
+        """
+        from async_runner import run_sync
+        return run_sync(self.notify_subscribers_async, message, subscribers)
+    
+    async def notify_subscribers_async(self, message: str, subscribers: List[Subscriber] = None,
+                                       runner: BoundedRunner = None) -> Dict[str, Dict]:
         """
+        把同一条消息分发给所有订阅者
+        
+        数据只获取一次、消息只生成一次；每个订阅者是事件循环中的一个任务，
+        实际发送在调度器的有界线程池中进行，并发数由环境变量 SUBSCRIBER_WORKERS 控制，
+        所有请求共用同一个HTTP连接池；整个分发（不含限流排队和退避）不超过总超时 NOTIFY_TOTAL_TIMEOUT，
+        到期时还没发出的订阅者记为timeout
+        
+        Args:
+            message: 消息内容
+            subscribers: 订阅者列表，为None时使用配置的订阅者
+            runner: 调度器，为None时创建一个
+        """
+        subscribers = self.subscribers if subscribers is None else subscribers
+        
+        print("\n" + "="*50)
+        print(f"开始向 {len(subscribers)} 个订阅者发送通知...")
+        print("="*50)
+        
+        # 共享会话在分发前创建好，避免多个线程各自创建
+        self.http
+        if any(subscriber.channel == 'email' for subscriber in subscribers):
+            self.smtp
+        
+        report, pending = self._pending_subscribers(message, subscribers)
+        with self._runner(runner) as runner:
+            report.update(await self._send_within_deadline({
+                label: functools.partial(self._send_async, runner, send_func, message, channel,
+                                         timeout=self.channel_timeout, target=target)
+                for label, channel, target, send_func in pending
+            }))
+        
+        sent = sum(1 for result in report.values() if result['status'] == 'sent')
+        duplicate = sum(1 for result in report.values() if result['status'] == 'duplicate')
+        print(f"\n订阅者通知发送完成：成功 {sent}/{len(report)}，之前已发送 {duplicate}")
+        for label, result in report.items():
+            if result['status'] not in ('sent', 'duplicate'):
+                print(f"  {label}: {result['status']}")
+        return report
+    
+    def run(self, *, return_report: bool = False, ahead: int = 0, force: bool = False):
+        """
+        主运行函数（同步入口，在新的事件循环中执行 run_async）
+        
+        已经在事件循环中时（Jupyter、Web服务等）请直接 await run_async；
+        参数只能按关键字传入（原来第一个位置参数是已经移除的 skip_weekend_notification）
+        
+        Args:
+            return_report: 为True时返回运行报告（含各渠道发送结果和耗时），否则返回债券数量
+            ahead: 大于0时进入前瞻模式，一次查询未来N个交易日并发送汇总消息
+            force: 为True时休市日也照常查询（前瞻模式休市日总是查询）
+        
+        Returns:
+            int 或 Dict: 找到的债券数量（数据获取失败时为-1），或运行报告
+        
+        Raises:
+            RuntimeError: 在运行中的事件循环里调用（休市日跳过时除外）
+        """
+        if self._is_skipped(force, ahead):
+            # 休市日没有任何I/O，不启动事件循环，冷启动也不用加载asyncio
+            return self._run_skipped(return_report)
+        from async_runner import run_sync
+        return run_sync(self.run_async, return_report=return_report, ahead=ahead, force=force)
+    
+    async def run_async(self, *, return_report: bool = False, ahead: int = 0, force: bool = False,
+                        concurrency: int = None, runner: BoundedRunner = None):
+        """
+        异步运行：数据获取和各渠道发送都由事件循环调度，
+        阻塞的请求（requests / smtplib）在有界线程池中执行
+        
+        被取消时先取消所有还没完成的发送并等它们结束，再抛出 CancelledError；
+        已经写入投递记录的发送在重新运行时不会重复
+        
+        Args:
+            return_report, ahead, force: 同 run()
+            concurrency: 同时进行的阻塞请求数，为None时使用 SUBSCRIBER_WORKERS
+            runner: 共享的调度器（多个日期在同一个事件循环中查询时共用线程池），为None时自行创建
+        
+        Returns:
+            int 或 Dict: 同 run()
+        """
+        if self._is_skipped(force, ahead):
+            return self._run_skipped(return_report)
+        
+        with self._runner(runner, concurrency) as runner, self._tracing() as tracer:
+            self._print_header()
+            bonds, bonds_by_date, message = await runner.call(self._acquire, ahead)
+            print("\n" + message)
+            
+            # 发送通知：只有当有新债可申购时才发送通知
+            notifications = {}
+            if self.fetch_error:
+                print("\n数据获取失败，跳过通知发送")
+            elif bonds and self.subscribers:
+                with tracer.span('notify', subscribers=len(self.subscribers)):
+                    notifications = await self.notify_subscribers_async(message, runner=runner)
+            elif bonds:
+                with tracer.span('notify'):
+                    notifications = await self.send_notifications_async(message, runner=runner)
+            else:
+                print("\n今日无可转债申购，跳过通知发送")
+            
+            return self._finish(bonds, bonds_by_date, message, notifications, False, ahead, return_report)
+    
+    def _is_skipped(self, force: bool, ahead: int = 0) -> bool:
+        """
+        休市日不会有新债申购，直接跳过数据获取；
+        前瞻模式查询的是之后的交易日，休市日（周末、节前）照常查询并发送汇总
+        """
+        return not self.is_trading_day and not force and ahead <= 0
+    
+    @contextmanager
+    def _tracing(self) -> Iterator[Tracer]:
+        """本次运行的分阶段计时，结束时写入 bond_result.json 的 timings"""
+        self.tracer = Tracer()
+        token = bind_tracer(self.tracer)
+        try:
+            yield self.tracer
+        finally:
+            reset_tracer(token)
+    
+    def _print_header(self):
         print("="*50)
         print("可转债申购提醒系统")
         print("="*50)
+    
+    def _run_skipped(self, return_report: bool):
+        with self._tracing():
+            self._print_header()
+            print(f"\n{self.today} 沪深交易所休市，不会有新债申购，跳过数据获取")
+            message = f"📊 {self.today} 休市，无可转债申购"
+            print("\n" + message)
+            print("\n今日无可转债申购，跳过通知发送")
+            return self._finish([], None, message, {}, True, 0, return_report)
+    
+    def _acquire(self, ahead: int) -> Tuple[List[Bond], Optional[Dict[str, List[Bond]]], str]:
+        """
+        获取数据并生成消息（阻塞，异步运行时在线程池中执行）
         
-        # 如果是周末，可以选择跳过
-        if not self.is_weekday:
-            print("\n今天是周末，通常不会有新债申购")
-            print("继续检查以防万一...")
-        
-        # 获取债券数据
-        bonds = self.fetch_bond_data()
+        Returns:
+            Tuple: (债券列表, 前瞻模式下按日期分组的债券, 消息)
+        """
+        tracer = self.tracer
+        bonds_by_date = None
+        if ahead > 0:
+            with tracer.span('acquire', mode=self.query_mode, ahead=ahead) as span:
+                bonds_by_date = self.fetch_bonds_ahead(ahead)
+                bonds = [bond for day_bonds in bonds_by_date.values() for bond in day_bonds]
+                span['rows'] = len(bonds)
+            with tracer.span('format', rows=len(bonds)):
+                message = self.format_digest_message(bonds_by_date)
+        else:
+            with tracer.span('acquire', mode=self.query_mode) as span:
+                bonds = self.fetch_bond_data()
+                span['rows'] = len(bonds)
+            with tracer.span('format', rows=len(bonds)):
+                message = self.format_bond_message(bonds)
         
-        # 格式化消息
-        message = self.format_bond_message(bonds)
-        print("\n" + message)
+        # 重试之后仍然获取失败：不能当作"今日无申购"，以失败状态结束让调度方告警
+        if self.fetch_error:
+            message = f"⚠️ {self.today} 可转债数据获取失败: {self.fetch_error}"
+        return bonds, bonds_by_date, message
+    
+    def _finish(self, bonds: List[Bond], bonds_by_date: Optional[Dict[str, List[Bond]]], message: str,
+                notifications: Dict[str, Dict], skipped: bool, ahead: int, return_report: bool):
+        """保存结果、记录运行历史和指标，返回 run() 的返回值"""
+        tracer = self.tracer
+        fetch_error = None if skipped else self.fetch_error
         
         # 保存结果到文件
         result = {
             "date": self.today,
-            "bonds": bonds,
+            "bonds": [bond_to_dict(bond) for bond in bonds],
             "message": message,
             "count": len(bonds),
-            "is_weekday": self.is_weekday
+            "is_weekday": self.is_weekday,
+            "is_trading_day": self.is_trading_day,
+            "skipped": skipped,
+            "notifications": notifications
         }
+        if fetch_error:
+            result["error"] = fetch_error
+        if self.last_source:
+            result["source"] = self.last_source
+        if bonds_by_date is not None:
+            result["ahead"] = {
+                "days": ahead,
+                "by_date": {
+                    date_str: [bond_to_dict(bond) for bond in day_bonds]
+                    for date_str, day_bonds in bonds_by_date.items()
+                }
+            }
         
+        result["timings"] = tracer.to_dict()
         with open('bond_result.json', 'w', encoding='utf-8') as f:
             json.dump(result, f, ensure_ascii=False, indent=2)
         
-        # 决定是否发送通知：只有当有新债可申购时才发送通知
-        should_notify = len(bonds) > 0
+        if self.trace_file:
+            try:
+                tracer.write_jsonl(self.trace_file, date=self.today, mode=self.query_mode)
+            except OSError as e:
+                print(f"写入追踪文件失败: {e}")
         
-        # 发送通知
-        if should_notify:
-            self.send_notifications(message)
-        else:
-            print("\n今日无可转债申购，跳过通知发送")
+        # 更新Prometheus指标：常驻模式由 /metrics 提供，单次运行写入textfile
+        from metrics import record_run, write_textfile
+        record_run(result, tracer.spans)
+        if self.metrics_file:
+            try:
+                write_textfile(self.metrics_file)
+            except OSError as e:
+                print(f"写入指标文件失败: {e}")
         
-        print(f"\n扫描完成！共找到 {len(bonds)} 只可转债")
-        return len(bonds)
+        # 运行历史写入本地库，之后可以用 bond_store.py --runs 查询
+        if self.use_store:
+            try:
+                self.store.record_run(result)
+            except Exception as e:
+                print(f"记录运行历史失败: {e}")
+        
+        self.last_report = {
+            "date": self.today,
+            "count": len(bonds),
+            "notifications": notifications,
+            "timings": result["timings"]
+        }
+        if fetch_error:
+            self.last_report["error"] = fetch_error
+        
+        if fetch_error:
+            print("\n扫描失败！")
+        else:
+            print(f"\n扫描完成！共找到 {len(bonds)} 只可转债")
+        if return_report:
+            return self.last_report
+        return -1 if fetch_error else len(bonds)
 
 
-def main():
+def main(argv: List[str] = None):
     """主函数"""
+    parser = argparse.ArgumentParser(description="可转债申购提醒")
+    add_cache_arguments(parser)
+    parser.add_argument('--no-store', action='store_true',
+                        help='不把获取到的债券和运行结果写入本地SQLite库')
+    parser.add_argument('--ahead', type=int, default=0, metavar='N',
+                        help='前瞻模式：一次查询未来N个交易日的申购并发送汇总')
+    parser.add_argument('--force', action='store_true',
+                        help='休市日也照常查询')
+    parser.add_argument('--hedge', action='store_true', default=None,
+                        help='东方财富迟迟不返回时同时请求集思录，取先返回的结果')
+    parser.add_argument('--subscribers', metavar='FILE',
+                        help='订阅者配置（JSON或SQLite），默认读取环境变量 SUBSCRIBERS_FILE')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='把分阶段计时追加写入JSONL文件，默认读取环境变量 BOND_TRACE_FILE')
+    parser.add_argument('--metrics-file', metavar='FILE',
+                        help='运行结束后把Prometheus指标写入文件（textfile collector），默认读取环境变量 BOND_METRICS_FILE')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='常驻模式下在该端口提供 /metrics，默认读取环境变量 METRICS_PORT')
+    parser.add_argument('--resend', action='store_true',
+                        help='忽略投递记录，当天已经发送过的消息也重新发送')
+    parser.add_argument('--daemon', action='store_true',
+                        help='常驻模式：按 DAEMON_SCHEDULE 定时扫描，连接和缓存在多次扫描之间保持')
+    parser.add_argument('--run-now', action='store_true',
+                        help='常驻模式启动后立即扫描一次')
+    args = parser.parse_args(argv)
+    configure_cache_from_args(args)
+    
+    if args.daemon:
+        from bond_daemon import BondDaemon
+        
+        # 增量同步的本地状态和日期索引在多次扫描之间共用，每次只合并新增的记录
+        syncer = None
+        
+        def run_once(check_date: str, http: HttpSessionManager):
+            nonlocal syncer
+            if syncer is None:
+                from bond_sync import IncrementalSync
+                syncer = IncrementalSync(http=http, cache=get_default_cache())
+            with BondNotifier(check_date=check_date, http=http, use_store=not args.no_store,
+                              subscribers_file=args.subscribers, hedge=args.hedge,
+                              trace_file=args.trace, metrics_file=args.metrics_file,
+                              dedup=False if args.resend else None, syncer=syncer) as notifier:
+                notifier.run(ahead=args.ahead, force=args.force)
+        
+        BondDaemon(run_once, metrics_port=args.metrics_port).serve(run_now=args.run_now)
+        sys.exit(0)
+    
     try:
-        notifier = BondNotifier()
-        count = notifier.run()
+        with BondNotifier(use_store=not args.no_store, subscribers_file=args.subscribers,
+                          hedge=args.hedge, trace_file=args.trace,
+                          metrics_file=args.metrics_file,
+                          dedup=False if args.resend else None) as notifier:
+            count = notifier.run(ahead=args.ahead, force=args.force)
         sys.exit(0 if count >= 0 else 1)
     except Exception as e:
         print(f"程序运行出错: {e}")
@@ -4,13 +4,16 @@
 查看数据库中最近的申购记录
 """
 
-import requests
+import argparse
 import json
 from datetime import datetime
 
+from bond_cache import add_cache_arguments, configure_cache_from_args
+from bond_record import BondTable
+from eastmoney_api import fetch_report, report_rows
+
 def check_recent_bonds():
     """查看最近的申购记录"""
-    url = "https://datacenter-web.eastmoney.com/api/data/v1/get"
     params = {
         "reportName": "RPT_BOND_CB_LIST",
         "columns": "SECURITY_CODE,SECURITY_NAME_ABBR,PUBLIC_START_DATE,CORRECODE",
@@ -20,46 +23,30 @@ def check_recent_bonds():
         "client": "WEB"
     }
     
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-    
-    response = requests.get(url, params=params, headers=headers, timeout=30)
-    response.raise_for_status()
-    
-    data = response.json()
-    bonds = data.get('result', {}).get('data', [])
+    data = fetch_report(params)
+    bonds = BondTable.from_dicts(report_rows(data))
     
     print(f"总条数: {len(bonds)}")
     
-    # 筛选有申购日期的记录
-    bonds_with_date = [b for b in bonds if b.get('PUBLIC_START_DATE')]
-    
-    # 按日期排序（最新的在前）
+    # 筛选有申购日期的记录，按日期排序（最新的在前）
     sorted_bonds = sorted(
-        bonds_with_date, 
-        key=lambda x: x.get('PUBLIC_START_DATE', ''), 
+        (bond for bond in bonds if bond.apply_ordinal),
+        key=lambda bond: bond.apply_ordinal,
         reverse=True
     )
     
     print('\n最近的10条申购记录:')
     print('-' * 70)
     for bond in sorted_bonds[:10]:
-        date = bond.get('PUBLIC_START_DATE', '')
-        name = bond.get('SECURITY_NAME_ABBR', '')
-        code = bond.get('SECURITY_CODE', '')
-        apply_code = bond.get('CORRECODE', '')
-        print(f"{date} - {name} ({code}) - 申购代码: {apply_code}")
+        print(f"{bond.apply_date} - {bond.name} ({bond.code}) - 申购代码: {bond.apply_code}")
     
     # 检查2026年1月的数据
     print('\n2026年1月的申购记录:')
     print('-' * 70)
-    january_bonds = [b for b in sorted_bonds if b.get('PUBLIC_START_DATE', '').startswith('2026-01')]
+    january_bonds = [bond for bond in sorted_bonds if bond.apply_date.startswith('2026-01')]
     if january_bonds:
         for bond in january_bonds:
-            date = bond.get('PUBLIC_START_DATE', '')
-            name = bond.get('SECURITY_NAME_ABBR', '')
-            code = bond.get('SECURITY_CODE', '')
-            apply_code = bond.get('CORRECODE', '')
-            print(f"{date} - {name} ({code}) - 申购代码: {apply_code}")
+            print(f"{bond.apply_date} - {bond.name} ({bond.code}) - 申购代码: {bond.apply_code}")
     else:
         print("没有找到2026年1月的申购记录")
     
@@ -67,10 +54,8 @@ def check_recent_bonds():
     from collections import defaultdict
     month_count = defaultdict(int)
     for bond in sorted_bonds:
-        date = bond.get('PUBLIC_START_DATE', '')
-        if date and len(date) >= 7:
-            month = date[:7]  # 提取年月
-            month_count[month] += 1
+        month = bond.apply_date[:7]  # 提取年月
+        month_count[month] += 1
     
     print('\n各月份申购数量统计:')
     print('-' * 70)
@@ -78,6 +63,10 @@ def check_recent_bonds():
         print(f"{month}: {month_count[month]} 只")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="查看数据库中最近的申购记录")
+    add_cache_arguments(parser)
+    configure_cache_from_args(parser.parse_args())
+    
     try:
         check_recent_bonds()
         print("\n✓ 查询完成")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时报告
+用 python -X importtime 运行主脚本的冷启动路径，汇总各模块的导入耗时，
+并检查休市日路径是否加载了不该加载的重模块；
+交易日路径对着本地模拟接口（fake_eastmoney.py）查询一个没有申购的交易日，列出实际加载的重模块
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from trading_calendar import get_default_calendar
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 只有发送通知或请求网络时才需要的模块
+HEAVY_MODULES = ('requests', 'urllib3', 'smtplib', 'email.mime.text', 'sqlite3', 'asyncio',
+                 'concurrent.futures')
+# 交易日路径不能真的发通知：子进程中去掉所有通知渠道的配置
+NOTIFY_ENV = ('RECEIVER_EMAIL', 'SENDER_EMAIL', 'SENDER_PASSWORD', 'DINGTALK_WEBHOOK',
+              'WECHAT_WORK_WEBHOOK', 'SERVERCHAN_SENDKEY', 'SUBSCRIBERS_FILE', 'BOND_HEDGE')
+
+# 只导入主模块
+IMPORT_SNIPPET = "import check_new_bonds"
+# 指定日期完整运行一次（不写本地库）
+RUN_SNIPPET = (
+    "import check_new_bonds; "
+    "check_new_bonds.BondNotifier(check_date={date!r}, use_store=False).run()"
+)
+
+
+def next_closed_day(start: date = None) -> str:
+    """从start开始的第一个休市日"""
+    calendar = get_default_calendar()
+    day = start or date.today()
+    while calendar.is_trading_day(day):
+        day += timedelta(days=1)
+    return day.strftime('%Y-%m-%d')
+
+
+def next_trading_day(start: date = None) -> str:
+    """从start开始的第一个交易日"""
+    return get_default_calendar().next_trading_day(start or date.today(), inclusive=True)
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    解析 -X importtime 的输出
+
+    Returns:
+        List[Tuple[str, int, int, int]]: (模块名, 自身耗时us, 累计耗时us, 嵌套层级)
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 表头
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        records.append((name.strip(), int(parts[0]), int(parts[1]), depth))
+    return records
+
+
+def measure(snippet: str, extra_env: Optional[Dict[str, str]] = None) -> Tuple[List[Tuple[str, int, int, int]], str]:
+    """在临时目录中运行snippet（环境变量加上extra_env），返回导入记录和脚本输出"""
+    env = dict(os.environ, PYTHONPATH=SCRIPT_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    env.update(extra_env or {})
+    with tempfile.TemporaryDirectory() as work_dir:
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', snippet],
+                                cwd=work_dir, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"运行失败:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr), result.stdout
+
+
+def report(records: List[Tuple[str, int, int, int]], top: int) -> Dict:
+    """打印报告，返回汇总数据"""
+    total_us = sum(cumulative for _, _, cumulative, depth in records if depth == 0)
+    loaded = {name for name, _, _, _ in records}
+    heavy = [name for name in HEAVY_MODULES if name in loaded]
+
+    print(f"共导入 {len(records)} 个模块，顶层累计 {total_us / 1000:.1f} ms\n")
+    print(f"自身耗时最多的 {top} 个模块:")
+    print('-' * 70)
+    for name, self_us, cumulative, _ in sorted(records, key=lambda r: r[1], reverse=True)[:top]:
+        print(f"{self_us / 1000:8.1f} ms  (累计 {cumulative / 1000:8.1f} ms)  {name}")
+
+    print('\n顶层导入（按累计耗时）:')
+    print('-' * 70)
+    for name, _, cumulative, _ in sorted((r for r in records if r[3] == 0),
+                                         key=lambda r: r[2], reverse=True)[:top]:
+        print(f"{cumulative / 1000:8.1f} ms  {name}")
+
+    print('\n重模块: ' + (', '.join(heavy) if heavy else '无'))
+    return {"total_ms": total_us / 1000, "modules": len(records), "heavy": heavy}
+
+
+def measure_trading_day() -> Tuple[List[Tuple[str, int, int, int]], str]:
+    """交易日路径：模拟接口的最新申购在前一个交易日，查询当天没有申购"""
+    from fake_eastmoney import FakeDatacenter
+
+    calendar = get_default_calendar()
+    trading_day = next_trading_day()
+    anchor_date = calendar.prev_trading_day(trading_day)
+    print(f"交易日路径（{trading_day}，模拟接口最新申购日 {anchor_date}）")
+
+    env = {name: '' for name in NOTIFY_ENV}
+    with FakeDatacenter(anchor_date=anchor_date) as datacenter:
+        env['EASTMONEY_DATACENTER_URL'] = datacenter.url
+        return measure(RUN_SNIPPET.format(date=trading_day), env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="主脚本冷启动的导入耗时报告")
+    parser.add_argument('--path', choices=['import', 'holiday', 'trading'], default='holiday',
+                        help="import：只导入主模块；holiday：休市日完整运行一次（默认）；"
+                             "trading：对着本地模拟接口查询一个没有申购的交易日")
+    parser.add_argument('--top', type=int, default=15, help="显示前N个模块（默认15）")
+    parser.add_argument('--max-ms', type=float,
+                        help="顶层累计导入耗时超过该值时以非零状态退出")
+    parser.add_argument('--forbid-heavy', action='store_true',
+                        help="加载了requests/smtplib等重模块时以非零状态退出"
+                             "（交易日路径需要请求接口，这些模块总会加载）")
+    args = parser.parse_args()
+
+    if args.path == 'trading':
+        records, output = measure_trading_day()
+        # 确认走的是无申购路径
+        print(next((line for line in output.splitlines() if line.startswith('扫描完成')), ''))
+    elif args.path == 'holiday':
+        closed_day = next_closed_day()
+        print(f"休市日路径（{closed_day}）")
+        records, _ = measure(RUN_SNIPPET.format(date=closed_day))
+    else:
+        print("导入路径")
+        records, _ = measure(IMPORT_SNIPPET)
+
+    summary = report(records, args.top)
+
+    failed = False
+    if args.max_ms is not None and summary['total_ms'] > args.max_ms:
+        print(f"\n✗ 导入耗时 {summary['total_ms']:.1f} ms 超过 {args.max_ms} ms")
+        failed = True
+    if args.forbid_heavy and summary['heavy']:
+        print(f"\n✗ 冷启动路径加载了重模块: {', '.join(summary['heavy'])}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+东方财富数据中心接口
+主脚本和各个check_*/test_*脚本共用的请求入口，所有查询都经过本地快照缓存
+"""
+
+import codecs
+import contextvars
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import requests
+
+from bond_cache import SnapshotCache, get_default_cache
+from resilience import request_with_retry
+from tracing import get_tracer
+
+
+# 东方财富数据中心接口，可以用环境变量 EASTMONEY_DATACENTER_URL 指向本地模拟服务（见 fake_eastmoney.py）
+EASTMONEY_DATACENTER_URL = os.getenv('EASTMONEY_DATACENTER_URL',
+                                     "https://datacenter-web.eastmoney.com/api/data/v1/get")
+# 接口返回"数据为空"时的错误码（过滤条件合法，只是没有匹配记录）
+EASTMONEY_EMPTY_RESULT_CODE = 9201
+# 可转债列表（RPT_BOND_CB_LIST）请求的列
+BOND_LIST_COLUMNS = "SECURITY_CODE,SECURITY_NAME_ABBR,PUBLIC_START_DATE,CORRECODE"
+
+# 多页并发拉取时的默认线程数
+DEFAULT_PAGE_WORKERS = 4
+# 流式解析时每次读取的字节数
+STREAM_CHUNK_SIZE = 64 * 1024
+# 流式解析时，data数组之前最多保留的响应文本（用于检查错误响应的code）
+ENVELOPE_LIMIT = 64 * 1024
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+
+
+class ReportError(RuntimeError):
+    """接口返回了错误：响应中没有数据，错误码也不是"数据为空" """
+
+    def __init__(self, code, message: str = ''):
+        super().__init__(f"数据中心接口返回错误: code={code}, message={message}")
+        self.code = code
+        self.message = message
+
+
+def check_report(data: Dict):
+    """
+    检查没有数据行的响应：code为0或"数据为空"时正常返回，其他错误码抛出 ReportError
+
+    Raises:
+        ReportError: 接口返回了错误
+    """
+    if report_rows(data):
+        return
+    code = data.get("code")
+    if code not in (None, 0, EASTMONEY_EMPTY_RESULT_CODE):
+        raise ReportError(code, data.get("message") or '')
+
+
+def is_cacheable(data: Dict) -> bool:
+    """只缓存正常的响应：有数据，或者明确返回了"数据为空" """
+    if data.get("result") and data["result"].get("data") is not None:
+        return True
+    return data.get("code") == EASTMONEY_EMPTY_RESULT_CODE
+
+
+def bond_list_params(page_size: int = 500, page_number: int = 1, **extra) -> Dict:
+    """
+    可转债列表接口的请求参数，按申购日期、债券代码倒序
+
+    Args:
+        page_size: 每页条数
+        page_number: 页码
+        extra: 其他参数（如 filter），覆盖默认值
+
+    Returns:
+        Dict: 请求参数
+    """
+    params = {
+        "reportName": "RPT_BOND_CB_LIST",
+        "columns": BOND_LIST_COLUMNS,
+        "pageSize": str(page_size),
+        "pageNumber": str(page_number),
+        "sortColumns": "PUBLIC_START_DATE,SECURITY_CODE",
+        "sortTypes": "-1,-1",
+        "source": "WEB",
+        "client": "WEB"
+    }
+    params.update(extra)
+    return params
+
+
+def fetch_report(params: Dict, http=None, cache: SnapshotCache = None, timeout: float = 30) -> Dict:
+    """
+    请求数据中心报表接口
+
+    Args:
+        params: 请求参数（reportName/columns/pageSize/pageNumber等）
+        http: 共享的HTTP会话管理器（HttpSessionManager），为None时直接使用requests
+        cache: 快照缓存，为None时使用默认缓存
+        timeout: 读取超时时间（秒），连接超时见环境变量 HTTP_CONNECT_TIMEOUT
+
+    Returns:
+        Dict: 解析后的JSON响应
+    """
+    if cache is None:
+        cache = get_default_cache()
+    tracer = get_tracer()
+    report = params.get("reportName")
+
+    with tracer.span('cache', report=report) as span:
+        data = cache.get(params)
+        span['hit'] = data is not None
+    if data is not None:
+        return data
+
+    with tracer.span('fetch', report=report, page=params.get("pageNumber")) as span:
+        if http is not None:
+            response = http.get(EASTMONEY_DATACENTER_URL, params=params, headers=DEFAULT_HEADERS, timeout=timeout)
+        else:
+            response = request_with_retry(requests.request, 'GET', EASTMONEY_DATACENTER_URL, params=params,
+                                          headers=DEFAULT_HEADERS, timeout=timeout)
+        span['status'] = response.status_code
+        # 发出请求到收到响应头的时间，其余是下载响应体的时间
+        span['ttfb_ms'] = round(response.elapsed.total_seconds() * 1000, 3)
+        response.raise_for_status()
+        span['bytes'] = len(response.content)
+
+    with tracer.span('parse', report=report) as span:
+        data = response.json()
+        span['rows'] = len(report_rows(data))
+
+    if is_cacheable(data):
+        cache.put(params, data)
+    return data
+
+
+def report_rows(data: Dict) -> List[Dict]:
+    """取出响应中的数据行，没有数据时返回空列表"""
+    result = data.get("result") or {}
+    return result.get("data") or []
+
+
+def report_pages(data: Dict) -> int:
+    """取出响应中的总页数，没有该字段时按1页处理"""
+    result = data.get("result") or {}
+    return int(result.get("pages") or 1)
+
+
+def fetch_all_pages(params: Dict, max_workers: int = DEFAULT_PAGE_WORKERS, http=None,
+                    cache: SnapshotCache = None, dedup_key: str = "SECURITY_CODE",
+                    max_pages: Optional[int] = None) -> List[Dict]:
+    """
+    拉取报表的所有分页并合并为一个列表
+
+    先请求第1页，从响应中读取总页数，再用有限的线程并发拉取剩余分页；
+    按页码顺序合并，边合并边按dedup_key去重（保留先出现的记录）
+
+    Args:
+        params: 请求参数，pageNumber会被覆盖
+        max_workers: 并发线程数
+        http: 共享的HTTP会话管理器
+        cache: 快照缓存，为None时使用默认缓存
+        dedup_key: 去重字段，为None时不去重
+        max_pages: 最多拉取的页数，为None时拉取全部
+
+    Returns:
+        List[Dict]: 合并去重后的数据行
+    """
+    def fetch_page(page_number: int) -> Dict:
+        page_params = dict(params, pageNumber=str(page_number))
+        return fetch_report(page_params, http=http, cache=cache)
+
+    first_page = fetch_page(1)
+    total_pages = report_pages(first_page)
+    if max_pages is not None:
+        total_pages = min(total_pages, max_pages)
+
+    merged: List[Dict] = []
+    seen = set()
+
+    def merge(rows: List[Dict]):
+        for row in rows:
+            if dedup_key:
+                key = row.get(dedup_key)
+                if key in seen:
+                    continue
+                seen.add(key)
+            merged.append(row)
+
+    merge(report_rows(first_page))
+    if total_pages <= 1:
+        return merged
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total_pages - 1)),
+                            thread_name_prefix="page") as executor:
+        # 每页复制一份当前上下文，线程里的请求也记入本次运行的分阶段计时
+        futures = [executor.submit(contextvars.copy_context().run, fetch_page, page_number)
+                   for page_number in range(2, total_pages + 1)]
+        for future in futures:
+            merge(report_rows(future.result()))
+
+    return merged
+
+
+class RowArrayParser:
+    """
+    增量解析 {"result": {"data": [{...}, {...}]}} 中的data数组
+
+    每次feed一段文本，返回这段文本中新解析出的完整行；已解析的部分立刻从缓冲区丢弃，
+    缓冲区最多只保留一行未读完的数据。
+    找到data数组之前的文本另外保留在envelope中（最多 ENVELOPE_LIMIT 个字符），
+    响应里没有data数组时（错误响应）据此读取code
+    """
+
+    _DATA_KEY = re.compile(r'"data"\s*:\s*')
+    _SEPARATOR = re.compile(r'[\s,]*')
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self.state = 'seek'  # seek -> rows -> done
+        self.found_data = False
+        self.envelope = ''
+
+    def feed(self, text: str) -> List[Dict]:
+        if not self.found_data and len(self.envelope) < ENVELOPE_LIMIT:
+            self.envelope += text
+        if self.state == 'done':
+            return []
+        self._buffer += text
+        rows: List[Dict] = []
+
+        if self.state == 'seek':
+            match = self._DATA_KEY.search(self._buffer)
+            if match is None or match.end() >= len(self._buffer):
+                # "data": 可能被切在两段之间，保留末尾一小段
+                self._buffer = self._buffer[-16:]
+                return rows
+            if self._buffer[match.end()] != '[':
+                # "data": null，没有数据
+                self.state = 'done'
+                self._buffer = ''
+                return rows
+            self._buffer = self._buffer[match.end() + 1:]
+            self.state = 'rows'
+            self.found_data = True
+            self.envelope = ''
+
+        if self.state == 'rows':
+            pos = 0
+            while True:
+                pos = self._SEPARATOR.match(self._buffer, pos).end()
+                if pos >= len(self._buffer):
+                    break
+                if self._buffer[pos] == ']':
+                    self.state = 'done'
+                    pos = len(self._buffer)
+                    break
+                try:
+                    row, pos = self._decoder.raw_decode(self._buffer, pos)
+                except ValueError:
+                    # 这一行还没接收完整，等下一段
+                    break
+                rows.append(row)
+            self._buffer = self._buffer[pos:]
+
+        return rows
+
+    def close(self):
+        """
+        数据结束时调用
+
+        Raises:
+            ValueError: data数组没有正常闭合（响应被截断），或没有data数组且响应不是完整的JSON
+            ReportError: 没有data数组，接口返回了错误
+        """
+        if self.state == 'rows':
+            raise ValueError("响应在data数组中间被截断")
+        if not self.found_data:
+            check_report(json.loads(self.envelope))
+
+
+class ReportRowStream:
+    """
+    流式拉取报表：边接收边解析data中的每一行，按列投影、按申购日期过滤后才保留，
+    内存占用只和匹配的行数有关，和原始响应大小无关
+
+    快照缓存中已有的响应直接读取；流式拉取的响应不会整体保存，因此不写入缓存
+    """
+
+    def __init__(self, params: Dict, columns: Optional[Sequence[str]] = None,
+                 start_date: str = None, end_date: str = None, http=None,
+                 cache: SnapshotCache = None, timeout: float = 30,
+                 chunk_size: int = STREAM_CHUNK_SIZE):
+        """
+        Args:
+            params: 请求参数
+            columns: 保留的字段，为None时保留所有字段
+            start_date: 申购日期下限（YYYY-MM-DD，包含），为None时不限
+            end_date: 申购日期上限（YYYY-MM-DD，包含），为None时不限
+            http: 共享的HTTP会话管理器，为None时直接使用requests
+            cache: 快照缓存，为None时使用默认缓存
+            timeout: 请求超时时间（秒）
+            chunk_size: 每次读取的字节数
+        """
+        self.params = params
+        self.columns = list(columns) if columns else None
+        self.start_date = start_date
+        self.end_date = end_date
+        self.http = http
+        self.cache = cache if cache is not None else get_default_cache()
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+        self.rows_scanned = 0
+        self.rows_matched = 0
+
+    def _matches(self, row: Dict) -> bool:
+        if self.start_date is None and self.end_date is None:
+            return True
+        apply_date = (row.get('PUBLIC_START_DATE') or '')[:10]
+        if not apply_date:
+            return False
+        if self.start_date is not None and apply_date < self.start_date:
+            return False
+        if self.end_date is not None and apply_date > self.end_date:
+            return False
+        return True
+
+    def _project(self, row: Dict) -> Dict:
+        if self.columns is None:
+            return row
+        return {column: row.get(column) for column in self.columns}
+
+    def _accept(self, rows: List[Dict]) -> Iterator[Dict]:
+        for row in rows:
+            self.rows_scanned += 1
+            if self._matches(row):
+                self.rows_matched += 1
+                yield self._project(row)
+
+    def __iter__(self) -> Iterator[Dict]:
+        cached = self.cache.get(self.params)
+        if cached is not None:
+            yield from self._accept(report_rows(cached))
+            return
+
+        if self.http is not None:
+            response = self.http.get(EASTMONEY_DATACENTER_URL, params=self.params, headers=DEFAULT_HEADERS,
+                                     timeout=self.timeout, stream=True)
+        else:
+            response = request_with_retry(requests.request, 'GET', EASTMONEY_DATACENTER_URL,
+                                          params=self.params, headers=DEFAULT_HEADERS,
+                                          timeout=self.timeout, stream=True)
+        span_attrs = {'report': self.params.get("reportName"), 'status': response.status_code,
+                      'ttfb_ms': round(response.elapsed.total_seconds() * 1000, 3)}
+        # 接收和解析交错进行，整个流式读取记为一个阶段
+        with get_tracer().span('fetch_stream', **span_attrs) as span:
+            try:
+                response.raise_for_status()
+                decoder = codecs.getincrementaldecoder('utf-8')()
+                parser = RowArrayParser()
+
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    self.bytes_read += len(chunk)
+                    yield from self._accept(parser.feed(decoder.decode(chunk)))
+                    # 没有data数组时读完整个响应，检查错误码
+                    if parser.state == 'done' and parser.found_data:
+                        break
+
+                if not (parser.state == 'done' and parser.found_data):
+                    yield from self._accept(parser.feed(decoder.decode(b'', final=True)))
+                    parser.close()
+            finally:
+                response.close()
+                span.update(bytes=self.bytes_read, rows=self.rows_scanned, matched=self.rows_matched)
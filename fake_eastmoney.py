@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟的东方财富数据中心接口
+在本机启动一个HTTP服务，按 /api/data/v1/get 的参数格式返回合成的 RPT_BOND_CB_LIST 数据，
+支持分页、申购日期filter表达式、列投影和可配置的响应延迟，用于离线基准测试
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+# 合成数据默认的基准日期：这一天有申购，之前每个工作日都有申购
+DEFAULT_ANCHOR_DATE = '2026-01-16'
+# 基准日期当天的申购数量 / 之前每个工作日的申购数量
+ANCHOR_DAY_BONDS = 3
+BONDS_PER_DAY = 2
+
+API_PATH = '/api/data/v1/get'
+
+# columns=ALL 时额外返回的字段
+EXTRA_FIELDS = {
+    'BOND_EXPIRE': '6',
+    'RATING': 'AA',
+    'ACTUAL_ISSUE_SCALE': 5.0,
+    'ISSUE_PRICE': 100,
+    'INTEREST_RATE_EXPLAIN': '第一年0.20%、第二年0.40%、第三年0.80%、第四年1.50%、第五年1.80%、第六年2.00%',
+    'CONVERT_STOCK_CODE': '600000',
+    'SECURITY_SHORT_NAME': '测试股份',
+    'INITIAL_TRANSFER_PRICE': 10.0,
+}
+
+_FILTER_TERM = re.compile(r"\(PUBLIC_START_DATE(>=|<=|>|<|=)'(\d{4}-\d{2}-\d{2})'\)")
+
+
+def generate_rows(count: int, anchor_date: str = DEFAULT_ANCHOR_DATE) -> List[Dict]:
+    """
+    生成count条合成数据，按申购日期倒序（和真实接口的默认排序一致）
+
+    基准日期当天有 ANCHOR_DAY_BONDS 只，之前每个工作日各 BONDS_PER_DAY 只
+    """
+    rows = []
+    day = date.fromisoformat(anchor_date)
+    per_day = ANCHOR_DAY_BONDS
+    serial = 0
+    while len(rows) < count:
+        if day.weekday() < 5:
+            for _ in range(min(per_day, count - len(rows))):
+                code = f"{110000 + serial % 90000:06d}"
+                row = {
+                    'SECURITY_CODE': code,
+                    'SECURITY_NAME_ABBR': f"模拟{serial:05d}转债",
+                    'PUBLIC_START_DATE': f"{day.isoformat()} 00:00:00",
+                    'CORRECODE': f"7{code[1:]}",
+                }
+                row.update(EXTRA_FIELDS)
+                rows.append(row)
+                serial += 1
+            per_day = BONDS_PER_DAY
+        day -= timedelta(days=1)
+    return rows
+
+
+def apply_filter(rows: List[Dict], expression: str) -> Optional[List[Dict]]:
+    """
+    按 (PUBLIC_START_DATE>='2026-01-16')(PUBLIC_START_DATE<'2026-01-17') 形式的表达式过滤
+
+    Returns:
+        Optional[List[Dict]]: 表达式无法识别时返回None（对应真实接口拒绝filter）
+    """
+    terms = _FILTER_TERM.findall(expression)
+    if not terms or _FILTER_TERM.sub('', expression).strip():
+        return None
+
+    checks = {
+        '>=': lambda value, bound: value >= bound,
+        '<=': lambda value, bound: value <= bound,
+        '>': lambda value, bound: value > bound,
+        '<': lambda value, bound: value < bound,
+        '=': lambda value, bound: value == bound,
+    }
+    return [row for row in rows
+            if all(checks[op](row['PUBLIC_START_DATE'][:10], bound) for op, bound in terms)]
+
+
+class FakeDatacenter:
+    def __init__(self, rows: int = 500, latency_ms: float = 0, jitter_ms: float = 0,
+                 anchor_date: str = DEFAULT_ANCHOR_DATE, host: str = '127.0.0.1', port: int = 0):
+        """
+        Args:
+            rows: 合成数据条数
+            latency_ms: 每个请求的固定延迟（毫秒）
+            jitter_ms: 在固定延迟上额外增加 [0, jitter_ms] 的随机延迟
+            anchor_date: 基准日期（最新的申购日期）
+            host: 监听地址
+            port: 监听端口，0表示随机分配
+        """
+        self.rows = generate_rows(rows, anchor_date)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.anchor_date = anchor_date
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    def respond(self, query: Dict[str, str]) -> Dict:
+        """按请求参数生成响应"""
+        rows = self.rows
+        expression = query.get('filter')
+        if expression:
+            rows = apply_filter(rows, expression)
+            if rows is None:
+                return {"version": None, "result": None, "success": False,
+                        "message": "filter参数错误", "code": 9501}
+        if not rows:
+            return {"version": None, "result": None, "success": False,
+                    "message": "返回数据为空", "code": 9201}
+
+        page_size = max(1, int(query.get('pageSize') or 50))
+        page_number = max(1, int(query.get('pageNumber') or 1))
+        pages = (len(rows) + page_size - 1) // page_size
+        page = rows[(page_number - 1) * page_size:page_number * page_size]
+
+        columns = query.get('columns') or 'ALL'
+        if columns != 'ALL':
+            names = columns.split(',')
+            page = [{name: row.get(name) for name in names} for row in page]
+
+        return {"version": "fake", "success": True, "message": "ok", "code": 0,
+                "result": {"pages": pages, "count": len(rows), "data": page}}
+
+    def _make_handler(self):
+        datacenter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 响应头和响应体分两次写入，关闭Nagle避免小响应被延迟确认拖慢约40ms
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path != API_PATH:
+                    self.send_error(404)
+                    return
+                query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+                datacenter.requests += 1
+
+                delay = datacenter.latency_ms + random.uniform(0, datacenter.jitter_ms)
+                if delay > 0:
+                    time.sleep(delay / 1000)
+
+                body = json.dumps(datacenter.respond(query), ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'FakeDatacenter':
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动本地模拟的东方财富数据中心接口")
+    parser.add_argument('--rows', type=int, default=500, help="合成数据条数（默认500）")
+    parser.add_argument('--latency-ms', type=float, default=0, help="每个请求的固定延迟（毫秒）")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="额外的随机延迟上限（毫秒）")
+    parser.add_argument('--anchor-date', default=DEFAULT_ANCHOR_DATE, help="最新的申购日期")
+    parser.add_argument('--port', type=int, default=8765, help="监听端口（默认8765）")
+    args = parser.parse_args()
+
+    datacenter = FakeDatacenter(args.rows, args.latency_ms, args.jitter_ms, args.anchor_date, port=args.port)
+    print(f"模拟接口已启动: {datacenter.url}（{len(datacenter.rows)} 条数据）")
+    print(f"使用方式: EASTMONEY_DATACENTER_URL={datacenter.url} python check_new_bonds.py --no-cache")
+    try:
+        datacenter._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        datacenter._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP会话
+数据获取和各个Webhook通知共用一个带连接池的会话，按主机复用keep-alive连接，
+避免每次请求都重新进行TCP+TLS握手；所有请求都经过重试和按主机的熔断（见resilience.py）；
+新建连接时在分阶段计时中记录 connect 阶段（DNS解析+TCP握手，HTTPS另含TLS握手）
+"""
+
+import os
+import time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from resilience import request_with_retry
+from tracing import get_tracer
+
+
+# 默认缓存的主机连接池数量（东方财富、钉钉、企业微信、Server酱等）
+DEFAULT_POOL_CONNECTIONS = 10
+# 默认每个主机连接池保持的最大连接数，与默认的并发请求数（SUBSCRIBER_WORKERS）一致
+DEFAULT_POOL_MAXSIZE = 16
+
+
+class _TracedConnectionMixin:
+    """
+    新建连接时记录 connect 阶段，复用的keep-alive连接没有这一项
+
+    tcp_ms 是 DNS解析+TCP握手（urllib3在同一个调用里解析地址并连接，两者不再细分），
+    HTTPS连接的TLS握手是 duration_ms 减去 tcp_ms
+    """
+    _tcp_ms: Optional[float] = None
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        self._tcp_ms = (time.perf_counter() - start) * 1000
+        return sock
+
+    def connect(self):
+        self._tcp_ms = None
+        with get_tracer().span('connect', host=self.host) as span:
+            super().connect()
+            if self._tcp_ms is not None:
+                span['tcp_ms'] = round(self._tcp_ms, 3)
+
+
+class _TracedHTTPConnection(_TracedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TracedHTTPSConnection(_TracedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TracedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TracedHTTPConnection
+
+
+class _TracedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TracedHTTPSConnection
+
+
+class _TracedHTTPAdapter(HTTPAdapter):
+    """连接池使用记录建连耗时的连接"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TracedHTTPConnectionPool,
+            'https': _TracedHTTPSConnectionPool,
+        }
+
+
+class HttpSessionManager:
+    def __init__(self, pool_connections: int = None, pool_maxsize: int = None):
+        """
+        初始化会话管理器
+
+        Args:
+            pool_connections: 缓存的主机连接池数量，为None时读取环境变量 HTTP_POOL_CONNECTIONS
+            pool_maxsize: 每个主机连接池的最大连接数，为None时读取环境变量 HTTP_POOL_MAXSIZE，
+                          并且不小于并发请求数 SUBSCRIBER_WORKERS（线程池中同时请求同一主机的
+                          连接超过连接池大小时，多出的连接用完即丢弃，urllib3会警告 Connection pool is full）
+        """
+        self.pool_connections = pool_connections or int(
+            os.getenv('HTTP_POOL_CONNECTIONS', str(DEFAULT_POOL_CONNECTIONS)))
+        self.pool_maxsize = pool_maxsize or max(
+            int(os.getenv('HTTP_POOL_MAXSIZE', str(DEFAULT_POOL_MAXSIZE))),
+            int(os.getenv('SUBSCRIBER_WORKERS', str(DEFAULT_POOL_MAXSIZE))))
+        self._session: Optional[requests.Session] = None
+
+    @property
+    def session(self) -> requests.Session:
+        """懒加载的会话，第一次请求时才创建"""
+        if self._session is None:
+            session = requests.Session()
+            adapter = _TracedHTTPAdapter(
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_maxsize
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._session = session
+        return self._session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """发送GET请求，临时故障时重试"""
+        return request_with_retry(self.session.request, 'GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """发送POST请求，连接失败或服务端5xx/429时重试"""
+        return request_with_retry(self.session.request, 'POST', url, **kwargs)
+
+    def close(self):
+        """关闭会话并释放所有连接池"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
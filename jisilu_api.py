@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+集思录待发转债接口（备用数据源）
+返回的数据统一转换为东方财富的字段格式，和主数据源的结果可以直接互换
+"""
+
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+from resilience import request_with_retry
+
+
+# 集思录待发转债列表（包含申购日期和申购代码）
+JISILU_PRE_LIST_URL = "https://www.jisilu.cn/data/cbnew/pre_list/"
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Referer": "https://www.jisilu.cn/data/cbnew/#pre",
+    "X-Requested-With": "XMLHttpRequest"
+}
+
+
+def normalize_row(cell: Dict) -> Optional[Dict]:
+    """
+    把集思录的一行数据转换为东方财富的字段格式
+
+    Returns:
+        Optional[Dict]: 没有债券代码的行（还在审批阶段）返回None
+    """
+    code = cell.get('bond_id') or cell.get('bond_cd')
+    if not code:
+        return None
+    apply_date = (cell.get('apply_date') or '')[:10]
+    return {
+        'SECURITY_CODE': str(code),
+        'SECURITY_NAME_ABBR': cell.get('bond_nm') or '',
+        'PUBLIC_START_DATE': f"{apply_date} 00:00:00" if apply_date else None,
+        'CORRECODE': str(cell.get('apply_cd') or ''),
+    }
+
+
+def fetch_pre_list(http=None, timeout: float = 30) -> List[Dict]:
+    """
+    请求待发转债列表
+
+    Args:
+        http: 共享的HTTP会话管理器（HttpSessionManager），为None时直接使用requests
+        timeout: 读取超时时间（秒）
+
+    Returns:
+        List[Dict]: 转换为东方财富字段格式的数据行
+
+    Raises:
+        ValueError: 响应不是预期的格式（例如被反爬页面拦截）
+    """
+    params = {"___jsl": f"LST___t={int(time.time() * 1000)}"}
+    if http is not None:
+        response = http.get(JISILU_PRE_LIST_URL, params=params, headers=DEFAULT_HEADERS, timeout=timeout)
+    else:
+        response = request_with_retry(requests.request, 'GET', JISILU_PRE_LIST_URL, params=params,
+                                      headers=DEFAULT_HEADERS, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+
+    if not isinstance(data, dict) or not isinstance(data.get('rows'), list):
+        raise ValueError(f"集思录返回了无法识别的数据: {str(data)[:100]}")
+
+    rows = []
+    for row in data['rows']:
+        normalized = normalize_row(row.get('cell') or row)
+        if normalized is not None:
+            rows.append(normalized)
+    return rows
+
+
+def fetch_bonds_between(start_date: str, end_date: str, http=None, timeout: float = 30) -> List[Dict]:
+    """
+    申购日期在范围内（包含两端）的待发转债
+
+    Args:
+        start_date: 起始日期（格式：YYYY-MM-DD）
+        end_date: 结束日期（格式：YYYY-MM-DD）
+    """
+    return [row for row in fetch_pre_list(http=http, timeout=timeout)
+            if row['PUBLIC_START_DATE'] and start_date <= row['PUBLIC_START_DATE'][:10] <= end_date]
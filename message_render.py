@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+通知消息渲染
+同一份消息内容按渠道渲染成纯文本、Markdown（钉钉、企业微信、Server酱）或HTML（邮件）；
+每种格式的模板在导入时编译好，渲染用列表拼接，同一条消息的每种格式只渲染一次，
+分发给很多订阅者时不会每次发送都重新生成
+"""
+
+import threading
+from typing import Callable, NamedTuple, Optional, Tuple
+
+
+FORMAT_TEXT = 'text'
+FORMAT_MARKDOWN = 'markdown'
+FORMAT_HTML = 'html'
+
+# 各通知渠道使用的格式
+CHANNEL_FORMATS = {
+    'email': FORMAT_HTML,
+    'dingtalk': FORMAT_MARKDOWN,
+    'wechat_work': FORMAT_MARKDOWN,
+    'server_chan': FORMAT_MARKDOWN,
+}
+
+
+class MessageItem(NamedTuple):
+    """消息中的一只债券"""
+    name: str
+    code: str
+    apply_code: str = ''
+    apply_date: str = ''
+
+
+class MessageContent(NamedTuple):
+    """
+    与格式无关的消息内容
+
+    title: 标题行；sections: (分组标题, 债券)，分组标题为空时不显示；footer: 结尾提示
+    """
+    title: str
+    sections: Tuple[Tuple[str, Tuple[MessageItem, ...]], ...] = ()
+    footer: str = ''
+
+
+class _Templates(NamedTuple):
+    """一种格式的模板：固定片段是字符串，带参数的片段是预先绑定好的 str.format"""
+    title: Callable[..., str]
+    section: str
+    section_label: Callable[..., str]
+    section_open: str
+    section_end: str
+    item: Callable[..., str]
+    apply_code: Callable[..., str]
+    apply_date: Callable[..., str]
+    item_end: str
+    footer: Callable[..., str]
+    escape: Callable[[str], str]
+
+
+def _escape_markdown(value: str) -> str:
+    for char in '\\`*_[]':
+        if char in value:
+            value = value.replace(char, '\\' + char)
+    return value
+
+
+def _escape_html(value: str) -> str:
+    return (value.replace('&', '&amp;').replace('<', '&lt;')
+            .replace('>', '&gt;').replace('"', '&quot;'))
+
+
+# 纯文本：与原来逐行拼接的消息逐字一致
+_TEXT = _Templates(
+    title='{title}\n'.format,
+    section='\n',
+    section_label='【{label}】\n'.format,
+    section_open='',
+    section_end='',
+    item='{index}. {name} ({code})\n'.format,
+    apply_code='   申购代码: {value}\n'.format,
+    apply_date='   申购日期: {value}\n'.format,
+    item_end='',
+    footer='\n{footer}'.format,
+    escape=str,
+)
+
+_MARKDOWN = _Templates(
+    title='### {title}\n'.format,
+    section='\n',
+    section_label='#### 【{label}】\n\n'.format,
+    section_open='',
+    section_end='',
+    item='{index}. **{name}**（{code}）\n'.format,
+    apply_code='    - 申购代码：`{value}`\n'.format,
+    apply_date='    - 申购日期：{value}\n'.format,
+    item_end='',
+    footer='\n> {footer}\n'.format,
+    escape=_escape_markdown,
+)
+
+_HTML = _Templates(
+    title='<h3>{title}</h3>\n'.format,
+    section='<div>\n',
+    section_label='<h4>【{label}】</h4>\n<ol>\n'.format,
+    section_open='<ol>\n',
+    section_end='</ol>\n</div>\n',
+    item='<li><b>{name}</b>（{code}）'.format,
+    apply_code='<br>申购代码：<code>{value}</code>'.format,
+    apply_date='<br>申购日期：{value}'.format,
+    item_end='</li>\n',
+    footer='<p>{footer}</p>\n'.format,
+    escape=_escape_html,
+)
+
+_TEMPLATES = {FORMAT_TEXT: _TEXT, FORMAT_MARKDOWN: _MARKDOWN, FORMAT_HTML: _HTML}
+
+
+def render(content: MessageContent, fmt: str = FORMAT_TEXT) -> str:
+    """
+    按格式渲染消息内容
+
+    Args:
+        content: 消息内容
+        fmt: FORMAT_TEXT / FORMAT_MARKDOWN / FORMAT_HTML
+
+    Returns:
+        str: 渲染结果
+    """
+    templates = _TEMPLATES[fmt]
+    escape = templates.escape
+    parts = [templates.title(title=escape(content.title))]
+
+    for label, items in content.sections:
+        parts.append(templates.section)
+        parts.append(templates.section_label(label=escape(label)) if label else templates.section_open)
+        for index, item in enumerate(items, 1):
+            parts.append(templates.item(index=index, name=escape(item.name), code=escape(item.code)))
+            if item.apply_code:
+                parts.append(templates.apply_code(value=escape(item.apply_code)))
+            if item.apply_date:
+                parts.append(templates.apply_date(value=escape(item.apply_date)))
+            parts.append(templates.item_end)
+        parts.append(templates.section_end)
+
+    if content.footer:
+        parts.append(templates.footer(footer=escape(content.footer)))
+    # 末尾不留换行（没有债券时纯文本消息只有标题一行）
+    return ''.join(parts).rstrip('\n')
+
+
+class BondMessage(str):
+    """
+    通知消息：本身就是纯文本（写入结果文件、控制台输出、投递记录都用它），
+    同时带着消息内容，发送时可以取其他格式的渲染结果
+    """
+
+    def __new__(cls, content: MessageContent):
+        text = render(content, FORMAT_TEXT)
+        message = super().__new__(cls, text)
+        message.content = content
+        message._rendered = {FORMAT_TEXT: text}
+        message._lock = threading.Lock()
+        return message
+
+    def render(self, fmt: str) -> str:
+        """某种格式的渲染结果，第一次使用时渲染，之后直接返回"""
+        rendered = self._rendered.get(fmt)
+        if rendered is None:
+            with self._lock:
+                rendered = self._rendered.get(fmt)
+                if rendered is None:
+                    rendered = self._rendered[fmt] = render(self.content, fmt)
+        return rendered
+
+    def for_channel(self, channel: str) -> str:
+        """某个通知渠道使用的格式的渲染结果"""
+        return self.render(CHANNEL_FORMATS.get(channel, FORMAT_TEXT))
+
+
+def rich_variant(message: str, channel: str) -> Optional[str]:
+    """
+    渠道对应格式的渲染结果；message是普通字符串（例如数据获取失败的提示）时返回None，
+    调用方按纯文本发送
+    """
+    if isinstance(message, BondMessage):
+        return message.for_channel(channel)
+    return None
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prometheus指标
+只用标准库实现计数器、仪表盘和直方图，按Prometheus文本格式输出；
+常驻模式下用内置HTTP服务提供 /metrics，单次运行时写入node_exporter的textfile目录。
+每次运行结束后根据分阶段计时和运行结果更新指标，运行过程中不额外计时
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# 请求和发送耗时直方图的桶（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: Dict[str, str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra.items())
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # 标签 -> (各桶计数, 总和, 总数)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total, count))
+                           for key, (counts, total, count) in self._values.items())
+        for key, (counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = _format_labels(self.label_names, key, {'le': _format_value(bound)})
+                yield f"{self.name}_bucket{labels} {bucket_count}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus文本格式（0.0.4）"""
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+FETCH_SECONDS = REGISTRY.register(Histogram(
+    'bond_fetch_duration_seconds', '数据源请求耗时（到响应体接收完成）', ('stage',)))
+FETCH_BYTES = REGISTRY.register(Counter(
+    'bond_fetch_response_bytes_total', '数据源响应字节数', ('stage',)))
+ROWS_SCANNED = REGISTRY.register(Counter(
+    'bond_rows_scanned_total', '拉取并检查过的数据行数'))
+ROWS_MATCHED = REGISTRY.register(Counter(
+    'bond_rows_matched_total', '申购日期匹配的数据行数'))
+SEND_SECONDS = REGISTRY.register(Histogram(
+    'bond_notification_send_duration_seconds', '各渠道发送耗时', ('channel',)))
+SEND_TOTAL = REGISTRY.register(Counter(
+    'bond_notifications_total', '各渠道发送次数（按结果）', ('channel', 'status')))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'bond_cache_lookups_total', '快照缓存查询次数（按是否命中）', ('result',)))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    'bond_cache_hit_ratio', '累计快照缓存命中率'))
+RUNS_TOTAL = REGISTRY.register(Counter(
+    'bond_runs_total', '运行次数（按结果）', ('outcome',)))
+RUN_SECONDS = REGISTRY.register(Gauge(
+    'bond_run_duration_seconds', '最近一次运行的总耗时'))
+BONDS_FOUND = REGISTRY.register(Gauge(
+    'bond_last_run_bonds', '最近一次运行找到的可转债数量'))
+LAST_SUCCESS = REGISTRY.register(Gauge(
+    'bond_last_success_timestamp_seconds', '最近一次成功运行的Unix时间戳'))
+
+
+def record_run(result: Dict, spans: List[Dict]):
+    """
+    根据一次运行的结果和分阶段计时更新指标
+
+    Args:
+        result: 写入 bond_result.json 的内容（含 timings）
+        spans: 本次运行的全部计时明细（Tracer.spans，不受 timings 条数上限影响）
+    """
+    for span in spans:
+        name = span['name']
+        if name in ('fetch', 'fetch_stream'):
+            FETCH_SECONDS.observe(span['duration_ms'] / 1000, stage=name)
+            FETCH_BYTES.inc(span.get('bytes') or 0, stage=name)
+            if name == 'fetch_stream':
+                ROWS_SCANNED.inc(span.get('rows') or 0)
+                ROWS_MATCHED.inc(span.get('matched') or 0)
+        elif name == 'filter':
+            ROWS_SCANNED.inc(span.get('rows') or 0)
+            ROWS_MATCHED.inc(span.get('matched') or 0)
+        elif name == 'cache':
+            CACHE_LOOKUPS.inc(result='hit' if span.get('hit') else 'miss')
+        elif name.startswith('send:'):
+            channel = name.split(':', 1)[1]
+            SEND_SECONDS.observe(span['duration_ms'] / 1000, channel=channel)
+            SEND_TOTAL.inc(channel=channel, status=span.get('status', 'unknown'))
+
+    # 超时、排队超时和之前已发送过的渠道没有发送计时，只出现在结果里
+    for name, report in (result.get('notifications') or {}).items():
+        if report.get('status') in ('timeout', 'rate_limited', 'duplicate'):
+            SEND_TOTAL.inc(channel=name.split(':', 1)[0], status=report['status'])
+
+    lookups = CACHE_LOOKUPS.value(result='hit') + CACHE_LOOKUPS.value(result='miss')
+    if lookups:
+        CACHE_HIT_RATIO.set(CACHE_LOOKUPS.value(result='hit') / lookups)
+
+    if result.get('error'):
+        outcome = 'error'
+    elif result.get('skipped'):
+        outcome = 'skipped'
+    else:
+        outcome = 'success'
+    RUNS_TOTAL.inc(outcome=outcome)
+    RUN_SECONDS.set((result.get('timings') or {}).get('total_ms', 0) / 1000)
+    BONDS_FOUND.set(result.get('count', 0))
+    if outcome != 'error':
+        LAST_SUCCESS.set(time.time())
+
+
+_LAST_SUCCESS_LINE = re.compile(r'^bond_last_success_timestamp_seconds (\S+)$', re.M)
+
+
+def write_textfile(path: str, registry: Registry = REGISTRY):
+    """
+    原子写入node_exporter textfile collector目录（文件名需以 .prom 结尾）
+
+    单次运行的进程没有历史，本次运行失败时沿用文件中上一次成功的时间戳，
+    这样"很久没有成功运行"的告警依然有效
+    """
+    if not LAST_SUCCESS.value():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                match = _LAST_SUCCESS_LINE.search(f.read())
+            if match:
+                LAST_SUCCESS.set(float(match.group(1)))
+        except (OSError, ValueError):
+            pass
+
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.bond_metrics_', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(registry.render())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class MetricsServer:
+    def __init__(self, port: int, host: str = '0.0.0.0', registry: Registry = REGISTRY):
+        """
+        在后台线程中提供 /metrics
+
+        Args:
+            port: 监听端口
+            host: 监听地址
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> 'MetricsServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True,
+                                        name='metrics')
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
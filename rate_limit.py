@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+通知渠道限流
+钉钉机器人每个Webhook每分钟最多20条，企业微信、Server酱也各有频率限制。
+每个Webhook / SendKey 一个令牌桶，超出的发送按预约的时间排队，按允许的速率依次发出；
+收到429或限流错误码时整个桶退避一段时间，之后重新排队，而不是直接记为发送失败
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+
+# 各渠道每个Webhook / SendKey 在一个窗口内允许的发送数（0表示不限流）
+DEFAULT_QUOTAS = {
+    'dingtalk': 20,
+    'wechat_work': 20,
+    'server_chan': 5,
+}
+# 配额的统计窗口（秒）
+QUOTA_WINDOW = 60.0
+# 默认桶容量：可以不等待连续发出的条数。任意一个窗口内最多发出 容量 + 速率 * 窗口 = 配额 条
+DEFAULT_BURST = 1
+# 收到限流响应后，没有Retry-After时的默认退避时长（秒）
+DEFAULT_BACKOFF = 60.0
+# 收到限流响应后最多重新排队几次
+DEFAULT_RETRIES = 2
+# 排队等待超过该时长（秒）的发送直接记为throttled，不再等待
+DEFAULT_MAX_WAIT = 300.0
+
+# 各渠道表示"发送太频繁"的错误码
+DINGTALK_THROTTLE_CODES = frozenset({130101})
+WECHAT_WORK_THROTTLE_CODES = frozenset({45009})
+
+
+class Throttled(Exception):
+    """渠道返回了限流响应"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def retry_after_of(response) -> Optional[float]:
+    """读取响应的 Retry-After（秒），没有或不是数字时返回None"""
+    value = response.headers.get('Retry-After')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def check_webhook_response(response, code_field: str = 'errcode',
+                           throttle_codes: Iterable[int] = ()):
+    """
+    检查Webhook的响应
+
+    Raises:
+        Throttled: HTTP 429，或响应体中的错误码属于throttle_codes
+        RuntimeError: 响应体中的错误码不为0（请求本身是成功的HTTP 200）
+        requests.HTTPError: 其他HTTP错误
+    """
+    if response.status_code == 429:
+        raise Throttled("HTTP 429", retry_after_of(response))
+    response.raise_for_status()
+    try:
+        data = response.json()
+    except ValueError:
+        return
+    code = data.get(code_field) if isinstance(data, dict) else None
+    if not code:
+        return
+    message = data.get('errmsg') or data.get('message') or ''
+    if code in throttle_codes:
+        raise Throttled(f"{code_field}={code} {message}", retry_after_of(response))
+    raise RuntimeError(f"{code_field}={code} {message}")
+
+
+class TokenBucket:
+    def __init__(self, quota: float, window: float = QUOTA_WINDOW, burst: int = DEFAULT_BURST):
+        """
+        Args:
+            quota: 每个窗口允许的发送数
+            window: 窗口长度（秒）
+            burst: 桶容量
+        """
+        self.capacity = max(1, min(burst, quota))
+        # 容量用掉的部分从速率里扣除，保证任意一个窗口都不超过配额
+        self.rate = max(quota - self.capacity, 1) / window
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        # 累计退避时长：已经预约、正在等待的发送据此跟着推迟
+        self.shifted = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, max_wait: float = None) -> Optional[float]:
+        """
+        预约一个令牌，返回需要等待的秒数（0表示可以立即发送）
+
+        令牌数可以为负：负数部分就是排在前面的预约，按预约顺序依次放行
+
+        Returns:
+            Optional[float]: 等待时长；超过max_wait时不预约，返回None
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+    def backoff(self, seconds: float):
+        """收到限流响应：已有和之后的预约整体推迟seconds秒"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+            self.shifted += seconds
+
+
+class RateLimiter:
+    def __init__(self, quotas: Dict[str, float] = None, burst: int = None, backoff: float = None,
+                 retries: int = None, max_wait: float = None):
+        """
+        Args:
+            quotas: 渠道 -> 每分钟配额，为None时读取环境变量 RATE_LIMIT_<渠道>（如 RATE_LIMIT_DINGTALK），
+                    默认见 DEFAULT_QUOTAS
+            burst: 桶容量，为None时读取环境变量 RATE_LIMIT_BURST
+            backoff: 没有Retry-After时的退避时长（秒），为None时读取环境变量 RATE_LIMIT_BACKOFF
+            retries: 收到限流响应后最多重新排队几次，为None时读取环境变量 RATE_LIMIT_RETRIES
+            max_wait: 最长排队时间（秒），为None时读取环境变量 RATE_LIMIT_MAX_WAIT
+        """
+        if quotas is None:
+            quotas = {channel: float(os.getenv(f'RATE_LIMIT_{channel.upper()}', str(quota)))
+                      for channel, quota in DEFAULT_QUOTAS.items()}
+        self.quotas = quotas
+        self.burst = burst or int(os.getenv('RATE_LIMIT_BURST', str(DEFAULT_BURST)))
+        self.backoff_seconds = backoff if backoff is not None else float(
+            os.getenv('RATE_LIMIT_BACKOFF', str(DEFAULT_BACKOFF)))
+        self.retries = retries if retries is not None else int(
+            os.getenv('RATE_LIMIT_RETRIES', str(DEFAULT_RETRIES)))
+        self.max_wait = max_wait if max_wait is not None else float(
+            os.getenv('RATE_LIMIT_MAX_WAIT', str(DEFAULT_MAX_WAIT)))
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, channel: str, key: Optional[str]) -> Optional[TokenBucket]:
+        """channel渠道下key（Webhook地址或SendKey）的令牌桶；不限流的渠道或没有key时返回None"""
+        quota = self.quotas.get(channel)
+        if not quota or not key:
+            return None
+        with self._lock:
+            bucket = self._buckets.get((channel, key))
+            if bucket is None:
+                bucket = self._buckets[(channel, key)] = TokenBucket(quota, QUOTA_WINDOW, self.burst)
+            return bucket
+
+    async def wait_turn(self, channel: str, key: Optional[str]) -> Optional[float]:
+        """
+        在事件循环中排队，直到可以发送；排队期间桶退避过时跟着推迟
+
+        Returns:
+            Optional[float]: 实际排队的秒数；排队超过 max_wait 时不排队，返回None
+        """
+        import asyncio
+
+        bucket = self.bucket(channel, key)
+        if bucket is None:
+            return 0.0
+        shifted = bucket.shifted
+        delay = bucket.reserve(self.max_wait)
+        if delay is None:
+            return None
+        queued = 0.0
+        while delay > 0:
+            await asyncio.sleep(delay)
+            queued += delay
+            delay, shifted = bucket.shifted - shifted, bucket.shifted
+        return queued
+
+    def backoff(self, channel: str, key: Optional[str], retry_after: Optional[float] = None):
+        """收到限流响应后退避：优先使用Retry-After"""
+        bucket = self.bucket(channel, key)
+        if bucket is not None:
+            bucket.backoff(retry_after if retry_after is not None else self.backoff_seconds)
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_default_limiter() -> RateLimiter:
+    """进程内共享的限流器：常驻模式和同一进程内的多次运行共用配额"""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter()
+        return _default_limiter
+
+
+def set_default_limiter(limiter: Optional[RateLimiter]):
+    """替换进程内共享的限流器，None表示下次使用时按环境变量重新创建"""
+    global _default_limiter
+    with _default_limiter_lock:
+        _default_limiter = limiter
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重试与熔断
+数据获取和所有通知渠道共用：临时故障按带抖动的指数退避重试，
+同一主机连续失败达到阈值后熔断一段时间，期间直接失败，不再反复请求已经挂掉的服务
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, TypeVar, Union
+from urllib.parse import urlsplit
+
+import requests
+
+
+# 默认最多尝试次数（包括第一次）
+DEFAULT_RETRY_ATTEMPTS = 3
+# 默认退避基数和上限（秒），第N次重试前等待 [0, min(上限, 基数 * 2^N)] 之间的随机时长
+DEFAULT_RETRY_BASE_DELAY = 0.5
+DEFAULT_RETRY_MAX_DELAY = 8.0
+# 默认总时间预算（秒）：包括所有尝试和退避等待，超出预算不再重试，每次请求的超时也不超过剩余预算
+DEFAULT_RETRY_BUDGET = 30.0
+# 默认连接超时（秒），读取超时沿用调用方传入的timeout
+DEFAULT_CONNECT_TIMEOUT = 5.0
+# 默认连续失败多少次后熔断 / 熔断多久后放行一个试探请求（秒）
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET = 60.0
+
+# 重试预算快用完时，单次请求至少保留的超时（秒）
+MIN_ATTEMPT_TIMEOUT = 0.5
+
+# 值得重试的HTTP状态码
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+T = TypeVar('T')
+
+
+class CircuitOpenError(Exception):
+    """熔断期间的请求直接失败"""
+
+
+class RetryableStatus(Exception):
+    """响应状态码表示服务端临时故障"""
+
+    def __init__(self, response: requests.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class RetryPolicy:
+    def __init__(self, attempts: int = None, base_delay: float = None, max_delay: float = None,
+                 budget: float = None):
+        """
+        Args:
+            attempts: 最多尝试次数，为None时读取环境变量 RETRY_ATTEMPTS
+            base_delay: 退避基数（秒），为None时读取环境变量 RETRY_BASE_DELAY
+            max_delay: 单次等待上限（秒），为None时读取环境变量 RETRY_MAX_DELAY
+            budget: 总时间预算（秒），为None时读取环境变量 RETRY_BUDGET
+        """
+        self.attempts = max(1, attempts or int(os.getenv('RETRY_ATTEMPTS', str(DEFAULT_RETRY_ATTEMPTS))))
+        self.base_delay = base_delay if base_delay is not None else float(
+            os.getenv('RETRY_BASE_DELAY', str(DEFAULT_RETRY_BASE_DELAY)))
+        self.max_delay = max_delay if max_delay is not None else float(
+            os.getenv('RETRY_MAX_DELAY', str(DEFAULT_RETRY_MAX_DELAY)))
+        self.budget = budget if budget is not None else float(
+            os.getenv('RETRY_BUDGET', str(DEFAULT_RETRY_BUDGET)))
+
+    def delay(self, retry_number: int) -> float:
+        """第retry_number次重试（从0开始）前的等待时长，全抖动避免多个客户端同时重试"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry_number)))
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = None, reset_timeout: float = None):
+        """
+        Args:
+            threshold: 连续失败多少次后熔断，为None时读取环境变量 BREAKER_THRESHOLD
+            reset_timeout: 熔断持续时间（秒），为None时读取环境变量 BREAKER_RESET
+        """
+        self.threshold = threshold or int(os.getenv('BREAKER_THRESHOLD', str(DEFAULT_BREAKER_THRESHOLD)))
+        self.reset_timeout = reset_timeout if reset_timeout is not None else float(
+            os.getenv('BREAKER_RESET', str(DEFAULT_BREAKER_RESET)))
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        # 半开状态下是否已经放行了试探请求
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """closed：正常；open：熔断中；half_open：熔断到期，放行一个试探请求"""
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """
+        是否放行请求：半开状态下只放行一个试探请求，
+        它结束（record_success / record_failure / release）之前其他请求仍然直接失败
+        """
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'open' or self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def release(self):
+        """放行的请求结束了，但结果不计入熔断（例如不值得重试的错误）"""
+        with self._lock:
+            self.probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.probing = False
+            if self.failures >= self.threshold:
+                # 试探请求失败时重新计时
+                self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(endpoint: str) -> CircuitBreaker:
+    """进程内共享的按主机划分的熔断器"""
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker()
+        return breaker
+
+
+def reset_breakers():
+    """清空所有熔断状态"""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def endpoint_of(url: str) -> str:
+    """熔断按主机划分，同一主机的不同路径共用一个熔断器"""
+    return urlsplit(url).netloc or url
+
+
+def is_transient(error: Exception) -> bool:
+    """临时故障：连接失败、超时、服务端5xx/429、SMTP会话中断"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, RetryableStatus,
+                          ConnectionError, TimeoutError)):
+        return True
+    # 只有发邮件时才会加载smtplib，数据获取路径不为了判断异常类型而导入它
+    smtplib = sys.modules.get('smtplib')
+    return smtplib is not None and isinstance(
+        error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError))
+
+
+def call_with_retry(func: Callable[[], T], endpoint: str, policy: RetryPolicy = None,
+                    retry_if: Callable[[Exception], bool] = is_transient) -> T:
+    """
+    调用func，临时故障时按退避策略重试，并在endpoint的熔断器上记录结果
+
+    Args:
+        func: 无参数的调用
+        endpoint: 熔断器名称（通常是主机名）
+        policy: 重试策略，为None时使用环境变量配置
+        retry_if: 判断异常是否值得重试；不值得重试的异常直接抛出，也不计入熔断
+
+    Raises:
+        CircuitOpenError: endpoint正在熔断
+    """
+    policy = policy or RetryPolicy()
+    breaker = breaker_for(endpoint)
+    deadline = time.monotonic() + policy.budget
+
+    for attempt in range(policy.attempts):
+        if not breaker.allow():
+            raise CircuitOpenError(f"{endpoint} 连续失败 {breaker.failures} 次，熔断中")
+        try:
+            result = func()
+        except Exception as e:
+            if not retry_if(e):
+                breaker.release()
+                raise
+            breaker.record_failure()
+            if attempt + 1 >= policy.attempts:
+                raise
+            delay = policy.delay(attempt)
+            if time.monotonic() + delay >= deadline:
+                print(f"{endpoint} 请求失败（{e}），已超出 {policy.budget:g} 秒的重试预算，不再重试")
+                raise
+            print(f"{endpoint} 请求失败（{e}），{delay:.1f} 秒后第 {attempt + 1} 次重试")
+            time.sleep(delay)
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            breaker.record_success()
+            return result
+
+
+def split_timeout(timeout: Union[None, float, Tuple[float, float]]) -> Tuple[float, Optional[float]]:
+    """把单个超时拆成（连接超时, 读取超时），连接超时读取环境变量 HTTP_CONNECT_TIMEOUT"""
+    if isinstance(timeout, tuple):
+        return timeout
+    connect_timeout = float(os.getenv('HTTP_CONNECT_TIMEOUT', str(DEFAULT_CONNECT_TIMEOUT)))
+    if timeout is not None:
+        connect_timeout = min(connect_timeout, timeout)
+    return connect_timeout, timeout
+
+
+def request_with_retry(send: Callable[..., requests.Response], method: str, url: str,
+                       policy: RetryPolicy = None, **kwargs) -> requests.Response:
+    """
+    发送HTTP请求，带重试、熔断和分开的连接/读取超时
+
+    GET是幂等的，所有临时故障都重试；POST（Webhook推送）读取超时时服务端可能已经处理，
+    为避免重复推送只在连接失败和服务端返回5xx时重试；POST返回429表示触发了限流，
+    不重试也不计入熔断，直接返回给调用方按限流处理（见 rate_limit.py）。
+    重试用完后仍是5xx/429时返回最后一个响应，由调用方raise_for_status
+
+    Args:
+        send: 发送函数，签名同 requests.request(method, url, **kwargs)
+        method: GET / POST
+        url: 请求地址
+        policy: 重试策略
+    """
+    policy = policy or RetryPolicy()
+    connect_timeout, read_timeout = split_timeout(kwargs.get('timeout'))
+    deadline = time.monotonic() + policy.budget
+    idempotent = method.upper() == 'GET'
+
+    def retry_if(error: Exception) -> bool:
+        if not idempotent and isinstance(error, requests.ReadTimeout):
+            return False
+        if not idempotent and isinstance(error, RetryableStatus) and error.response.status_code == 429:
+            return False
+        return is_transient(error)
+
+    def attempt() -> requests.Response:
+        # 每次请求的超时不超过剩余的重试预算：一个挂掉的服务最多占用 budget 秒，而不是每次尝试都等满超时
+        remaining = max(deadline - time.monotonic(), MIN_ATTEMPT_TIMEOUT)
+        kwargs['timeout'] = (min(connect_timeout, remaining),
+                             remaining if read_timeout is None else min(read_timeout, remaining))
+        response = send(method, url, **kwargs)
+        if response.status_code in RETRY_STATUS_CODES:
+            response.close()
+            raise RetryableStatus(response)
+        return response
+
+    try:
+        return call_with_retry(attempt, endpoint_of(url), policy, retry_if)
+    except RetryableStatus as e:
+        return e.response
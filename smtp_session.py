@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享SMTP会话
+所有邮件共用少量已登录的SMTP连接，只做一次TCP+TLS握手和登录，之后在同一会话上连续sendmail；
+服务器断开会话时自动重连并重发，连接和读写都有超时；建立连接经过重试和熔断（见resilience.py）
+"""
+
+import os
+import smtplib
+import threading
+from queue import Empty, LifoQueue
+from typing import List, Optional, Union
+
+from resilience import call_with_retry
+
+
+# 默认连接/读写超时（秒）
+DEFAULT_SMTP_TIMEOUT = 10
+# 默认同时保持的已登录连接数
+DEFAULT_SMTP_POOL_SIZE = 1
+# 使用隐式TLS（SMTP_SSL）的端口，其他端口使用STARTTLS
+SMTP_SSL_PORT = 465
+
+# 表示会话已失效、需要重连的异常
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+def _session_dropped(error: Exception) -> bool:
+    """服务器是否已经关闭会话（断开连接或返回421）"""
+    if isinstance(error, RECONNECT_ERRORS):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code == 421
+
+
+class SmtpSessionManager:
+    def __init__(self, host: str = None, port: int = None, user: str = None,
+                 password: str = None, timeout: float = None, pool_size: int = None):
+        """
+        初始化SMTP会话管理器
+
+        Args:
+            host: SMTP服务器，为None时读取环境变量 SMTP_HOST
+            port: 端口，为None时读取环境变量 SMTP_PORT；465使用SMTP_SSL，其他端口使用STARTTLS
+            user: 登录账号，为None时读取环境变量 SENDER_EMAIL
+            password: 密码/授权码，为None时读取环境变量 SENDER_PASSWORD
+            timeout: 连接和读写超时（秒），为None时读取环境变量 SMTP_TIMEOUT
+            pool_size: 最多同时保持的已登录连接数，为None时读取环境变量 SMTP_POOL_SIZE
+        """
+        self.host = host or os.getenv('SMTP_HOST', 'smtp.gmail.com')
+        self.port = port or int(os.getenv('SMTP_PORT', '587'))
+        self.user = user or os.getenv('SENDER_EMAIL')
+        self.password = password or os.getenv('SENDER_PASSWORD')
+        self.timeout = timeout or float(os.getenv('SMTP_TIMEOUT', str(DEFAULT_SMTP_TIMEOUT)))
+        self.pool_size = pool_size or int(os.getenv('SMTP_POOL_SIZE', str(DEFAULT_SMTP_POOL_SIZE)))
+
+        self._idle: LifoQueue = LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._lock = threading.Lock()
+        self._connections: List[smtplib.SMTP] = []
+
+        # 统计：握手（登录）次数、发送成功的邮件数、重连次数
+        self.handshakes = 0
+        self.messages_sent = 0
+        self.reconnects = 0
+
+    @property
+    def configured(self) -> bool:
+        """发件账号和密码是否已配置"""
+        return bool(self.user and self.password)
+
+    def _connect(self) -> smtplib.SMTP:
+        """建立连接、启用TLS并登录，连接失败时退避重试"""
+        return call_with_retry(self._open, f"{self.host}:{self.port}")
+
+    def _open(self) -> smtplib.SMTP:
+        if self.port == SMTP_SSL_PORT:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            server.starttls()
+        try:
+            server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+
+        with self._lock:
+            self._connections.append(server)
+            self.handshakes += 1
+        return server
+
+    def _discard(self, server: smtplib.SMTP):
+        """丢弃失效的连接"""
+        with self._lock:
+            if server in self._connections:
+                self._connections.remove(server)
+        try:
+            server.close()
+        except Exception:
+            pass
+
+    def _acquire(self) -> smtplib.SMTP:
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+        try:
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, server: Optional[smtplib.SMTP]):
+        if server is not None:
+            self._idle.put(server)
+        self._slots.release()
+
+    def sendmail(self, from_addr: str, to_addrs: Union[str, List[str]], msg: str):
+        """
+        在已登录的会话上发送一封邮件
+
+        会话被服务器关闭时重新建立连接并重发一次，其他错误直接抛出
+        """
+        server = self._acquire()
+        try:
+            try:
+                server.sendmail(from_addr, to_addrs, msg)
+            except Exception as e:
+                if not _session_dropped(e):
+                    # 收件人被拒等错误不影响会话，smtplib已经RSET，连接可以继续使用
+                    raise
+                self._discard(server)
+                server = None
+                server = self._connect()
+                with self._lock:
+                    self.reconnects += 1
+                server.sendmail(from_addr, to_addrs, msg)
+        except Exception as e:
+            if server is not None and _session_dropped(e):
+                self._discard(server)
+                server = None
+            self._release(server)
+            raise
+
+        with self._lock:
+            self.messages_sent += 1
+        self._release(server)
+
+    def close(self):
+        """退出所有连接"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        self._idle = LifoQueue()
+        for server in connections:
+            try:
+                server.quit()
+            except Exception:
+                try:
+                    server.close()
+                except Exception:
+                    pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订阅者登记表
+每个渠道可以有任意多个接收方（邮箱、钉钉/企业微信机器人、Server酱SendKey），
+从JSON配置文件或SQLite表中加载；数据只获取一次、消息只生成一次，再分发给所有订阅者
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from typing import Dict, List
+
+
+# 支持的渠道
+CHANNELS = ('email', 'dingtalk', 'wechat_work', 'server_chan')
+
+SUBSCRIBERS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    channel TEXT NOT NULL,
+    target TEXT NOT NULL,
+    enabled INTEGER NOT NULL DEFAULT 1,
+    UNIQUE(channel, target)
+);
+"""
+
+
+def mask_target(target: str) -> str:
+    """隐藏Webhook token / SendKey / 邮箱的大部分内容，用于日志和结果文件"""
+    if '@' in target and '/' not in target:
+        user, _, domain = target.partition('@')
+        return f"{user[:2]}***@{domain}"
+    return f"{target[:24]}***{target[-4:]}" if len(target) > 32 else f"{target[:4]}***"
+
+
+class Subscriber:
+    __slots__ = ('channel', 'target', 'name')
+
+    def __init__(self, channel: str, target: str, name: str = ''):
+        """
+        Args:
+            channel: 渠道，email / dingtalk / wechat_work / server_chan
+            target: 收件邮箱 / 机器人Webhook / Server酱SendKey
+            name: 订阅者名称，只用于日志
+        """
+        if channel not in CHANNELS:
+            raise ValueError(f"不支持的渠道: {channel}")
+        self.channel = channel
+        self.target = target
+        self.name = name or ''
+
+    @property
+    def label(self) -> str:
+        """日志和结果文件中使用的标识，不包含完整的token"""
+        return f"{self.channel}:{self.name or mask_target(self.target)}"
+
+    def to_dict(self) -> Dict:
+        return {'name': self.name, 'channel': self.channel, 'target': self.target}
+
+    def __repr__(self) -> str:
+        return f"Subscriber({self.label!r})"
+
+
+def load_subscribers_json(path: str) -> List[Subscriber]:
+    """
+    从JSON文件加载订阅者，格式：
+        {"subscribers": [{"name": "张三", "channel": "email", "target": "a@example.com"}, ...]}
+    enabled 为 false 的条目会被跳过
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    entries = data.get('subscribers', []) if isinstance(data, dict) else data
+    return [Subscriber(entry['channel'], entry['target'], entry.get('name', ''))
+            for entry in entries if entry.get('enabled', True)]
+
+
+def load_subscribers_sqlite(path: str) -> List[Subscriber]:
+    """从SQLite的subscribers表加载启用的订阅者"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(SUBSCRIBERS_SCHEMA)
+        rows = conn.execute(
+            "SELECT channel, target, name FROM subscribers WHERE enabled = 1 ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+    return [Subscriber(channel, target, name or '') for channel, target, name in rows]
+
+
+def save_subscribers_sqlite(path: str, subscribers: List[Subscriber]) -> int:
+    """把订阅者写入SQLite的subscribers表（按渠道+接收方去重）"""
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.executescript(SUBSCRIBERS_SCHEMA)
+            conn.executemany("""
+                INSERT INTO subscribers (name, channel, target) VALUES (?, ?, ?)
+                ON CONFLICT(channel, target) DO UPDATE SET name = excluded.name, enabled = 1
+            """, [(s.name, s.channel, s.target) for s in subscribers])
+    finally:
+        conn.close()
+    return len(subscribers)
+
+
+def load_subscribers(path: str = None) -> List[Subscriber]:
+    """
+    加载订阅者：.db/.sqlite/.sqlite3 文件按SQLite读取，其他按JSON读取
+
+    Args:
+        path: 配置文件路径，为None时读取环境变量 SUBSCRIBERS_FILE；都没有时返回空列表
+    """
+    path = path or os.getenv('SUBSCRIBERS_FILE')
+    if not path:
+        return []
+    if os.path.splitext(path)[1].lower() in ('.db', '.sqlite', '.sqlite3'):
+        return load_subscribers_sqlite(path)
+    return load_subscribers_json(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="管理订阅者")
+    parser.add_argument('--import-json', metavar='FILE', help="把JSON配置中的订阅者导入SQLite")
+    parser.add_argument('--db', default='bond_store.db', help="SQLite文件（默认 bond_store.db）")
+    parser.add_argument('--list', action='store_true', help="列出SQLite中启用的订阅者")
+    args = parser.parse_args()
+
+    if args.import_json:
+        count = save_subscribers_sqlite(args.db, load_subscribers_json(args.import_json))
+        print(f"已导入 {count} 个订阅者到 {args.db}")
+
+    if args.list:
+        subscribers = load_subscribers_sqlite(args.db)
+        print(f"共 {len(subscribers)} 个订阅者:")
+        for subscriber in subscribers:
+            print(f"- {subscriber.label}")
+
+
+if __name__ == "__main__":
+    main()
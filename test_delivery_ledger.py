@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试投递记录：同一天同一条消息已经成功发送过的接收方在重新运行时跳过，发送失败的下次仍会重试
+使用临时的本地库和模拟的通知渠道，不访问网络，任何一项失败时以非零状态退出
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bond_store import BondStore, digest
+from check_new_bonds import BondNotifier
+from rate_limit import RateLimiter, set_default_limiter
+
+
+TEST_DATE = "2026-01-16"
+WEBHOOK = "https://example.invalid/robot/send?access_token=test"
+
+
+class LedgerBondNotifier(BondNotifier):
+    """只有一个模拟的钉钉渠道，记录实际发送的消息"""
+
+    def __init__(self, store_path: str, succeed: bool = True):
+        super().__init__(check_date=TEST_DATE, dedup=True)
+        self._store = BondStore(store_path)
+        self.succeed = succeed
+        self.sent = []
+
+    def fake_send(self, message: str) -> bool:
+        self.sent.append(str(message))
+        return self.succeed
+
+    def notification_channels(self):
+        return {"dingtalk": self.fake_send}
+
+    def channel_targets(self):
+        return {"dingtalk": WEBHOOK}
+
+
+def test_store_ledger():
+    """同一条投递只记录一次"""
+    print("=" * 80)
+    print("测试投递记录表")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        with BondStore(os.path.join(work_dir, 'bonds.db')) as store:
+            message_hash = digest("hello")
+            assert store.record_delivery(TEST_DATE, "dingtalk", digest(WEBHOOK), message_hash)
+            assert not store.record_delivery(TEST_DATE, "dingtalk", digest(WEBHOOK), message_hash)
+            assert store.delivered(TEST_DATE, message_hash) == {("dingtalk", digest(WEBHOOK))}
+            assert store.delivered(TEST_DATE, digest("other")) == set()
+            assert store.delivered("2026-01-19", message_hash) == set()
+    print("✓ 重复的投递记录被忽略，按日期和消息查询")
+
+
+def test_duplicate_skip():
+    """重新运行时跳过已经发送过的接收方；消息变化或上次发送失败时照常发送"""
+    print("\n" + "=" * 80)
+    print("测试重复发送跳过")
+    print("=" * 80)
+
+    set_default_limiter(RateLimiter(quotas={}))
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            path = os.path.join(work_dir, 'bonds.db')
+
+            with LedgerBondNotifier(path) as notifier:
+                report = notifier.send_notifications("今日有新债")
+                assert report["dingtalk"]["status"] == "sent", report
+                assert notifier.sent == ["今日有新债"]
+            print("✓ 第一次运行正常发送")
+
+            with LedgerBondNotifier(path) as notifier:
+                report = notifier.send_notifications("今日有新债")
+                assert report["dingtalk"]["status"] == "duplicate", report
+                assert notifier.sent == []
+            print("✓ 重新运行时跳过已发送的接收方")
+
+            with LedgerBondNotifier(path) as notifier:
+                report = notifier.send_notifications("今日有新债（更正）")
+                assert report["dingtalk"]["status"] == "sent", report
+            print("✓ 消息内容变化时照常发送")
+
+            with LedgerBondNotifier(path, succeed=False) as notifier:
+                report = notifier.send_notifications("发送失败的消息")
+                assert report["dingtalk"]["status"] == "failed", report
+            with LedgerBondNotifier(path) as notifier:
+                report = notifier.send_notifications("发送失败的消息")
+                assert report["dingtalk"]["status"] == "sent", report
+                assert notifier.sent == ["发送失败的消息"]
+            print("✓ 发送失败的不记录，下次重试")
+    finally:
+        set_default_limiter(None)
+
+
+if __name__ == "__main__":
+    try:
+        test_store_ledger()
+        test_duplicate_skip()
+
+        print("\n" + "=" * 80)
+        print("✓ 所有测试通过")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"\n✗ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
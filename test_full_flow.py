@@ -11,6 +11,7 @@ from datetime import datetime
 # 添加当前目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from bond_record import bond_to_dict
 from check_new_bonds import BondNotifier
 
 
@@ -38,7 +39,7 @@ class TestFullFlow(BondNotifier):
         print("\n[3] 保存结果到文件...")
         result = {
             "date": self.today,
-            "bonds": bonds,
+            "bonds": [bond_to_dict(bond) for bond in bonds],
             "message": message,
             "count": len(bonds)
         }
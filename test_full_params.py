@@ -4,17 +4,18 @@
 使用你提供的完整参数测试
 """
 
-import requests
+import argparse
 import json
 
+from bond_cache import add_cache_arguments, configure_cache_from_args
+from eastmoney_api import EASTMONEY_DATACENTER_URL, ReportRowStream
+
 def test_full_params():
     """使用你提供的完整参数测试"""
     print("=" * 80)
     print("使用你提供的完整参数测试")
     print("=" * 80)
     
-    url = "https://datacenter-web.eastmoney.com/api/data/v1/get"
-    
     # 使用你提供的参数
     params = {
         "reportName": "RPT_BOND_CB_LIST",
@@ -27,20 +28,14 @@ def test_full_params():
         "client": "WEB"
     }
     
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    }
-    
-    print(f"\n请求URL: {url}")
+    print(f"\n请求URL: {EASTMONEY_DATACENTER_URL}")
     print(f"参数: {json.dumps(params, ensure_ascii=False, indent=2)}")
     
-    response = requests.get(url, params=params, headers=headers, timeout=30)
-    print(f"\n响应状态码: {response.status_code}")
+    # 流式解析：只保留2026年1月的行，不在内存里保留全部字段的完整响应
+    stream = ReportRowStream(params, start_date='2026-01-01', end_date='2026-01-31')
+    january_bonds = list(stream)
     
-    data = response.json()
-    bonds = data.get('result', {}).get('data', [])
-    
-    print(f"\n返回数据条数: {len(bonds)}")
+    print(f"\n返回数据条数: {stream.rows_scanned}")
     
     # 查找2026-01-16的数据
     print("\n" + "=" * 80)
@@ -48,7 +43,7 @@ def test_full_params():
     print("=" * 80)
     
     target_bonds = []
-    for bond in bonds:
+    for bond in january_bonds:
         public_date = bond.get('PUBLIC_START_DATE', '')
         if public_date.startswith('2026-01-16'):
             target_bonds.append(bond)
@@ -67,18 +62,18 @@ def test_full_params():
     print("2026年1月所有可转债:")
     print("=" * 80)
     
-    january_bonds = []
-    for bond in bonds:
-        public_date = bond.get('PUBLIC_START_DATE', '')
-        if public_date.startswith('2026-01'):
-            january_bonds.append(bond)
-            print(f"{public_date} - {bond.get('SECURITY_NAME_ABBR', '')} ({bond.get('SECURITY_CODE', '')})")
+    for bond in january_bonds:
+        print(f"{bond.get('PUBLIC_START_DATE', '')} - {bond.get('SECURITY_NAME_ABBR', '')} ({bond.get('SECURITY_CODE', '')})")
     
     print(f"\n共找到 {len(january_bonds)} 条2026年1月的记录")
     
     return target_bonds
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="使用完整参数测试")
+    add_cache_arguments(parser)
+    configure_cache_from_args(parser.parse_args())
+    
     try:
         test_full_params()
         print("\n✓ 测试完成")
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试通知渠道限流：令牌桶的预约、补充、排队上限和退避，
+以及发送时被限流后退避重试、超出配额的消息排队发出（排队不计入总超时）
+不访问网络，任何一项失败时以非零状态退出
+"""
+
+import asyncio
+import functools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from check_new_bonds import BondNotifier
+from rate_limit import RateLimiter, Throttled, TokenBucket, set_default_limiter
+
+
+WEBHOOK = "https://example.invalid/robot/send?access_token=test"
+
+
+class ThrottledBondNotifier(BondNotifier):
+    """只有一个模拟的钉钉渠道：前 throttle_times 次返回限流，之后发送成功"""
+
+    def __init__(self, throttle_times: int, notify_timeout: float):
+        super().__init__(check_date="2026-01-16", use_store=False)
+        self.notify_timeout = notify_timeout
+        self.throttle_times = throttle_times
+        self.calls = 0
+
+    def fake_send(self, message: str) -> bool:
+        self.calls += 1
+        if self.calls <= self.throttle_times:
+            raise Throttled("errcode=130101 send too fast")
+        return True
+
+    def notification_channels(self):
+        return {"dingtalk": self.fake_send}
+
+    def channel_targets(self):
+        return {"dingtalk": WEBHOOK}
+
+
+def approx(value: float, expected: float, tolerance: float = 0.05) -> bool:
+    return abs(value - expected) <= tolerance
+
+
+def test_token_bucket_reserve():
+    """桶容量内立即放行，之后的预约按速率依次排队"""
+    print("=" * 80)
+    print("测试令牌桶预约")
+    print("=" * 80)
+
+    # 每分钟20条、容量1：第一条立即发送，之后每 60/19 秒一条
+    bucket = TokenBucket(quota=20, window=60, burst=1)
+    interval = 60 / 19
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[0] == 0, waits
+    for number, wait in enumerate(waits[1:], 1):
+        assert approx(wait, number * interval), waits
+    print(f"✓ 预约等待: {[round(wait, 2) for wait in waits]}")
+
+    # 容量大于1时可以连续发出
+    bucket = TokenBucket(quota=20, window=60, burst=5)
+    assert [bucket.reserve() for _ in range(5)] == [0] * 5
+    assert bucket.reserve() > 0
+    print("✓ 容量内连续发出")
+
+
+def test_token_bucket_refill():
+    """令牌按速率补充，不超过容量"""
+    print("\n" + "=" * 80)
+    print("测试令牌补充")
+    print("=" * 80)
+
+    # 每秒约100个令牌
+    bucket = TokenBucket(quota=101, window=1, burst=1)
+    assert bucket.reserve() == 0
+    time.sleep(0.05)
+    assert bucket.reserve() == 0
+    assert bucket.tokens <= bucket.capacity
+    print("✓ 等待后令牌补充")
+
+
+def test_token_bucket_max_wait():
+    """需要等待超过max_wait时不预约，也不占用令牌"""
+    print("\n" + "=" * 80)
+    print("测试排队上限")
+    print("=" * 80)
+
+    bucket = TokenBucket(quota=20, window=60, burst=1)
+    assert bucket.reserve(max_wait=1) == 0
+    tokens = bucket.tokens
+    assert bucket.reserve(max_wait=1) is None
+    # 只有两次调用之间补充的一点令牌，没有扣掉一个
+    assert approx(bucket.tokens, tokens), (bucket.tokens, tokens)
+    assert bucket.reserve(max_wait=10) is not None
+    print("✓ 超过排队上限时不预约")
+
+
+def test_token_bucket_backoff():
+    """退避推迟之后的预约，并累计到shifted，已经排队的发送据此跟着推迟"""
+    print("\n" + "=" * 80)
+    print("测试退避")
+    print("=" * 80)
+
+    bucket = TokenBucket(quota=20, window=60, burst=1)
+    assert bucket.reserve() == 0
+    bucket.backoff(30)
+    assert bucket.shifted == 30
+    wait = bucket.reserve()
+    assert approx(wait, 30 + 60 / 19), wait
+    print(f"✓ 退避30秒后的预约等待 {wait:.2f} 秒")
+
+
+def test_rate_limiter():
+    """不限流的渠道或没有接收方时不排队；同一接收方共用一个桶"""
+    print("\n" + "=" * 80)
+    print("测试限流器")
+    print("=" * 80)
+
+    limiter = RateLimiter(quotas={'dingtalk': 20, 'email': 0}, burst=1, backoff=5, retries=1, max_wait=1)
+    assert limiter.bucket('email', 'a@example.com') is None
+    assert limiter.bucket('dingtalk', None) is None
+    assert limiter.bucket('dingtalk', 'hook-a') is limiter.bucket('dingtalk', 'hook-a')
+    assert limiter.bucket('dingtalk', 'hook-a') is not limiter.bucket('dingtalk', 'hook-b')
+
+    async def turns():
+        return [await limiter.wait_turn('dingtalk', 'hook-c'), await limiter.wait_turn('dingtalk', 'hook-c')]
+
+    # 第二条需要等待约3秒，超过max_wait=1，不排队
+    assert asyncio.run(turns()) == [0.0, None]
+
+    limiter.backoff('dingtalk', 'hook-d')
+    assert limiter.bucket('dingtalk', 'hook-d').shifted == 5
+    limiter.backoff('dingtalk', 'hook-d', retry_after=2)
+    assert limiter.bucket('dingtalk', 'hook-d').shifted == 7
+    print("✓ 按渠道和接收方分桶，排队超过上限时返回None，优先使用Retry-After退避")
+
+
+def test_throttled_send_retried():
+    """发送被限流一次：退避后重新发送成功，退避时间超过总超时也不会被截断"""
+    print("\n" + "=" * 80)
+    print("测试限流后重试")
+    print("=" * 80)
+
+    # 退避1秒，比总超时0.5秒长（默认配置同样是退避60秒、总超时30秒）
+    set_default_limiter(RateLimiter(quotas={'dingtalk': 20}, burst=1, backoff=1, retries=2, max_wait=300))
+    try:
+        with ThrottledBondNotifier(throttle_times=1, notify_timeout=0.5) as notifier:
+            start = time.monotonic()
+            report = notifier.send_notifications("今日有新债")
+            elapsed = time.monotonic() - start
+        result = report["dingtalk"]
+        assert result["status"] == "sent", result
+        assert notifier.calls == 2, notifier.calls
+        assert result["queued_ms"] >= 900, result
+        assert elapsed >= 0.9, elapsed
+        print(f"✓ 限流一次后重试成功（排队 {result['queued_ms']:.0f} ms）")
+
+        # 一直被限流：重试用完后记为throttled，而不是timeout
+        set_default_limiter(RateLimiter(quotas={'dingtalk': 20}, burst=1, backoff=0.2, retries=1, max_wait=300))
+        with ThrottledBondNotifier(throttle_times=10, notify_timeout=0.1) as notifier:
+            report = notifier.send_notifications("今日有新债")
+        assert report["dingtalk"]["status"] == "throttled", report
+        assert notifier.calls == 2, notifier.calls
+        print("✓ 重试用完后记为throttled")
+    finally:
+        set_default_limiter(None)
+
+
+def test_overflow_drains():
+    """超出配额的发送按配额速率陆续发出，排队时间不计入总超时"""
+    print("\n" + "=" * 80)
+    print("测试超出配额的发送排队发出")
+    print("=" * 80)
+
+    # 容量1，之后每0.3秒一条：4条需要约0.9秒，总超时只有0.2秒
+    set_default_limiter(RateLimiter(quotas={'dingtalk': 201}, burst=1, max_wait=300))
+    try:
+        with ThrottledBondNotifier(throttle_times=0, notify_timeout=0.2) as notifier:
+
+            async def fan_out():
+                with notifier._runner() as runner:
+                    return await notifier._send_within_deadline({
+                        f"dingtalk:{number}": functools.partial(
+                            notifier._send_async, runner, notifier.fake_send, "今日有新债", 'dingtalk',
+                            1.0, WEBHOOK)
+                        for number in range(4)
+                    })
+
+            report = asyncio.run(fan_out())
+        assert [result["status"] for result in report.values()] == ["sent"] * 4, report
+        assert max(result.get("queued_ms", 0) for result in report.values()) >= 800, report
+        print("✓ 4条消息全部按配额速率发出")
+    finally:
+        set_default_limiter(None)
+
+
+if __name__ == "__main__":
+    try:
+        test_token_bucket_reserve()
+        test_token_bucket_refill()
+        test_token_bucket_max_wait()
+        test_token_bucket_backoff()
+        test_rate_limiter()
+        test_throttled_send_retried()
+        test_overflow_drains()
+
+        print("\n" + "=" * 80)
+        print("✓ 所有测试通过")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"\n✗ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
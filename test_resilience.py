@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试重试与熔断：熔断器的状态转换、半开状态只放行一个试探请求、重试次数和总时间预算
+不访问网络，任何一项失败时以非零状态退出
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, breaker_for, call_with_retry, reset_breakers
+
+
+RESET_TIMEOUT = 0.2
+
+
+def test_breaker_transitions():
+    """closed -> open -> half_open -> closed，试探失败时回到open并重新计时"""
+    print("=" * 80)
+    print("测试熔断器状态转换")
+    print("=" * 80)
+
+    breaker = CircuitBreaker(threshold=3, reset_timeout=RESET_TIMEOUT)
+    assert breaker.state == 'closed' and breaker.allow()
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == 'closed', "未达到阈值不应熔断"
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    print("✓ 连续失败3次后熔断")
+
+    time.sleep(RESET_TIMEOUT + 0.05)
+    assert breaker.state == 'half_open'
+    assert breaker.allow(), "熔断到期后应放行试探请求"
+    assert not breaker.allow(), "试探请求结束前不应放行其他请求"
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    print("✓ 试探失败后重新熔断")
+
+    time.sleep(RESET_TIMEOUT + 0.05)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.failures == 0
+    assert breaker.allow() and breaker.allow()
+    print("✓ 试探成功后恢复")
+
+    # 试探请求不计入熔断地结束（例如不值得重试的错误）时，放行下一个试探请求
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(RESET_TIMEOUT + 0.05)
+    assert breaker.allow() and not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+    print("✓ 试探请求释放后放行下一个")
+
+
+def test_half_open_single_probe():
+    """半开状态下并发的请求只有一个被放行"""
+    print("\n" + "=" * 80)
+    print("测试半开状态并发试探")
+    print("=" * 80)
+
+    breaker = CircuitBreaker(threshold=1, reset_timeout=RESET_TIMEOUT)
+    breaker.record_failure()
+    time.sleep(RESET_TIMEOUT + 0.05)
+
+    allowed = []
+    barrier = threading.Barrier(20)
+
+    def probe():
+        barrier.wait()
+        allowed.append(breaker.allow())
+
+    threads = [threading.Thread(target=probe) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert allowed.count(True) == 1, allowed
+    print("✓ 20个并发请求只放行1个")
+
+
+def test_call_with_retry():
+    """临时故障重试到成功；不值得重试的错误直接抛出；熔断后不再调用"""
+    print("\n" + "=" * 80)
+    print("测试重试")
+    print("=" * 80)
+
+    reset_breakers()
+    policy = RetryPolicy(attempts=3, base_delay=0, max_delay=0, budget=10)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("temporary")
+        return "ok"
+
+    assert call_with_retry(flaky, 'test-flaky', policy, lambda e: True) == "ok"
+    assert len(calls) == 3
+    print("✓ 失败2次后第3次成功")
+
+    calls.clear()
+    try:
+        call_with_retry(flaky, 'test-fatal', policy, lambda e: False)
+    except ConnectionError:
+        assert len(calls) == 1
+        assert breaker_for('test-fatal').failures == 0, "不值得重试的错误不计入熔断"
+        print("✓ 不值得重试的错误不重试")
+    else:
+        raise AssertionError("应抛出原始异常")
+
+    def broken():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    breaker = breaker_for('test-broken')
+    breaker.threshold = 2
+    calls.clear()
+    try:
+        call_with_retry(broken, 'test-broken', policy, lambda e: True)
+    except CircuitOpenError:
+        assert len(calls) == 2
+        print("✓ 达到熔断阈值后不再调用")
+    else:
+        raise AssertionError("应抛出 CircuitOpenError")
+    reset_breakers()
+
+
+def test_retry_budget():
+    """一次尝试就用完了总时间预算时不再重试"""
+    print("\n" + "=" * 80)
+    print("测试重试预算")
+    print("=" * 80)
+
+    reset_breakers()
+    policy = RetryPolicy(attempts=5, base_delay=0.01, max_delay=0.01, budget=0.2)
+    calls = []
+
+    def slow_failure():
+        calls.append(1)
+        time.sleep(0.3)
+        raise TimeoutError("slow")
+
+    start = time.monotonic()
+    try:
+        call_with_retry(slow_failure, 'test-budget', policy, lambda e: True)
+    except TimeoutError:
+        elapsed = time.monotonic() - start
+        assert len(calls) == 1, len(calls)
+        assert elapsed < 0.5, elapsed
+        print(f"✓ 超出预算后停止重试（{elapsed * 1000:.0f} ms）")
+    else:
+        raise AssertionError("应抛出最后一次的异常")
+    reset_breakers()
+
+
+if __name__ == "__main__":
+    try:
+        test_breaker_transitions()
+        test_half_open_single_probe()
+        test_call_with_retry()
+        test_retry_budget()
+
+        print("\n" + "=" * 80)
+        print("✓ 所有测试通过")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"\n✗ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -5,6 +5,7 @@
 用于验证2026-01-16的数据是否正确
 """
 
+import argparse
 import json
 import sys
 import os
@@ -14,7 +15,11 @@ from typing import List, Dict
 # 添加当前目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from bond_cache import add_cache_arguments, configure_cache_from_args
+from bond_index import BondDateIndex
+from bond_record import bond_to_dict
 from check_new_bonds import BondNotifier
+from eastmoney_api import EASTMONEY_DATACENTER_URL, fetch_report
 
 
 class TestBondNotifier(BondNotifier):
@@ -26,10 +31,7 @@ class TestBondNotifier(BondNotifier):
     def fetch_bond_data_debug(self) -> List[Dict]:
         """调试版数据获取，显示详细请求信息"""
         try:
-            import requests
-            
             # 东方财富可转债列表API
-            url = "https://datacenter-web.eastmoney.com/api/data/v1/get"
             params = {
                 "reportName": "RPT_BOND_CB_LIST",
                 "columns": "SECURITY_CODE,SECURITY_NAME_ABBR,PUBLIC_START_DATE,CORRECODE",
@@ -39,19 +41,10 @@ class TestBondNotifier(BondNotifier):
                 "client": "WEB"
             }
             
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            }
-            
-            print(f"\n请求URL: {url}")
+            print(f"\n请求URL: {EASTMONEY_DATACENTER_URL}")
             print(f"请求参数: {json.dumps(params, ensure_ascii=False, indent=2)}")
             
-            response = requests.get(url, params=params, headers=headers, timeout=30)
-            print(f"响应状态码: {response.status_code}")
-            
-            response.raise_for_status()
-            
-            data = response.json()
+            data = fetch_report(params)
             print(f"\n响应数据结构:")
             print(json.dumps(data, ensure_ascii=False, indent=2)[:2000] + "...")
             
@@ -59,13 +52,7 @@ class TestBondNotifier(BondNotifier):
                 all_bonds = data["result"]["data"]
                 
                 # 筛选申购日期为今天的债券
-                today_bonds = []
-                for bond in all_bonds:
-                    public_start_date = bond.get('PUBLIC_START_DATE', '')
-                    if public_start_date:
-                        apply_date = public_start_date.split(' ')[0]
-                        if apply_date == self.today:
-                            today_bonds.append(bond)
+                today_bonds = [bond_to_dict(bond) for bond in BondDateIndex(all_bonds).on(self.today)]
                 
                 print(f"\n✓ 成功获取到 {len(today_bonds)} 条数据")
                 return today_bonds
@@ -176,20 +163,22 @@ def test_date_range():
     
     results = []
     
+    # 只获取一次数据并建立日期索引，之后每天的查询都在本地完成
+    notifier = TestBondNotifier(start_date.strftime('%Y-%m-%d'))
+    
     current_date = start_date
     while current_date <= end_date:
         date_str = current_date.strftime('%Y-%m-%d')
         print(f"\n检查 {date_str}...")
         
-        notifier = TestBondNotifier(date_str)
-        bonds = notifier.fetch_bond_data()
+        bonds = notifier.bonds_on(date_str)
         
         if bonds:
             print(f"  ✓ 找到 {len(bonds)} 只可转债")
             results.append({
                 "date": date_str,
                 "count": len(bonds),
-                "bonds": bonds
+                "bonds": [bond_to_dict(bond) for bond in bonds]
             })
         else:
             print(f"  - 无数据")
@@ -216,6 +205,10 @@ def test_date_range():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="测试特定日期的可转债数据获取")
+    add_cache_arguments(parser)
+    configure_cache_from_args(parser.parse_args())
+    
     try:
         # 测试指定日期
         count = test_2026_01_16()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试流式解析：RowArrayParser 在任意位置切开的响应上逐段解析，
+ReportRowStream 对着本地模拟接口（fake_eastmoney.py）读取，错误响应抛出 ReportError
+不访问网络，任何一项失败时以非零状态退出
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import eastmoney_api
+from bond_cache import SnapshotCache
+from eastmoney_api import ReportError, ReportRowStream, RowArrayParser, bond_list_params
+from fake_eastmoney import DEFAULT_ANCHOR_DATE, FakeDatacenter, generate_rows
+
+
+NO_CACHE = SnapshotCache(enabled=False)
+
+
+def parse_in_chunks(body: str, size: int):
+    """把body切成size个字符一段依次喂给解析器，返回解析出的行"""
+    parser = RowArrayParser()
+    rows = []
+    for start in range(0, len(body), size):
+        rows.extend(parser.feed(body[start:start + size]))
+    parser.close()
+    return rows
+
+
+def test_parser_chunk_splits():
+    """任意切分位置（包括切在 "data" 键、行中间、字符串中间）解析结果都和整体解析一致"""
+    print("=" * 80)
+    print("测试 RowArrayParser 分段解析")
+    print("=" * 80)
+
+    expected = generate_rows(25)
+    body = json.dumps({"version": "x", "result": {"pages": 1, "data": expected}, "success": True,
+                       "message": "ok", "code": 0}, ensure_ascii=False)
+    for size in (1, 2, 3, 7, 64, 1000, len(body)):
+        rows = parse_in_chunks(body, size)
+        assert rows == expected, f"每段 {size} 个字符时解析结果不一致"
+        print(f"✓ 每段 {size} 个字符: {len(rows)} 行")
+
+    # data之后的内容不影响结果
+    rows = parse_in_chunks(json.dumps({"result": {"data": [], "count": 0}, "code": 0}), 5)
+    assert rows == []
+    print("✓ 空data数组")
+
+
+def test_parser_error_body():
+    """没有data数组的响应：错误码抛出 ReportError，"数据为空"正常结束，截断的响应抛出 ValueError"""
+    print("\n" + "=" * 80)
+    print("测试 RowArrayParser 错误响应")
+    print("=" * 80)
+
+    body = json.dumps({"version": None, "result": None, "success": False,
+                       "message": "filter参数错误", "code": 9501}, ensure_ascii=False)
+    for size in (1, 4, len(body)):
+        try:
+            parse_in_chunks(body, size)
+        except ReportError as e:
+            assert e.code == 9501, e.code
+        else:
+            raise AssertionError(f"每段 {size} 个字符时错误响应没有抛出 ReportError")
+    print("✓ code=9501 抛出 ReportError")
+
+    empty = json.dumps({"result": None, "success": False, "message": "返回数据为空", "code": 9201},
+                       ensure_ascii=False)
+    assert parse_in_chunks(empty, 3) == []
+    print("✓ code=9201 视为没有记录")
+
+    body = json.dumps({"result": {"data": generate_rows(3)}, "code": 0}, ensure_ascii=False)
+    try:
+        parse_in_chunks(body[:len(body) // 2], 8)
+    except ValueError:
+        print("✓ 截断的响应抛出 ValueError")
+    else:
+        raise AssertionError("截断的响应没有抛出 ValueError")
+
+
+def test_stream_against_fake():
+    """对着本地模拟接口流式读取：按申购日期筛选，错误响应抛出 ReportError"""
+    print("\n" + "=" * 80)
+    print("测试 ReportRowStream（本地模拟接口）")
+    print("=" * 80)
+
+    original_url = eastmoney_api.EASTMONEY_DATACENTER_URL
+    with FakeDatacenter(rows=300) as datacenter:
+        eastmoney_api.EASTMONEY_DATACENTER_URL = datacenter.url
+        try:
+            # 很小的chunk_size，让行和UTF-8字符都被切在两次读取之间
+            stream = ReportRowStream(bond_list_params(300), start_date=DEFAULT_ANCHOR_DATE,
+                                     end_date=DEFAULT_ANCHOR_DATE, cache=NO_CACHE, chunk_size=97)
+            rows = list(stream)
+            assert len(rows) == 3, len(rows)
+            assert all(row['PUBLIC_START_DATE'].startswith(DEFAULT_ANCHOR_DATE) for row in rows)
+            assert stream.rows_scanned == 300, stream.rows_scanned
+            print(f"✓ 扫描 {stream.rows_scanned} 行，匹配 {len(rows)} 行")
+
+            # 没有匹配记录时接口返回"数据为空"
+            stream = ReportRowStream(bond_list_params(filter="(PUBLIC_START_DATE>='2099-01-01')"),
+                                     cache=NO_CACHE, chunk_size=16)
+            assert list(stream) == []
+            print("✓ 数据为空时返回空列表")
+
+            stream = ReportRowStream(bond_list_params(filter="bad filter"), cache=NO_CACHE, chunk_size=16)
+            try:
+                list(stream)
+            except ReportError as e:
+                assert e.code == 9501, e.code
+                print("✓ 接口拒绝filter时抛出 ReportError")
+            else:
+                raise AssertionError("错误响应没有抛出 ReportError")
+        finally:
+            eastmoney_api.EASTMONEY_DATACENTER_URL = original_url
+
+
+if __name__ == "__main__":
+    try:
+        test_parser_chunk_splits()
+        test_parser_error_body()
+        test_stream_against_fake()
+
+        print("\n" + "=" * 80)
+        print("✓ 所有测试通过")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"\n✗ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试交易日历：节假日休市、前后交易日查找、数据文件缺失时按周一到周五处理
+不访问网络，任何一项失败时以非零状态退出
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from trading_calendar import TradingCalendar
+
+
+def test_is_trading_day():
+    """周末和休市安排中的日期不是交易日"""
+    print("=" * 80)
+    print("测试交易日判断")
+    print("=" * 80)
+
+    calendar = TradingCalendar()
+    expected = {
+        "2026-01-01": False,  # 元旦
+        "2026-01-16": True,   # 周五
+        "2026-01-17": False,  # 周六
+        "2026-01-18": False,  # 周日
+        "2026-02-13": True,   # 春节前最后一个交易日
+        "2026-02-16": False,  # 春节
+        "2026-02-24": True,
+        "2026-10-01": False,  # 国庆
+        "2026-10-08": True,
+    }
+    for date_str, trading in expected.items():
+        assert calendar.is_trading_day(date_str) == trading, date_str
+        print(f"✓ {date_str}: {'交易日' if trading else '休市'}")
+
+
+def test_step_and_range():
+    """下一个/上一个交易日跳过整段假期；trading_days 从起始日（含）开始"""
+    print("\n" + "=" * 80)
+    print("测试前后交易日")
+    print("=" * 80)
+
+    calendar = TradingCalendar()
+    assert calendar.next_trading_day("2026-02-13") == "2026-02-24"
+    assert calendar.prev_trading_day("2026-02-24") == "2026-02-13"
+    assert calendar.next_trading_day("2026-01-16", inclusive=True) == "2026-01-16"
+    assert calendar.next_trading_day("2026-01-17", inclusive=True) == "2026-01-19"
+    assert calendar.prev_trading_day("2026-01-18", inclusive=True) == "2026-01-16"
+    assert calendar.trading_days("2026-09-30", 3) == ["2026-09-30", "2026-10-08", "2026-10-09"]
+    print("✓ 春节、国庆前后的交易日")
+
+
+def test_missing_and_custom_file():
+    """数据文件缺失时按周一到周五处理；没有收录的年份同样按周一到周五处理"""
+    print("\n" + "=" * 80)
+    print("测试数据文件")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        calendar = TradingCalendar(os.path.join(work_dir, 'missing.json'))
+        assert not calendar.covers("2026-01-01")
+        assert calendar.is_trading_day("2026-01-01")  # 周四
+        assert not calendar.is_trading_day("2026-01-03")  # 周六
+        print("✓ 文件缺失时按周一到周五处理")
+
+        path = os.path.join(work_dir, 'calendar.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"closed_weekdays": {"2030": ["2030-01-01"]}}, f)
+        calendar = TradingCalendar(path)
+        assert calendar.covers("2030-06-01") and not calendar.covers("2031-01-01")
+        assert not calendar.is_trading_day("2030-01-01")
+        assert calendar.next_trading_day("2029-12-31") == "2030-01-02"
+        print("✓ 自定义数据文件")
+
+
+if __name__ == "__main__":
+    try:
+        test_is_trading_day()
+        test_step_and_range()
+        test_missing_and_custom_file()
+
+        print("\n" + "=" * 80)
+        print("✓ 所有测试通过")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"\n✗ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
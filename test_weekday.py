@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from check_new_bonds import BondNotifier, is_weekday
+from trading_calendar import get_default_calendar, is_trading_day
 
 
 def test_weekday_judgment():
@@ -36,8 +37,26 @@ def test_weekday_judgment():
         is_workday = is_weekday(date_str)
         weekday_name = ['周一', '周二', '周三', '周四', '周五', '周六', '周日'][test_date.weekday()]
         status = '✓ 工作日' if is_workday else '✗ 周末'
+        trading = '交易日' if is_trading_day(date_str) else '休市'
         
-        print(f"{date_str} ({weekday_name}): {status}")
+        print(f"{date_str} ({weekday_name}): {status} / {trading}")
+
+
+def test_trading_calendar():
+    """测试交易日历：节假日休市、下一个/上一个交易日"""
+    print("\n" + "=" * 80)
+    print("测试交易日历")
+    print("=" * 80)
+    
+    calendar = get_default_calendar()
+    
+    # 2026-02-16 春节休市（周一），2026-01-16 正常交易（周五），2026-01-18 周日
+    for date_str in ["2026-01-16", "2026-01-18", "2026-02-16", "2026-10-01"]:
+        print(f"{date_str}: {'交易日' if calendar.is_trading_day(date_str) else '休市'}")
+    
+    print(f"\n2026-02-13 的下一个交易日: {calendar.next_trading_day('2026-02-13')}")
+    print(f"2026-02-24 的上一个交易日: {calendar.prev_trading_day('2026-02-24')}")
+    print(f"2026-09-30 起5个交易日: {calendar.trading_days('2026-09-30', 5)}")
 
 
 def test_notifier_with_dates():
@@ -79,9 +98,9 @@ def test_skip_weekend_notification():
     print(f"找到 {len(bonds)} 只可转债")
     print(f"是否工作日: {notifier.is_weekday}")
     
-    # 测试运行（会自动跳过周末无数据的通知）
-    print("\n运行测试（skip_weekend_notification=True）:")
-    count = notifier.run(skip_weekend_notification=True)
+    # 测试运行（休市日直接跳过，不查询也不发送通知）
+    print("\n运行测试:")
+    count = notifier.run()
     
     print(f"\n结果: 找到 {count} 只可转债")
     if not notifier.is_weekday and count == 0:
@@ -93,6 +112,7 @@ def test_skip_weekend_notification():
 if __name__ == "__main__":
     try:
         test_weekday_judgment()
+        test_trading_calendar()
         test_notifier_with_dates()
         test_skip_weekend_notification()
         
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分阶段计时
+在请求、解析、筛选、格式化、各渠道发送等环节记录耗时、传输字节数和行数，
+运行结束时写入 bond_result.json 的 timings 部分，也可以追加到JSONL追踪文件；
+每个阶段只多一次 perf_counter 和一次列表追加，可以在生产环境一直开启
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+
+# timings中最多保留的明细条数（订阅者很多时发送明细只保留汇总）
+MAX_SPANS = 200
+
+
+class Tracer:
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._spans: List[Dict] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Dict]:
+        """
+        记录一个阶段的耗时
+
+        用法：
+            with tracer.span('fetch', report='RPT_BOND_CB_LIST') as span:
+                ...
+                span['bytes'] = len(body)
+        """
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except GeneratorExit:
+            # 在生成器中使用时，调用方提前停止迭代不算出错
+            raise
+        except BaseException as e:
+            attrs['error'] = type(e).__name__
+            raise
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000, start, **attrs)
+
+    def record(self, name: str, duration_ms: float, started: float = None, **attrs):
+        """记录一个已经计好时的阶段"""
+        if started is None:
+            started = time.perf_counter() - duration_ms / 1000
+        span = {'name': name, 'start_ms': round((started - self._start) * 1000, 3),
+                'duration_ms': round(duration_ms, 3)}
+        span.update(attrs)
+        with self._lock:
+            self._spans.append(span)
+
+    @property
+    def spans(self) -> List[Dict]:
+        with self._lock:
+            return list(self._spans)
+
+    def summary(self) -> Dict[str, Dict]:
+        """按阶段名汇总：次数、总耗时、最大耗时，以及字节数和行数之和"""
+        summary: Dict[str, Dict] = {}
+        for span in self.spans:
+            item = summary.setdefault(span['name'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            item['count'] += 1
+            item['total_ms'] = round(item['total_ms'] + span['duration_ms'], 3)
+            item['max_ms'] = max(item['max_ms'], span['duration_ms'])
+            for key in ('bytes', 'rows'):
+                if isinstance(span.get(key), int):
+                    item[key] = item.get(key, 0) + span[key]
+        return summary
+
+    def to_dict(self) -> Dict:
+        """写入 bond_result.json 的 timings 部分"""
+        spans = sorted(self.spans, key=lambda span: span['start_ms'])
+        timings = {
+            'total_ms': round((time.perf_counter() - self._start) * 1000, 3),
+            'summary': self.summary(),
+            'spans': spans[:MAX_SPANS],
+        }
+        if len(spans) > MAX_SPANS:
+            timings['dropped_spans'] = len(spans) - MAX_SPANS
+        return timings
+
+    def write_jsonl(self, path: str, **context):
+        """把每个阶段作为一行追加到JSONL追踪文件，context（如运行日期）附加到每一行"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        recorded_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with open(path, 'a', encoding='utf-8') as f:
+            for span in self.spans:
+                line = dict(context, recorded_at=recorded_at)
+                line.update(span)
+                f.write(json.dumps(line, ensure_ascii=False) + '\n')
+
+
+class NullTracer(Tracer):
+    """没有正在进行的运行时使用，不记录任何内容"""
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Dict]:
+        yield attrs
+
+    def record(self, name: str, duration_ms: float, started: float = None, **attrs):
+        pass
+
+
+_null_tracer = NullTracer()
+# 绑定到当前上下文的计时器：同一个事件循环里同时进行的多次运行各自记录，
+# 通过 contextvars.copy_context() 提交到线程池的任务也能取到
+_current_tracer: ContextVar[Optional[Tracer]] = ContextVar('bond_tracer', default=None)
+
+
+def get_tracer() -> Tracer:
+    """当前运行的计时器；没有时返回不记录的空计时器"""
+    tracer = _current_tracer.get()
+    return tracer if tracer is not None else _null_tracer
+
+
+def bind_tracer(tracer: Optional[Tracer]) -> Token:
+    """把计时器绑定到当前上下文（None表示停止记录），返回值交给 reset_tracer 恢复"""
+    return _current_tracer.set(tracer)
+
+
+def reset_tracer(token: Token):
+    _current_tracer.reset(token)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+沪深交易所交易日历
+从本地数据文件读取每年的休市安排，按年生成交易日位图（一年46字节），查询是否交易日为O(1)；
+数据文件没有覆盖的年份按"周一到周五为交易日"处理
+"""
+
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Union
+
+
+# 默认数据文件：与本模块放在同一目录
+DEFAULT_CALENDAR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trading_calendar.json')
+
+# 查找下一个/上一个交易日时最多向前/向后查找的天数（春节长假不超过两周）
+MAX_SEARCH_DAYS = 30
+
+DateLike = Union[str, date]
+
+
+def _to_date(value: DateLike) -> date:
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value[:10], '%Y-%m-%d').date()
+
+
+def _build_bitmap(year: int, closed_weekdays: List[str]) -> bytearray:
+    """生成一年的交易日位图：第N位（一年中的第N天，从0开始）为1表示交易日"""
+    bitmap = bytearray(46)  # 366位
+    closed = {_to_date(value) for value in closed_weekdays}
+    current = date(year, 1, 1)
+    while current.year == year:
+        if current.weekday() < 5 and current not in closed:
+            day_of_year = current.timetuple().tm_yday - 1
+            bitmap[day_of_year >> 3] |= 1 << (day_of_year & 7)
+        current += timedelta(days=1)
+    return bitmap
+
+
+class TradingCalendar:
+    def __init__(self, path: str = None):
+        """
+        加载交易日历
+
+        Args:
+            path: 数据文件路径，为None时读取环境变量 TRADING_CALENDAR_PATH，默认使用仓库自带的文件
+        """
+        self.path = path or os.getenv('TRADING_CALENDAR_PATH', DEFAULT_CALENDAR_PATH)
+        self._bitmaps: Dict[int, bytearray] = {}
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"交易日历加载失败，按周一到周五处理: {e}")
+            return
+
+        for year, closed_weekdays in data.get('closed_weekdays', {}).items():
+            self._bitmaps[int(year)] = _build_bitmap(int(year), closed_weekdays)
+
+    def covers(self, value: DateLike) -> bool:
+        """数据文件是否包含该日期所在年份的休市安排"""
+        return _to_date(value).year in self._bitmaps
+
+    def is_trading_day(self, value: DateLike) -> bool:
+        """
+        判断是否交易日
+
+        Args:
+            value: 日期（date 或 YYYY-MM-DD 字符串）
+        """
+        day = _to_date(value)
+        bitmap = self._bitmaps.get(day.year)
+        if bitmap is None:
+            return day.weekday() < 5
+        day_of_year = day.timetuple().tm_yday - 1
+        return bool(bitmap[day_of_year >> 3] & (1 << (day_of_year & 7)))
+
+    def _step(self, value: DateLike, step: int, inclusive: bool) -> str:
+        day = _to_date(value)
+        if not inclusive:
+            day += timedelta(days=step)
+        for _ in range(MAX_SEARCH_DAYS):
+            if self.is_trading_day(day):
+                return day.strftime('%Y-%m-%d')
+            day += timedelta(days=step)
+        raise ValueError(f"{value} 前后 {MAX_SEARCH_DAYS} 天内没有交易日，请检查交易日历数据")
+
+    def next_trading_day(self, value: DateLike, inclusive: bool = False) -> str:
+        """
+        下一个交易日
+
+        Args:
+            value: 日期
+            inclusive: 为True时如果当天就是交易日则返回当天
+        """
+        return self._step(value, 1, inclusive)
+
+    def prev_trading_day(self, value: DateLike, inclusive: bool = False) -> str:
+        """
+        上一个交易日
+
+        Args:
+            value: 日期
+            inclusive: 为True时如果当天就是交易日则返回当天
+        """
+        return self._step(value, -1, inclusive)
+
+    def trading_days(self, start: DateLike, count: int) -> List[str]:
+        """从start开始（包含当天）的count个交易日"""
+        days = []
+        current = self.next_trading_day(start, inclusive=True)
+        while len(days) < count:
+            days.append(current)
+            current = self.next_trading_day(current)
+        return days
+
+
+_default_calendar: Optional[TradingCalendar] = None
+
+
+def get_default_calendar() -> TradingCalendar:
+    """进程内共享的默认交易日历"""
+    global _default_calendar
+    if _default_calendar is None:
+        _default_calendar = TradingCalendar()
+    return _default_calendar
+
+
+def is_trading_day(value: DateLike = None) -> bool:
+    """判断是否交易日，value为None时判断今天"""
+    return get_default_calendar().is_trading_day(value or date.today())